@@ -0,0 +1,277 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+# Звіти вимірюються без кешу; модульний engine з src.database не використовується
+os.environ.setdefault("DB_URL", "sqlite://")
+os.environ["REPORT_CACHE_ENABLED"] = "false"
+
+import sqlalchemy  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from src import config, crud, models  # noqa: E402
+from src.cache import bump_data_version  # noqa: E402
+from src.database import Base, create_db_engine  # noqa: E402
+from src.schemas import schemas_logic  # noqa: E402
+from src.utils import generate_data  # noqa: E402
+
+
+# Бенчмарки CRUD-функцій на синтетичних даних різного масштабу.
+#
+# Для кожної функції і масштабу вимірюються час (медіана повторів), кількість
+# SQL-запитів і пік пам'яті Python (tracemalloc); результат порівнюється з
+# benchmarks/baseline.json. Бази генеруються один раз у benchmarks/.data.
+# Запуск:
+#     python -m benchmarks.run [--scales 100000 1000000] [--update-baseline]
+
+BENCH_DIR = Path(__file__).resolve().parent
+DATA_DIR = BENCH_DIR / ".data"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+DEFAULT_SCALES = [100_000]
+DEFAULT_REPEAT = 5
+
+# Дозволене погіршення відносно baseline; менші абсолютні зміни - шум
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.5
+MIN_TIME_DELTA = 0.005
+MIN_MEMORY_DELTA_KIB = 256
+
+# Плани для insert_plans вставляються в далекий рік і видаляються після виміру
+INSERT_PLANS_YEAR = 2100
+
+
+def _insert_plans(db):
+    items = [
+        schemas_logic.PlanInsertItem(
+            period=date(INSERT_PLANS_YEAR, month, 1), category_name=name, sum=1000
+        )
+        for month in range(1, 13)
+        for name in ("видача", "збір")
+    ]
+    return crud.insert_plans(db, items)
+
+
+def _delete_inserted_plans(db):
+    db.query(models.Plan).filter(
+        models.Plan.period >= date(INSERT_PLANS_YEAR, 1, 1)
+    ).delete()
+    db.commit()
+    bump_data_version()
+
+
+def scenarios(credits: int) -> dict:
+    """Виклики CRUD-функцій: {назва: (функція від db, очищення після виклику)}."""
+    series_start = date(2021, 6, 1)
+    return {
+        "get_user_credits": (lambda db: crud.get_user_credits(db, credits // 2), None),
+        "get_users_credits": (
+            lambda db: crud.get_users_credits(
+                db, list(range(1, credits + 1, max(credits // 1000, 1)))
+            ),
+            None,
+        ),
+        "get_year_performance": (lambda db: crud.get_year_performance(db, 2021), None),
+        "get_plans_performance": (
+            lambda db: crud.get_plans_performance(db, date(2021, 6, 15)),
+            None,
+        ),
+        "get_plans_performance_series": (
+            lambda db: crud.get_plans_performance_series(
+                db, [series_start + timedelta(days=day) for day in range(30)]
+            ),
+            None,
+        ),
+        "get_cohorts": (lambda db: crud.get_cohorts(db), None),
+        "insert_plans": (_insert_plans, _delete_inserted_plans),
+    }
+
+
+def _schema_fingerprint() -> str:
+    # База перегенеровується, якщо змінилася схема таблиць
+    schema = sorted(
+        (table.name, column.name, str(column.type))
+        for table in Base.metadata.sorted_tables
+        for column in table.columns
+    )
+    return hashlib.sha1(repr(schema).encode()).hexdigest()[:8]
+
+
+def prepare_database(credits: int, seed: int):
+    """Повертає engine бази масштабу credits, генеруючи її за потреби."""
+    DATA_DIR.mkdir(exist_ok=True)
+    path = DATA_DIR / f"bench_{credits}_{seed}_{_schema_fingerprint()}.db"
+    fresh = not path.exists()
+    bind = create_db_engine(f"sqlite:///{path}")
+    if fresh:
+        started = time.perf_counter()
+        try:
+            generate_data.generate(bind, credits, seed=seed)
+        except BaseException:
+            bind.dispose()
+            path.unlink(missing_ok=True)
+            raise
+        print(f"Generated {path.name} in {time.perf_counter() - started:.1f}s")
+    return bind
+
+
+def measure(bind, call, cleanup=None, repeat: int = DEFAULT_REPEAT) -> dict:
+    """
+    Вимірює один виклик CRUD-функції.
+
+    Логіка:
+    - Перший виклик прогріває кеш сторінок БД і реєстр довідника
+    - Час - медіана repeat викликів, кількість запитів - з останнього
+    - Пік пам'яті - окремий виклик під tracemalloc
+
+    Повертає:
+    - Словник з seconds, queries, peak_kib
+    """
+    counter = {"count": 0}
+
+    def before_cursor_execute(*args):
+        counter["count"] += 1
+
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        with Session(bind) as db:
+
+            def run():
+                counter["count"] = 0
+                started = time.perf_counter()
+                call(db)
+                elapsed = time.perf_counter() - started
+                queries = counter["count"]
+                if cleanup:
+                    cleanup(db)
+                return elapsed, queries
+
+            run()
+            timings = []
+            for _ in range(repeat):
+                elapsed, queries = run()
+                timings.append(elapsed)
+
+            tracemalloc.start()
+            try:
+                call(db)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            if cleanup:
+                cleanup(db)
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+    return {
+        "seconds": round(statistics.median(timings), 6),
+        "queries": queries,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(results: dict, baseline: dict) -> list[str]:
+    """
+    Порівнює результати з baseline.
+
+    Повертає:
+    - Список описів регресій (порожній, якщо регресій немає)
+    """
+    regressions = []
+    for scale, functions in results.items():
+        for name, current in functions.items():
+            base = baseline.get(scale, {}).get(name)
+            if base is None:
+                continue
+            label = f"{name} @ {scale}"
+            if current["queries"] > base["queries"]:
+                regressions.append(
+                    f"{label}: queries {base['queries']} -> {current['queries']}"
+                )
+            if (
+                current["seconds"] > base["seconds"] * (1 + TIME_TOLERANCE)
+                and current["seconds"] - base["seconds"] > MIN_TIME_DELTA
+            ):
+                regressions.append(
+                    f"{label}: time {base['seconds']:.4f}s -> {current['seconds']:.4f}s"
+                )
+            if (
+                current["peak_kib"] > base["peak_kib"] * (1 + MEMORY_TOLERANCE)
+                and current["peak_kib"] - base["peak_kib"] > MIN_MEMORY_DELTA_KIB
+            ):
+                regressions.append(
+                    f"{label}: peak memory {base['peak_kib']} KiB -> {current['peak_kib']} KiB"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки CRUD-функцій")
+    parser.add_argument(
+        "--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="кількість кредитів"
+    )
+    parser.add_argument("--seed", type=int, default=generate_data.DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--only", nargs="+", help="лише вказані функції")
+    parser.add_argument("--output", type=Path, help="зберегти результати в JSON")
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="записати результати як baseline"
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for credits in args.scales:
+        bind = prepare_database(credits, args.seed)
+        scale = str(credits)
+        results[scale] = {}
+        for name, (call, cleanup) in scenarios(credits).items():
+            if args.only and name not in args.only:
+                continue
+            result = measure(bind, call, cleanup, repeat=args.repeat)
+            results[scale][name] = result
+            print(
+                f"{scale:>10} {name:<30} {result['seconds'] * 1000:9.2f} ms "
+                f"{result['queries']:4d} queries {result['peak_kib']:10.1f} KiB"
+            )
+        bind.dispose()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        baseline = (
+            json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        )
+        for scale, functions in results.items():
+            baseline.setdefault("results", {}).setdefault(scale, {}).update(functions)
+        baseline["environment"] = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sqlite_pragmas": config.DB_SQLITE_PRAGMAS,
+        }
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline updated: {BASELINE_PATH}")
+        return
+
+    if not BASELINE_PATH.exists():
+        print("No baseline, run with --update-baseline")
+        return
+    regressions = compare(results, json.loads(BASELINE_PATH.read_text())["results"])
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import copy
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from threading import Lock
+from typing import Iterable
+
+from pydantic import BaseModel
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from src import config, models
+
+
+# Кеш звітів у пам'яті процесу.
+#
+# Результат звіту зберігається разом з версіями даних років, від яких він
+# залежить. Будь-який запис кредитів, платежів чи планів збільшує версію
+# відповідних років, тому закешований звіт стає недійсним лише для цих років.
+# Кожен виклик отримує власну копію результату, тож зміна повернутого списку
+# не псує наступні влучання в кеш.
+
+
+class DataVersions:
+    """
+    Лічильники версій даних: загальний та окремо для кожного року.
+
+    bump(years) інвалідує лише звіти цих років, bump() без аргументів - усі.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._global = 0
+        self._years = {}
+        self._changes = 0
+
+    def bump(self, years: Iterable[int] | None = None):
+        with self._lock:
+            self._changes += 1
+            if years is None:
+                self._global += 1
+                return
+            for year in set(years):
+                self._years[year] = self._years.get(year, 0) + 1
+
+    def changes(self) -> int:
+        """Кількість змін даних будь-яких років з початку роботи процесу."""
+        with self._lock:
+            return self._changes
+
+    def snapshot(self, years: Iterable[int] | None) -> tuple:
+        """Версія даних років years; years=None - версія будь-яких змін."""
+        with self._lock:
+            if years is None:
+                return (self._changes,)
+            return (self._global,) + tuple(
+                (year, self._years.get(year, 0)) for year in sorted(set(years))
+            )
+
+
+class ReportCache:
+    """
+    LRU кеш з обмеженням розміру та часу життя записів.
+
+    Запис дійсний, якщо не минув ttl і версії даних не змінилися з моменту
+    розрахунку.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        """Повертає (True, значення) для дійсного запису, інакше (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_version, value = entry
+                if entry_version == version and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": config.REPORT_CACHE_ENABLED,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+data_versions = DataVersions()
+report_cache = ReportCache(
+    max_size=config.REPORT_CACHE_MAX_SIZE, ttl=config.REPORT_CACHE_TTL
+)
+
+
+def bump_data_version(years: Iterable[int] | None = None):
+    """Інвалідує закешовані звіти вказаних років (або всі, якщо years=None)."""
+    data_versions.bump(years)
+
+
+def cached_report(scope):
+    """
+    Декоратор CRUD-функції звіту: кешує результат за параметрами виклику.
+
+    Аргументи:
+    - scope: функція від аргументів звіту (без db), що повертає роки,
+      від даних яких залежить звіт, або None, якщо звіт залежить від усіх даних
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(db: Session, *args, **kwargs):
+            if not config.REPORT_CACHE_ENABLED:
+                return fn(db, *args, **kwargs)
+
+            key = (
+                fn.__name__,
+                id(db.get_bind()),
+                _freeze(args),
+                _freeze(sorted(kwargs.items())),
+            )
+            version = data_versions.snapshot(scope(*args, **kwargs))
+            found, value = report_cache.get(key, version)
+            if found:
+                return _copy(value)
+
+            value = fn(db, *args, **kwargs)
+            report_cache.set(key, version, _copy(value))
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def _copy(value):
+    """
+    Копія результату звіту: нові списки і моделі, спільні лише незмінні
+    значення (числа, рядки, дати). Дешевша за copy.deepcopy.
+    """
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, BaseModel):
+        copied = copy.copy(value)
+        for name, item in value.__dict__.items():
+            if isinstance(item, (list, BaseModel)):
+                copied.__dict__[name] = _copy(item)
+        return copied
+    return value
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+# Дати, що визначають рік, до якого належить запис
+_TRACKED_DATES = {
+    models.Credit: ("issuance_date",),
+    models.Payment: ("payment_date",),
+    models.Plan: ("period",),
+}
+_PENDING_YEARS = "report_cache_years"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_years(session, flush_context):
+    """Запам'ятовує роки кредитів, платежів і планів, змінених через ORM."""
+    years = session.info.setdefault(_PENDING_YEARS, set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        fields = _TRACKED_DATES.get(type(instance))
+        if not fields:
+            continue
+        state = inspect(instance)
+        for field in fields:
+            history = state.attrs[field].history
+            for value in (*history.added, *history.unchanged, *history.deleted):
+                if isinstance(value, date):
+                    years.add(value.year)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_written_years(session):
+    # Версії змінюються лише після commit, щоб паралельний запит не закешував
+    # звіт з даних, які ще можуть бути відкочені або ще не видимі
+    years = session.info.pop(_PENDING_YEARS, None)
+    if years:
+        bump_data_version(years)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_years(session):
+    session.info.pop(_PENDING_YEARS, None)
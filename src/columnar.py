@@ -0,0 +1,900 @@
+import logging
+import time
+from datetime import date
+from threading import Event, Lock, Thread
+from typing import NamedTuple
+from weakref import WeakKeyDictionary
+
+import numpy as np
+from sqlalchemy import String, event, func, inspect, select, type_coerce
+from sqlalchemy.orm import Session
+
+from src import config, models, rollups
+from src.cache import data_versions
+
+
+# Колонковий рушій звітів у пам'яті процесу (REPORT_BACKEND=columnar).
+#
+# Credits і Payments зберігаються як масиви NumPy: дати - datetime64[D],
+# суми - float64, типи платежів - int16. Для кожного ряду (source, type_id),
+# як у DailyLedger, масиви відсортовані за датою і мають накопичені суми, тож
+# звіти рахуються через searchsorted / bincount без запитів до бази.
+#
+# Масиви завантажуються один раз на engine і доповнюються рядками з id > max(id)
+# після запису через цей процес (версія даних src/cache.py); нові значення
+# вставляються у вже відсортовані ряди (Series.merged) без повного перерахунку.
+# Не частіше ніж раз на COLUMNAR_REFRESH_SECONDS count(*) і sum(id) рядків до
+# max(id) звіряються з базою: рядки паралельних транзакцій, закомічені пізніше за
+# рядки з більшим id, дозавантажуються за id. Зміна чи видалення вже завантажених
+# рядків через ORM, зникнення рядків у базі і кожні COLUMNAR_RELOAD_SECONDS (зміни
+# вже завантажених рядків іншими процесами) - повне перезавантаження.
+# Плани (кілька рядків на місяць) перечитуються повністю при кожному оновленні.
+# Застосунок запускає start_refresher: перше завантаження, звірка і повне
+# перезавантаження виконуються у фоновому потоці, новий знімок заміняє старий
+# атомарно, а поки знімка немає - звіти рахуються запитами до бази.
+# Для звіту по когортах (/cohorts) зберігаються також дати реєстрації
+# користувачів, власники кредитів, ознаки закриття кредитів і кредити платежів.
+# Кредити закриває зовнішня система прямо в базі, тому при кожній звірці ознаки
+# закриття перечитуються для всіх кредитів (id відкритих кредитів за частковим
+# індексом ix_credits_open_return_date); закриття через ORM цього процесу
+# оновлює ознаку лише цього кредиту одразу.
+
+logger = logging.getLogger("src.columnar")
+
+LOAD_BATCH_SIZE = 100_000
+# Скільки пропущених рядків дозавантажувати за id; більше - повне перезавантаження
+MAX_MISSING_ROWS = 10_000
+
+
+class PlanRow(NamedTuple):
+    """План у пам'яті (поля як у models.Plan)."""
+
+    id: int
+    period: date
+    category_id: int
+    sum: float
+
+
+class Series:
+    """
+    Ряд значень (видач або платежів одного типу), відсортований за датою,
+    з накопиченими сумами.
+    """
+
+    def __init__(self, days: np.ndarray, values: np.ndarray):
+        order = np.argsort(days, kind="stable")
+        self.days = days[order]
+        self.values = values[order]
+        self.cumulative = np.concatenate(([0.0], np.cumsum(self.values)))
+        # Кількість і сума за кожним місяцем від першого місяця ряду
+        months = self.days.astype("datetime64[M]").astype(np.int64)
+        self.first_month = int(months[0]) if len(months) else 0
+        self.month_counts = np.bincount(months - self.first_month)
+        self.month_sums = np.bincount(months - self.first_month, weights=self.values)
+
+    def merged(self, days: np.ndarray, values: np.ndarray) -> "Series":
+        """
+        Новий ряд з доданими значеннями; поточний ряд не змінюється.
+
+        Нові значення вставляються за датою (searchsorted) без пересортування
+        ряду, накопичені суми перераховуються від першої вставки, а місячні
+        підсумки доповнюються bincount лише нових значень.
+        """
+        if not len(days):
+            return self
+        if not len(self.days):
+            return Series(days, values)
+        order = np.argsort(days, kind="stable")
+        days, values = days[order], values[order]
+        positions = np.searchsorted(self.days, days, side="right")
+        start = int(positions[0])
+
+        merged = Series.__new__(Series)
+        merged.days = np.insert(self.days, positions, days)
+        merged.values = np.insert(self.values, positions, values)
+        merged.cumulative = np.empty(len(merged.values) + 1)
+        merged.cumulative[: start + 1] = self.cumulative[: start + 1]
+        merged.cumulative[start + 1 :] = self.cumulative[start] + np.cumsum(
+            merged.values[start:]
+        )
+
+        months = _months(days)
+        merged.first_month = min(self.first_month, int(months[0]))
+        end = max(self.first_month + len(self.month_counts), int(months[-1]) + 1)
+        shift = self.first_month - merged.first_month
+        merged.month_counts = np.zeros(end - merged.first_month, dtype=np.int64)
+        merged.month_sums = np.zeros(end - merged.first_month)
+        merged.month_counts[shift : shift + len(self.month_counts)] = self.month_counts
+        merged.month_sums[shift : shift + len(self.month_sums)] = self.month_sums
+        offsets = months - merged.first_month
+        merged.month_counts += np.bincount(offsets, minlength=len(merged.month_counts))
+        merged.month_sums += np.bincount(
+            offsets, weights=values, minlength=len(merged.month_sums)
+        )
+        return merged
+
+    def _bounds(self, date_from: date, date_to: date) -> tuple[int, int]:
+        low = np.searchsorted(self.days, np.datetime64(date_from, "D"), side="left")
+        high = np.searchsorted(self.days, np.datetime64(date_to, "D"), side="right")
+        return int(low), int(high)
+
+    def between(self, date_from: date, date_to: date) -> float:
+        """Сума значень за днями з проміжку [date_from; date_to]."""
+        if date_from > date_to:
+            return 0
+        low, high = self._bounds(date_from, date_to)
+        return float(self.cumulative[high] - self.cumulative[low])
+
+    def by_month(self, year: int) -> tuple[np.ndarray, np.ndarray]:
+        """Кількість і сума значень за місяцями року (масиви з 12 елементів)."""
+        counts = np.zeros(12, dtype=np.int64)
+        sums = np.zeros(12, dtype=np.float64)
+        # Індекс січня року в масивах місяців (місяці рахуються від 1970-01)
+        start = (year - 1970) * 12 - self.first_month
+        low, high = max(start, 0), min(start + 12, len(self.month_counts))
+        if low < high:
+            counts[low - start : high - start] = self.month_counts[low:high]
+            sums[low - start : high - start] = self.month_sums[low:high]
+        return counts, sums
+
+
+# Когорта рядка, для якого не знайдено користувача (кредит без user_id тощо)
+_NO_COHORT = np.iinfo(np.int64).min
+
+
+def _months(days: np.ndarray) -> np.ndarray:
+    """Номери місяців дат від 1970-01 (datetime64[M] як int64)."""
+    return days.astype("datetime64[M]").astype(np.int64)
+
+
+def _month_date(month: int) -> date:
+    return date(1970 + month // 12, month % 12 + 1, 1)
+
+
+def _lookup(keys: np.ndarray, values: np.ndarray, wanted: np.ndarray) -> np.ndarray:
+    """values[keys == wanted] для кожного wanted (keys відсортовані) або _NO_COHORT."""
+    if not len(keys):
+        return np.full(len(wanted), _NO_COHORT, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    return np.where(keys[positions] == wanted, values[positions], _NO_COHORT)
+
+
+def _group_by_cohort(cohorts: np.ndarray, months: np.ndarray, *weights) -> dict:
+    """
+    Кількість рядків і суми weights за парами (когорта, місяців від реєстрації).
+
+    Повертає:
+    - {(перше число місяця когорти, місяців від реєстрації): (кількість, *суми)}
+    """
+    known = cohorts != _NO_COHORT
+    cohorts, offsets = cohorts[known], months[known] - cohorts[known]
+    if not len(cohorts):
+        return {}
+    first_cohort, first_offset = cohorts.min(), offsets.min()
+    width = int(offsets.max() - first_offset) + 1
+    # Щільний номер комірки: когорти рядками, місяці від реєстрації - стовпцями
+    cells = (cohorts - first_cohort) * width + (offsets - first_offset)
+    counts = np.bincount(cells)
+    sums = [np.bincount(cells, weights=values[known]) for values in weights]
+    return {
+        (
+            _month_date(int(first_cohort + cell // width)),
+            int(first_offset + cell % width),
+        ): (int(counts[cell]), *(float(total[cell]) for total in sums))
+        for cell in np.flatnonzero(counts)
+    }
+
+
+class CohortColumns:
+    """
+    Колонки користувачів, кредитів і платежів для звіту по когортах реєстрації.
+
+    Масиви в порядку id; підсумки рахуються при першому зверненні
+    і зберігаються до наступного оновлення знімка.
+    """
+
+    def __init__(
+        self,
+        user_ids: np.ndarray,
+        user_days: np.ndarray,
+        credit_ids: np.ndarray,
+        credit_users: np.ndarray,
+        credit_days: np.ndarray,
+        credit_body: np.ndarray,
+        credit_closed: np.ndarray,
+        payment_credits: np.ndarray,
+        payment_days: np.ndarray,
+        payment_sums: np.ndarray,
+    ):
+        self.user_ids = user_ids
+        self.user_days = user_days
+        self.credit_ids = credit_ids
+        self.credit_users = credit_users
+        self.credit_days = credit_days
+        self.credit_body = credit_body
+        self.credit_closed = credit_closed
+        self.payment_credits = payment_credits
+        self.payment_days = payment_days
+        self.payment_sums = payment_sums
+        self._lock = Lock()
+        self._totals = None
+
+    def totals(self) -> tuple[dict, dict, dict]:
+        """
+        Підсумки за когортами (місяць реєстрації) і місяцями від реєстрації.
+
+        Повертає:
+        - {місяць когорти: кількість користувачів}
+        - {(місяць когорти, місяців від реєстрації): (кількість кредитів,
+          сума видач, кількість закритих)} за місяцем видачі
+        - {(місяць когорти, місяців від реєстрації): (кількість платежів, сума)}
+          за місяцем платежу
+        """
+        with self._lock:
+            if self._totals is None:
+                self._totals = self._compute()
+            return self._totals
+
+    def _compute(self) -> tuple[dict, dict, dict]:
+        user_months = _months(self.user_days)
+        credit_cohorts = _lookup(self.user_ids, user_months, self.credit_users)
+        payment_cohorts = _lookup(self.credit_ids, credit_cohorts, self.payment_credits)
+
+        cohorts, sizes = np.unique(user_months, return_counts=True)
+        users = {
+            _month_date(int(month)): int(size) for month, size in zip(cohorts, sizes)
+        }
+        credits = _group_by_cohort(
+            credit_cohorts,
+            _months(self.credit_days),
+            self.credit_body,
+            self.credit_closed.astype(np.float64),
+        )
+        payments = _group_by_cohort(
+            payment_cohorts, _months(self.payment_days), self.payment_sums
+        )
+        return users, credits, payments
+
+
+class ColumnarSnapshot:
+    """
+    Незмінний знімок даних для звітів.
+
+    Атрибути:
+    - series: {(source, type_id): Series} - ряди видач (SOURCE_CREDIT, NO_TYPE)
+      і платежів кожного типу (SOURCE_PAYMENT, type_id)
+    - typed_payments: Series усіх платежів з типом (для річного звіту)
+    - plans: плани у порядку id
+    - cohorts: CohortColumns для звіту по когортах (None, якщо знімок
+      не містить користувачів, як Parquet-знімки)
+    """
+
+    def __init__(
+        self,
+        series: dict,
+        typed_payments: Series,
+        plans: list[PlanRow],
+        cohorts: CohortColumns | None = None,
+    ):
+        self.series = series
+        self.typed_payments = typed_payments
+        self.plans = plans
+        self.cohorts = cohorts
+
+    def merged(
+        self,
+        credit_days: np.ndarray,
+        credit_body: np.ndarray,
+        payment_days: np.ndarray,
+        payment_types: np.ndarray,
+        payment_sums: np.ndarray,
+        plans: list[PlanRow],
+    ) -> "ColumnarSnapshot":
+        """
+        Новий знімок з доданими кредитами і платежами (аргументи як у
+        build_snapshot); ряди без нових значень спільні з цим знімком.
+        """
+        series = dict(self.series)
+        credit_key = (rollups.SOURCE_CREDIT, rollups.NO_TYPE)
+        series[credit_key] = series[credit_key].merged(credit_days, credit_body)
+        for type_id in np.unique(payment_types):
+            mask = payment_types == type_id
+            key = (rollups.SOURCE_PAYMENT, int(type_id))
+            if key in series:
+                series[key] = series[key].merged(payment_days[mask], payment_sums[mask])
+            else:
+                series[key] = Series(payment_days[mask], payment_sums[mask])
+        typed = payment_types != rollups.NO_TYPE
+        return ColumnarSnapshot(
+            series,
+            self.typed_payments.merged(payment_days[typed], payment_sums[typed]),
+            plans,
+        )
+
+    def monthly_totals(self, year: int) -> tuple[dict, dict]:
+        """
+        Видачі та платежі за місяцями року.
+
+        Повертає:
+        - Два словники {номер місяця: (кількість, сума)}: видачі та платежі з типом
+        """
+        result = []
+        for series in (
+            self.series.get((rollups.SOURCE_CREDIT, rollups.NO_TYPE)),
+            self.typed_payments,
+        ):
+            by_month = {}
+            if series is not None:
+                counts, sums = series.by_month(year)
+                for index in np.flatnonzero(counts):
+                    by_month[int(index) + 1] = (int(counts[index]), float(sums[index]))
+            result.append(by_month)
+        return result[0], result[1]
+
+    def plans_between(self, period_from: date, period_to: date) -> list[PlanRow]:
+        """Плани з категорією за місяці з проміжку [period_from; period_to)."""
+        return [
+            plan
+            for plan in self.plans
+            if period_from <= plan.period < period_to and plan.category_id is not None
+        ]
+
+
+def build_snapshot(
+    credit_days: np.ndarray,
+    credit_body: np.ndarray,
+    payment_days: np.ndarray,
+    payment_types: np.ndarray,
+    payment_sums: np.ndarray,
+    plans: list[PlanRow],
+) -> ColumnarSnapshot:
+    """
+    Будує знімок з колонок кредитів і платежів.
+
+    Аргументи:
+    - credit_days, credit_body: дати видачі (datetime64[D]) і суми кредитів
+    - payment_days, payment_types, payment_sums: дати, типи (NO_TYPE для
+      платежів без типу) і суми платежів
+    - plans: плани у порядку id
+    """
+    series = {
+        (rollups.SOURCE_CREDIT, rollups.NO_TYPE): Series(credit_days, credit_body)
+    }
+    for type_id in np.unique(payment_types):
+        mask = payment_types == type_id
+        series[rollups.SOURCE_PAYMENT, int(type_id)] = Series(
+            payment_days[mask], payment_sums[mask]
+        )
+    typed = payment_types != rollups.NO_TYPE
+    return ColumnarSnapshot(
+        series, Series(payment_days[typed], payment_sums[typed]), plans
+    )
+
+
+def _iso_date(column):
+    # Без перетворення в datetime.date: NumPy розбирає рядки ISO (SQLite) на
+    # порядок швидше, а об'єкти date (інші драйвери) приймає так само
+    return type_coerce(column, String)
+
+
+# Таблиці в пам'яті: {назва: (модель, (назва масиву, колонка, dtype масиву))};
+# кожна таблиця має також масив ids у порядку id
+_TABLES = {
+    "users": (
+        models.User,
+        (("days", _iso_date(models.User.registration_date), "datetime64[D]"),),
+    ),
+    "credits": (
+        models.Credit,
+        (
+            ("users", func.coalesce(models.Credit.user_id, -1), np.int64),
+            ("days", _iso_date(models.Credit.issuance_date), "datetime64[D]"),
+            ("body", models.Credit.body, np.float64),
+            ("closed", models.Credit.actual_return_date.is_not(None), np.bool_),
+        ),
+    ),
+    "payments": (
+        models.Payment,
+        (
+            ("credits", func.coalesce(models.Payment.credit_id, -1), np.int64),
+            ("days", _iso_date(models.Payment.payment_date), "datetime64[D]"),
+            (
+                "types",
+                func.coalesce(models.Payment.type_id, rollups.NO_TYPE),
+                np.int16,
+            ),
+            ("sums", models.Payment.sum, np.float64),
+        ),
+    ),
+}
+
+
+def _empty_tables() -> dict:
+    return {
+        name: {
+            "ids": np.array([], dtype=np.int64),
+            **{key: np.array([], dtype=dtype) for key, _, dtype in columns},
+        }
+        for name, (_, columns) in _TABLES.items()
+    }
+
+
+def _max_id(table: dict) -> int:
+    return int(table["ids"][-1]) if len(table["ids"]) else 0
+
+
+def _connection(db):
+    # Core-з'єднання: рядки без накладних витрат ORM-виконання сесії
+    return db.connection() if isinstance(db, Session) else db
+
+
+class ColumnarStore:
+    """
+    Масиви користувачів, кредитів і платежів одного engine та їх знімок для звітів.
+
+    Масиви зберігаються в порядку id; нові рядки вставляються в копії масивів
+    і доповнюють знімок (ColumnarSnapshot.merged), а повне перезавантаження
+    будує новий стан окремо. Знімок заміняється атомарно, тож звіти читають
+    його без блокувань.
+    """
+
+    def __init__(self):
+        # _lock - зміна масивів і знімка, _refresh_lock - одна звірка з базою
+        # або одне повне перезавантаження одночасно
+        self._lock = Lock()
+        self._refresh_lock = Lock()
+        self._wake = Event()
+        self._stopped = Event()
+        self.refresher = None
+        self.snapshot = None
+        self.version = None
+        self.refreshed_at = 0.0
+        self.loaded_at = 0.0
+        # Лічильники змін завантажених рядків через ORM: усього і на момент
+        # останнього повного завантаження
+        self.rewrites = 0
+        self.loaded_rewrites = 0
+        # id кредитів, закритих або відкритих знову після завантаження
+        self.closures_pending = set()
+        # Закриття, застосовані до старого стану під час повного перезавантаження
+        self._applied_closures = None
+        self.tables = _empty_tables()
+
+    @property
+    def reload_pending(self) -> bool:
+        return self.rewrites != self.loaded_rewrites
+
+    def is_current(self) -> bool:
+        """Чи містить знімок усі записи через цей процес."""
+        return (
+            self.snapshot is not None
+            and not self.reload_pending
+            and not self.closures_pending
+            and self.version == data_versions.changes()
+        )
+
+    def is_due(self) -> bool:
+        """Чи настав час звірки з базою (записи інших процесів)."""
+        return time.monotonic() - self.refreshed_at >= config.COLUMNAR_REFRESH_SECONDS
+
+    def append(self, db) -> ColumnarSnapshot:
+        """
+        Дозавантажує рядки з id > max(id) і закриття кредитів через цей процес.
+
+        Аргументи:
+        - db: сесія або з'єднання бази даних
+        """
+        db = _connection(db)
+        with self._lock:
+            if not self.is_current():
+                self._append(db)
+            return self.snapshot
+
+    def refresh(self, db) -> ColumnarSnapshot:
+        """
+        Звіряє масиви з базою і повертає актуальний знімок.
+
+        Аргументи:
+        - db: сесія або з'єднання бази даних
+
+        Логіка:
+        - Перше звернення, зміна завантажених рядків через ORM або
+          COLUMNAR_RELOAD_SECONDS від останнього завантаження - повне
+          перезавантаження (_reload)
+        - Інакше count(*) і sum(id) рядків до max(id) кожної таблиці
+          порівнюються з масивами; пропущені рядки дозавантажуються за id,
+          а зникнення рядків у базі - повне перезавантаження
+        - Далі дозавантажуються нові рядки (id > max(id)) і перечитуються
+          ознаки закриття всіх кредитів
+        """
+        db = _connection(db)
+        with self._refresh_lock:
+            reload = (
+                self.snapshot is None
+                or self.reload_pending
+                or time.monotonic() - self.loaded_at >= config.COLUMNAR_RELOAD_SECONDS
+            )
+            missing = None if reload else self._find_missing(db)
+            if missing is None:
+                self._reload(db)
+            else:
+                with self._lock:
+                    self._append(db, missing, all_closures=True)
+            self.refreshed_at = time.monotonic()
+            return self.snapshot
+
+    def _find_missing(self, db) -> dict | None:
+        """
+        Id рядків до max(id), яких немає в масивах: {назва таблиці: id}.
+
+        Повертає None, якщо потрібне повне перезавантаження: у базі немає
+        завантажених рядків або пропущених рядків більше за MAX_MISSING_ROWS.
+        """
+        with self._lock:
+            loaded = {name: table["ids"] for name, table in self.tables.items()}
+        missing = {}
+        for name, ids in loaded.items():
+            model = _TABLES[name][0]
+            missing[name] = ids[:0]
+            if not len(ids):
+                continue
+            max_id = int(ids[-1])
+            count, total = db.execute(
+                select(func.count(), func.coalesce(func.sum(model.id), 0)).where(
+                    model.id <= max_id
+                )
+            ).one()
+            if (count, total) == (len(ids), int(ids.sum())):
+                continue
+            if count < len(ids):
+                return None
+            present = np.fromiter(
+                db.execute(select(model.id).where(model.id <= max_id)).scalars(),
+                dtype=np.int64,
+            )
+            gaps = np.setdiff1d(present, ids, assume_unique=True)
+            if len(gaps) > MAX_MISSING_ROWS or len(present) - len(gaps) != len(ids):
+                return None
+            missing[name] = gaps
+        return missing
+
+    def _reload(self, db):
+        """
+        Завантажує всі рядки в новий стан і заміняє ним поточний.
+
+        Читання йде без self._lock, тож запити тим часом дозавантажують нові
+        рядки в старий стан; після заміни вони дозавантажуються в новий.
+        """
+        rewrites = self.rewrites
+        with self._lock:
+            self._applied_closures = set()
+        fresh = ColumnarStore()
+        with fresh._lock:
+            fresh._append(db)
+        with self._lock:
+            self.tables = fresh.tables
+            self.snapshot = fresh.snapshot
+            self.version = fresh.version
+            self.loaded_rewrites = rewrites
+            self.loaded_at = time.monotonic()
+            # Закриття могли потрапити лише в старий стан - перечитуємо їх
+            self.closures_pending |= self._applied_closures
+            self._applied_closures = None
+            self._append(db)
+
+    def _append(self, db, missing: dict | None = None, all_closures: bool = False):
+        """
+        Дозавантажує пропущені (missing) і нові рядки, закриття кредитів
+        (усіх, якщо all_closures) і плани та заміняє знімок. Викликається
+        з self._lock.
+        """
+        # Версія фіксується до читання: запис під час читання - ще одне оновлення
+        version = data_versions.changes()
+        added = {}
+        for name, (model, columns) in _TABLES.items():
+            parts = []
+            gaps = missing.get(name) if missing else None
+            if gaps is not None and len(gaps):
+                condition = model.id.in_(gaps.tolist())
+                parts.append(_load_columns(db, model, columns, condition))
+            max_id = _max_id(self.tables[name])
+            parts.append(_load_columns(db, model, columns, model.id > max_id))
+            added[name] = {
+                key: np.concatenate([part[key] for part in parts]) for key in parts[0]
+            }
+        closures, self.closures_pending = self.closures_pending, set()
+        if self._applied_closures is not None:
+            self._applied_closures |= closures
+        plans = [
+            PlanRow(*row)
+            for row in db.execute(
+                select(
+                    models.Plan.id,
+                    models.Plan.period,
+                    models.Plan.category_id,
+                    models.Plan.sum,
+                ).order_by(models.Plan.id)
+            )
+        ]
+
+        changed = any(len(rows["ids"]) for rows in added.values())
+        for name, rows in added.items():
+            table = self.tables[name]
+            if len(rows["ids"]):
+                positions = np.searchsorted(table["ids"], rows["ids"])
+                self.tables[name] = {
+                    key: np.insert(values, positions, rows[key])
+                    for key, values in table.items()
+                }
+        if all_closures:
+            closures_changed = self._reload_closures(db)
+        else:
+            closures_changed = bool(closures) and self._reload_closures(db, closures)
+
+        credits, payments = added["credits"], added["payments"]
+        if self.snapshot is None:
+            credits, payments = self.tables["credits"], self.tables["payments"]
+            snapshot = build_snapshot(
+                credits["days"],
+                credits["body"],
+                payments["days"],
+                payments["types"],
+                payments["sums"],
+                plans,
+            )
+        else:
+            snapshot = self.snapshot.merged(
+                credits["days"],
+                credits["body"],
+                payments["days"],
+                payments["types"],
+                payments["sums"],
+                plans,
+            )
+        if changed or closures_changed or self.snapshot is None:
+            users, credits, payments = (
+                self.tables["users"],
+                self.tables["credits"],
+                self.tables["payments"],
+            )
+            snapshot.cohorts = CohortColumns(
+                users["ids"],
+                users["days"],
+                credits["ids"],
+                credits["users"],
+                credits["days"],
+                credits["body"],
+                credits["closed"],
+                payments["credits"],
+                payments["days"],
+                payments["sums"],
+            )
+        else:
+            snapshot.cohorts = self.snapshot.cohorts
+        self.snapshot = snapshot
+        self.version = version
+
+    def _reload_closures(self, db, credit_ids: set | None = None) -> bool:
+        """
+        Перечитує ознаку закриття кредитів credit_ids (None - усіх
+        завантажених) у нову копію масиву.
+
+        Повертає:
+        - True, якщо хоча б одна ознака змінилася
+        """
+        credits = self.tables["credits"]
+        if credit_ids is None:
+            # Відкритих кредитів менше, і їх id є в частковому індексі
+            open_ids = np.fromiter(
+                db.execute(
+                    select(models.Credit.id).where(
+                        models.Credit.actual_return_date.is_(None)
+                    )
+                ).scalars(),
+                dtype=np.int64,
+            )
+            closed = ~np.isin(credits["ids"], open_ids)
+        else:
+            closed = credits["closed"].copy()
+            rows = db.execute(
+                select(models.Credit.id, models.Credit.actual_return_date.is_not(None))
+                .where(models.Credit.id.in_(sorted(credit_ids)))
+                .where(models.Credit.id <= _max_id(credits))
+            )
+            for credit_id, is_closed in rows:
+                position = np.searchsorted(credits["ids"], credit_id)
+                if credits["ids"][position] == credit_id:
+                    closed[position] = bool(is_closed)
+        if np.array_equal(closed, credits["closed"]):
+            return False
+        self.tables["credits"] = {**credits, "closed": closed}
+        return True
+
+    def start_refresher(self, engine):
+        """
+        Запускає фоновий потік, що раз на COLUMNAR_REFRESH_SECONDS (або одразу
+        після wake) викликає refresh через нове з'єднання engine.
+        """
+        with self._lock:
+            if self.refresher is not None:
+                return
+            self._stopped.clear()
+            self.refresher = Thread(
+                target=self._run_refresher,
+                args=(engine,),
+                name="columnar-refresh",
+                daemon=True,
+            )
+        self.refresher.start()
+
+    def stop_refresher(self):
+        """Зупиняє фоновий потік і чекає завершення поточного оновлення."""
+        refresher = self.refresher
+        if refresher is None:
+            return
+        self._stopped.set()
+        self._wake.set()
+        refresher.join()
+        self.refresher = None
+
+    def wake(self):
+        """Просить фоновий потік оновити знімок, не чекаючи інтервалу."""
+        self._wake.set()
+
+    def _run_refresher(self, engine):
+        while not self._stopped.is_set():
+            try:
+                with engine.connect() as connection:
+                    self.refresh(connection)
+            except Exception:
+                logger.exception("columnar refresh failed")
+            self._wake.wait(config.COLUMNAR_REFRESH_SECONDS)
+            self._wake.clear()
+
+
+def _load_columns(db, model, columns, condition) -> dict:
+    """
+    Читає рядки за умовою condition у порядку id пачками по LOAD_BATCH_SIZE.
+
+    Аргументи:
+    - columns: трійки (назва масиву, колонка, dtype масиву)
+
+    Повертає:
+    - {"ids": id, назва масиву: масив} для кожної з columns
+    """
+    keys = ["ids", *(key for key, _, _ in columns)]
+    dtypes = [np.int64, *(dtype for _, _, dtype in columns)]
+    result = db.execute(
+        select(model.id, *(column for _, column, _ in columns))
+        .where(condition)
+        .order_by(model.id)
+        .execution_options(yield_per=LOAD_BATCH_SIZE)
+    )
+    parts = [[] for _ in dtypes]
+    for batch in result.partitions():
+        for index, values in enumerate(zip(*batch)):
+            parts[index].append(np.array(values, dtype=dtypes[index]))
+    return {
+        key: np.concatenate(chunks) if chunks else np.array([], dtype=dtype)
+        for key, chunks, dtype in zip(keys, parts, dtypes)
+    }
+
+
+_stores = WeakKeyDictionary()
+_stores_lock = Lock()
+
+
+def _engine_of(db):
+    # Масиви спільні для всіх сесій і з'єднань одного engine
+    return db.get_bind() if isinstance(db, Session) else db.engine
+
+
+def _store_for(engine) -> ColumnarStore:
+    with _stores_lock:
+        store = _stores.get(engine)
+        if store is None:
+            store = _stores[engine] = ColumnarStore()
+        return store
+
+
+def get_snapshot(db) -> ColumnarSnapshot | None:
+    """
+    Повертає актуальний знімок колонкових даних для engine сесії або з'єднання.
+
+    Логіка:
+    - З фоновим оновленням (start_refresher) запит лише дозавантажує рядки,
+      записані цим процесом; поки знімок ще не завантажено або чекає повного
+      перезавантаження після зміни рядків через ORM - повертає None
+    - Без фонового оновлення (скрипти, тести) звірка і завантаження
+      виконуються в запиті: перше звернення завантажує всі дані, наступні -
+      лише нові й пропущені рядки
+
+    Повертає:
+    - ColumnarSnapshot або None, якщо звіт треба рахувати запитами до бази
+    """
+    store = _store_for(_engine_of(db))
+    if store.refresher is None:
+        if store.is_current() and not store.is_due():
+            return store.snapshot
+        return store.refresh(db)
+    if store.snapshot is None or store.reload_pending:
+        store.wake()
+        return None
+    if not store.is_current():
+        return store.append(db)
+    return store.snapshot
+
+
+def start_refresher(engine, load_engine=None) -> ColumnarStore:
+    """
+    Запускає фонове оновлення колонкових даних engine.
+
+    Аргументи:
+    - engine: engine, сесії якого читають знімок (для асинхронного - sync_engine)
+    - load_engine: синхронний engine для читання у фоновому потоці,
+      за замовчуванням engine
+    """
+    store = _store_for(engine)
+    store.start_refresher(load_engine or engine)
+    return store
+
+
+def stop_refreshers():
+    """Зупиняє фонове оновлення всіх engine (завершення застосунку)."""
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.stop_refresher()
+
+
+# Колонки, зміна яких у вже завантаженому рядку потребує повного перезавантаження
+_TRACKED = {
+    models.User: ("registration_date",),
+    models.Credit: ("issuance_date", "body", "user_id"),
+    models.Payment: ("payment_date", "type_id", "sum", "credit_id"),
+}
+_RELOAD_PENDING = "columnar_reload"
+_CLOSURES_PENDING = "columnar_closures"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_rewrites(session, flush_context):
+    for instance in session.deleted:
+        if type(instance) in _TRACKED:
+            session.info[_RELOAD_PENDING] = True
+            return
+    for instance in session.dirty:
+        fields = _TRACKED.get(type(instance))
+        if not fields:
+            continue
+        state = inspect(instance)
+        if any(state.attrs[field].history.has_changes() for field in fields):
+            session.info[_RELOAD_PENDING] = True
+            return
+        if isinstance(instance, models.Credit) and (
+            state.attrs.actual_return_date.history.has_changes()
+        ):
+            session.info.setdefault(_CLOSURES_PENDING, set()).add(instance.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _reload_after_rewrites(session):
+    reload = session.info.pop(_RELOAD_PENDING, False)
+    closures = session.info.pop(_CLOSURES_PENDING, None)
+    if reload or closures:
+        with _stores_lock:
+            stores = list(_stores.values())
+        for store in stores:
+            with store._lock:
+                if reload:
+                    store.rewrites += 1
+                else:
+                    store.closures_pending |= closures
+            if reload:
+                store.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rewrites(session):
+    session.info.pop(_RELOAD_PENDING, None)
+    session.info.pop(_CLOSURES_PENDING, None)
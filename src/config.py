@@ -0,0 +1,79 @@
+import os
+from dotenv import load_dotenv
+
+
+# Налаштування застосунку зі змінних середовища (.env)
+
+load_dotenv()
+
+
+def _bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _int(name: str, default: int | None = None) -> int | None:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+# Підключення до БД
+DB_URL = os.getenv("DB_URL")
+# Асинхронний режим для endpoint'ів; скрипти й тести завжди синхронні
+DB_ASYNC = _bool("DB_ASYNC")
+DB_ASYNC_URL = os.getenv("DB_ASYNC_URL")
+# Логування кожного SQL-запиту (лише для налагодження)
+DB_ECHO = _bool("DB_ECHO")
+
+# Пул з'єднань; якщо не задано, діють значення за замовчуванням для діалекту
+DB_POOL_SIZE = _int("DB_POOL_SIZE")
+DB_MAX_OVERFLOW = _int("DB_MAX_OVERFLOW")
+DB_POOL_TIMEOUT = _int("DB_POOL_TIMEOUT")
+DB_POOL_RECYCLE = _int("DB_POOL_RECYCLE")
+DB_POOL_PRE_PING = _bool("DB_POOL_PRE_PING", default=True)
+
+# Обмеження часу виконання запиту в мілісекундах (MySQL, PostgreSQL); 0 - без обмеження
+DB_STATEMENT_TIMEOUT_MS = _int("DB_STATEMENT_TIMEOUT_MS", default=0)
+# PRAGMA для кожного нового з'єднання SQLite у форматі "name=value,name=value"
+DB_SQLITE_PRAGMAS = os.getenv(
+    "DB_SQLITE_PRAGMAS", "journal_mode=WAL,synchronous=NORMAL,busy_timeout=5000"
+)
+
+# Кеш звітів /year_performance та /plans_performance
+REPORT_CACHE_ENABLED = _bool("REPORT_CACHE_ENABLED", default=True)
+REPORT_CACHE_MAX_SIZE = _int("REPORT_CACHE_MAX_SIZE", default=256)
+REPORT_CACHE_TTL = _int("REPORT_CACHE_TTL", default=300)
+
+# Джерело даних звітів: "sql" - запити до агрегатів у базі,
+# "columnar" - масиви NumPy у пам'яті процесу (src/columnar.py),
+# "parquet" - знімки в SNAPSHOT_DIR для закритих років, інакше sql (src/snapshots.py)
+REPORT_BACKEND = os.getenv("REPORT_BACKEND", "sql").lower()
+# Як часто колонковий рушій перевіряє нові рядки, записані іншими процесами (секунди)
+COLUMNAR_REFRESH_SECONDS = _int("COLUMNAR_REFRESH_SECONDS", default=5)
+# Як часто колонковий рушій перечитує всі дані (зміни вже завантажених рядків
+# іншими процесами), секунди
+COLUMNAR_RELOAD_SECONDS = _int("COLUMNAR_RELOAD_SECONDS", default=3600)
+# Каталог Parquet-знімків (python -m src.utils.snapshot_parquet)
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+
+# Кількість рядків в одній транзакції POST /credits/bulk і /payments/bulk
+BULK_INGEST_BATCH_SIZE = _int("BULK_INGEST_BATCH_SIZE", default=1000)
+
+# Через скільки секунд реєстр довідника перечитується з бази
+DICTIONARY_REGISTRY_TTL = _int("DICTIONARY_REGISTRY_TTL", default=300)
+
+# Метрики запитів: заголовок Server-Timing і /metrics (формат Prometheus)
+METRICS_ENABLED = _bool("METRICS_ENABLED", default=True)
+# Поріг повільного SQL-запиту в мілісекундах для логу; 0 - лог вимкнено
+SLOW_QUERY_MS = _int("SLOW_QUERY_MS", default=0)
+# Максимальна довжина параметрів запиту в лозі
+SLOW_QUERY_MAX_PARAMS_LENGTH = _int("SLOW_QUERY_MAX_PARAMS_LENGTH", default=1000)
+
+# Профілювання запитів із заголовком "X-Profile: 1" або "?profile=1" (cProfile)
+PROFILING_ENABLED = _bool("PROFILING_ENABLED")
+# Директорія для файлів профілів (*.pstats)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
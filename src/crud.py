@@ -1,9 +1,14 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import and_, case, extract, func, literal_column, or_, tuple_
+import base64
+from bisect import bisect_right
+from collections import defaultdict
 from datetime import date, timedelta
 from typing import List
 
-from src import models
+from src import columnar, config, models, registry, rollups, snapshots
+from src.cache import bump_data_version, cached_report
+from src.database import build_upsert
 from src.schemas import schemas_logic
 
 
@@ -20,43 +25,251 @@ def get_user_credits(db: Session, user_id: int) -> schemas_logic.UserCreditsResp
         - Для відкритих: дні прострочки, сплачені тіло та відсотки
         - Для закритих: дата фактичного закриття та загальна сума платежів
     """
-    credits = db.query(models.Credit).filter(models.Credit.user_id == user_id).all()
-    response = []
+    # Суми платежів зберігаються в самих кредитах (src/rollups.py),
+    # тож достатньо одного запиту по індексу (user_id, issuance_date)
+    credits = (
+        db.query(models.Credit)
+        .filter(models.Credit.user_id == user_id)
+        .order_by(models.Credit.id)
+    )
 
-    for c in credits:
-        total_payments_sum = sum(p.sum for p in c.payments)
-        body_sum = sum(p.sum for p in c.payments if p.type.name.lower() == "тіло")
-        percent_sum = sum(
-            p.sum for p in c.payments if p.type.name.lower() == "відсотки"
+    today = date.today()
+    return [
+        _user_credit_item(
+            credit,
+            total_payments_sum=credit.paid_total,
+            body_payments_sum=credit.paid_body,
+            percent_payments_sum=credit.paid_percent,
+            today=today,
         )
+        for credit in credits
+    ]
+
+
+def _user_credit_item(
+    credit: models.Credit,
+    total_payments_sum: float,
+    body_payments_sum: float,
+    percent_payments_sum: float,
+    today: date,
+) -> schemas_logic.UserCreditClosed | schemas_logic.UserCreditOpen:
+    """Формує опис відкритого або закритого кредиту з уже підрахованих сум платежів."""
+    if credit.actual_return_date:
+        return schemas_logic.UserCreditClosed(
+            issuance_date=credit.issuance_date,
+            is_closed=True,
+            body=credit.body,
+            percent=credit.percent,
+            actual_return_date=credit.actual_return_date,
+            total_payments_sum=total_payments_sum,
+        )
+    return schemas_logic.UserCreditOpen(
+        issuance_date=credit.issuance_date,
+        is_closed=False,
+        body=credit.body,
+        percent=credit.percent,
+        return_date=credit.return_date,
+        overdue_days=max((today - credit.return_date).days, 0),
+        body_payments_sum=body_payments_sum,
+        percent_payments_sum=percent_payments_sum,
+    )
 
-        if c.actual_return_date:
-            item = schemas_logic.UserCreditClosed(
-                issuance_date=c.issuance_date,
-                is_closed=True,
-                body=c.body,
-                percent=c.percent,
-                actual_return_date=c.actual_return_date,
-                total_payments_sum=total_payments_sum,
-            )
-        else:
-            overdue_days = max((date.today() - c.return_date).days, 0)
-            item = schemas_logic.UserCreditOpen(
-                issuance_date=c.issuance_date,
-                is_closed=False,
-                body=c.body,
-                percent=c.percent,
-                return_date=c.return_date,
-                overdue_days=overdue_days,
-                body_payments_sum=body_sum,
-                percent_payments_sum=percent_sum,
+
+# Кількість ID користувачів в одному IN (ліміт параметрів SQLite - 999)
+USER_CREDITS_BATCH_CHUNK_SIZE = 500
+
+
+def get_users_credits(
+    db: Session, user_ids: List[int]
+) -> schemas_logic.UserCreditsBatchResponse:
+    """
+    Повертає кредити кількох користувачів, згруповані за користувачем.
+
+    Аргументи:
+    - db: сесія бази даних
+    - user_ids: ID користувачів
+
+    Логіка:
+    - Один запит "user_id IN (...)" на кожні USER_CREDITS_BATCH_CHUNK_SIZE
+      користувачів замість окремого запиту на кожного
+    - Суми платежів беруться з самих кредитів, як у get_user_credits
+
+    Повертає:
+    - Список {user_id, credits} у порядку user_ids (без повторів); користувачі
+      без кредитів - з порожнім списком
+    """
+    credits_by_user = {user_id: [] for user_id in user_ids}
+    unique_ids = list(credits_by_user)
+    today = date.today()
+
+    for start in range(0, len(unique_ids), USER_CREDITS_BATCH_CHUNK_SIZE):
+        chunk = unique_ids[start : start + USER_CREDITS_BATCH_CHUNK_SIZE]
+        credits = (
+            db.query(models.Credit)
+            .filter(models.Credit.user_id.in_(chunk))
+            .order_by(models.Credit.user_id, models.Credit.id)
+        )
+        for credit in credits:
+            credits_by_user[credit.user_id].append(
+                _user_credit_item(
+                    credit,
+                    total_payments_sum=credit.paid_total,
+                    body_payments_sum=credit.paid_body,
+                    percent_payments_sum=credit.paid_percent,
+                    today=today,
+                )
             )
-        response.append(item)
-    return response
+
+    return [
+        schemas_logic.UserCreditsBatchItem(user_id=user_id, credits=credits)
+        for user_id, credits in credits_by_user.items()
+    ]
+
+
+# Розмір сторінки кредитів користувача за замовчуванням і максимальний
+USER_CREDITS_PAGE_SIZE = 100
+USER_CREDITS_MAX_PAGE_SIZE = 1000
+
+
+def encode_credit_cursor(issuance_date: date, credit_id: int) -> str:
+    """Непрозорий курсор на позицію (дата видачі, id) у списку кредитів."""
+    raw = f"{issuance_date.isoformat()}|{credit_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_credit_cursor(cursor: str) -> tuple[date, int]:
+    """
+    Розбирає курсор encode_credit_cursor.
+
+    Помилки:
+    - ValueError: якщо курсор пошкоджений
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        issuance_date, credit_id = raw.split("|")
+        return date.fromisoformat(issuance_date), int(credit_id)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from error
+
+
+def get_user_credits_batch(
+    db: Session,
+    user_id: int,
+    limit: int,
+    after: tuple[date, int] | None = None,
+    status: schemas_logic.CreditStatus | None = None,
+) -> tuple[list, tuple[date, int] | None]:
+    """
+    Наступні limit кредитів користувача у порядку (дата видачі, id).
+
+    Аргументи:
+    - db: сесія бази даних
+    - user_id: ID користувача
+    - limit: максимальна кількість кредитів
+    - after: позиція (дата видачі, id), після якої починати; None - з початку
+    - status: лише відкриті або лише закриті кредити
+
+    Логіка:
+    - Keyset-умова (issuance_date, id) > after замість OFFSET: кожна сторінка -
+      один пошук по індексу (user_id, issuance_date) незалежно від її номера
+    - Читає limit + 1 рядок, щоб без окремого COUNT знати, чи є ще сторінки
+
+    Повертає:
+    - Кортеж (кредити, позиція останнього кредиту або None, якщо це кінець)
+    """
+    query = db.query(models.Credit).filter(models.Credit.user_id == user_id)
+    if after is not None:
+        query = query.filter(
+            tuple_(models.Credit.issuance_date, models.Credit.id) > tuple_(*after)
+        )
+    if status == schemas_logic.CreditStatus.open:
+        query = query.filter(models.Credit.actual_return_date.is_(None))
+    elif status == schemas_logic.CreditStatus.closed:
+        query = query.filter(models.Credit.actual_return_date.is_not(None))
+    credits = (
+        query.order_by(models.Credit.issuance_date, models.Credit.id)
+        .limit(limit + 1)
+        .all()
+    )
+
+    today = date.today()
+    items = [
+        _user_credit_item(
+            credit,
+            total_payments_sum=credit.paid_total,
+            body_payments_sum=credit.paid_body,
+            percent_payments_sum=credit.paid_percent,
+            today=today,
+        )
+        for credit in credits[:limit]
+    ]
+    last = credits[limit - 1] if len(credits) > limit else None
+    return items, (last.issuance_date, last.id) if last is not None else None
+
+
+def get_user_credits_page(
+    db: Session,
+    user_id: int,
+    limit: int = USER_CREDITS_PAGE_SIZE,
+    cursor: str | None = None,
+    status: schemas_logic.CreditStatus | None = None,
+) -> schemas_logic.UserCreditsPage:
+    """
+    Повертає сторінку кредитів користувача.
+
+    Аргументи:
+    - db: сесія бази даних
+    - user_id: ID користувача
+    - limit: розмір сторінки
+    - cursor: next_cursor попередньої сторінки; None - перша сторінка
+    - status: лише відкриті або лише закриті кредити
+
+    Повертає:
+    - Кредити сторінки (як у get_user_credits) та курсор наступної сторінки
+
+    Помилки:
+    - ValueError: якщо курсор пошкоджений
+    """
+    after = decode_credit_cursor(cursor) if cursor else None
+    items, last = get_user_credits_batch(
+        db, user_id, limit, after=after, status=status
+    )
+    return schemas_logic.UserCreditsPage(
+        items=items,
+        next_cursor=encode_credit_cursor(*last) if last is not None else None,
+    )
+
+
+def iter_user_credits(
+    db: Session,
+    user_id: int,
+    status: schemas_logic.CreditStatus | None = None,
+    batch_size: int = USER_CREDITS_PAGE_SIZE,
+):
+    """
+    Генератор усіх кредитів користувача сторінками по batch_size.
+
+    У пам'яті одночасно не більше однієї сторінки, між сторінками з'єднання
+    не утримує відкритий курсор.
+    """
+    after = None
+    while True:
+        items, after = get_user_credits_batch(
+            db, user_id, batch_size, after=after, status=status
+        )
+        yield from items
+        if after is None:
+            return
+
+
+# Кількість планів в одному INSERT при масовій вставці
+PLANS_INSERT_BATCH_SIZE = 1000
 
 
 def insert_plans(
-    db: Session, plan_items: List[schemas_logic.PlanInsertItem]
+    db: Session,
+    plan_items: List[schemas_logic.PlanInsertItem],
+    update_existing: bool = False,
 ) -> schemas_logic.PlanInsertResponse:
     """
     Імпортує плани в базу даних із списку об'єктів.
@@ -64,53 +277,220 @@ def insert_plans(
     Аргументи:
     - db: сесія бази даних
     - plan_items: список планів для вставки (дата, категорія, сума)
+    - update_existing: оновлювати суму вже існуючих планів замість пропуску
 
     Логіка:
+    - Категорії шукає в реєстрі довідника, уже існуючі плани - одним запитом
     - Пропускає плани, якщо категорія не знайдена
     - Пропускає плани, якщо вже існує запис з тією ж датою та категорією
+      (або оновлює його суму, якщо update_existing)
+    - Вставляє пачками через upsert по унікальному ключу (period, category_id),
+      тому паралельні завантаження не створюють дублікатів
 
     Повертає:
     - inserted_count: кількість успішно доданих планів
+    - updated_count: кількість оновлених планів
     - skipped: список пропущених записів
     - message: текстовий підсумок вставки
     """
-    inserted_count = 0
     skipped = []
 
+    dictionary = registry.get_registry(db)
+    names = {item.category_name for item in plan_items}
+    if any(dictionary.id_of(name) is None for name in names):
+        # Категорію могли додати в іншому процесі - перечитуємо довідник
+        dictionary = registry.load_registry(db)
+
+    rows = {}
     for item in plan_items:
-        category = (
-            db.query(models.Dictionary)
-            .filter(models.Dictionary.name == item.category_name)
-            .first()
-        )
-        if not category:
+        category_id = dictionary.id_of(item.category_name)
+        if category_id is None:
             skipped.append(f"{item.period} - {item.category_name} (Category not found)")
             continue
-
-        existing = (
-            db.query(models.Plan)
-            .filter(
-                models.Plan.period == item.period,
-                models.Plan.category_id == category.id,
+        key = (item.period, category_id)
+        if key in rows:
+            skipped.append(f"{item.period} - {item.category_name} (Duplicate in file)")
+            continue
+        rows[key] = {"period": item.period, "category_id": category_id, "sum": item.sum}
+
+    existing = set()
+    if rows:
+        existing = set(
+            db.query(models.Plan.period, models.Plan.category_id).filter(
+                models.Plan.period.in_({period for period, _ in rows}),
+                models.Plan.category_id.in_({category_id for _, category_id in rows}),
             )
-            .first()
         )
-        if existing:
-            skipped.append(f"{item.period} - {item.category_name}")
-            continue
 
-        plan = models.Plan(period=item.period, sum=item.sum, category_id=category.id)
-        db.add(plan)
-        inserted_count += 1
+    new_rows, updated_rows = [], []
+    for key, row in rows.items():
+        if key not in existing:
+            new_rows.append(row)
+        elif update_existing:
+            updated_rows.append(row)
+        else:
+            skipped.append(f"{row['period']} - {dictionary.name_of(row['category_id'])}")
+
+    plans_table = models.Plan.__table__
+    conflict_columns = ["period", "category_id"]
+    insert_stmt = build_upsert(db, plans_table, conflict_columns)
+    update_stmt = build_upsert(db, plans_table, conflict_columns, update_columns=["sum"])
+    for stmt, batch_rows in ((insert_stmt, new_rows), (update_stmt, updated_rows)):
+        for start in range(0, len(batch_rows), PLANS_INSERT_BATCH_SIZE):
+            db.execute(stmt, batch_rows[start : start + PLANS_INSERT_BATCH_SIZE])
 
     db.commit()
+    bump_data_version(row["period"].year for row in (*new_rows, *updated_rows))
+
+    inserted_count = len(new_rows)
+    updated_count = len(updated_rows)
+    message = f"{inserted_count} plans inserted, {len(skipped)} skipped"
+    if update_existing:
+        message = (
+            f"{inserted_count} plans inserted, {updated_count} updated, "
+            f"{len(skipped)} skipped"
+        )
     return schemas_logic.PlanInsertResponse(
         inserted_count=inserted_count,
+        updated_count=updated_count,
         skipped=skipped,
-        message=f"{inserted_count} plans inserted, {len(skipped)} skipped",
+        message=message,
     )
 
 
+class _CumulativeSums:
+    """
+    Накопичені суми одного ряду денного журналу (DailyLedger) за проміжок дат.
+
+    Сума за будь-який проміжок - різниця двох накопичених значень.
+    """
+
+    def __init__(self, rows):
+        # rows: відсортовані (day, sum, cumulative_sum)
+        self.days = [day for day, _, _ in rows]
+        self.cumulative = [cumulative for _, _, cumulative in rows]
+        # Накопичена сума до першого дня вибірки
+        self.baseline = rows[0][2] - rows[0][1] if rows else 0
+
+    def at(self, day: date) -> float:
+        """Накопичена сума по день day включно."""
+        index = bisect_right(self.days, day)
+        return self.cumulative[index - 1] if index else self.baseline
+
+    def between(self, date_from: date, date_to: date) -> float:
+        """Сума значень за днями з проміжку [date_from; date_to]."""
+        if date_from > date_to:
+            return 0
+        return self.at(date_to) - self.at(date_from - timedelta(days=1))
+
+
+def _ledger(db: Session, keys, date_from: date, date_to: date) -> dict:
+    """
+    Читає ряди денного журналу за проміжок [date_from; date_to] одним запитом.
+
+    Аргументи:
+    - keys: пари (source, type_id) потрібних рядів
+
+    Повертає:
+    - Словник {(source, type_id): _CumulativeSums}
+    """
+    table = models.DailyLedger
+    rows = defaultdict(list)
+    for source, type_id, day, day_sum, cumulative_sum in (
+        db.query(
+            table.source, table.type_id, table.day, table.sum, table.cumulative_sum
+        )
+        .filter(
+            # Окрема умова на кожен ряд - пошук по індексу (source, type_id, day)
+            or_(
+                *(
+                    and_(
+                        table.source == source,
+                        table.type_id == type_id,
+                        table.day >= date_from,
+                        table.day <= date_to,
+                    )
+                    for source, type_id in sorted(keys)
+                )
+            )
+        )
+        .order_by(table.source, table.type_id, table.day)
+    ):
+        rows[source, type_id].append((day, day_sum, cumulative_sum))
+    return {key: _CumulativeSums(series) for key, series in rows.items()}
+
+
+def _monthly_aggregates(db: Session, month_from: date, month_to: date):
+    """
+    Рядки місячних агрегатів (month, source, type_id, count, sum)
+    за місяці з проміжку [month_from; month_to).
+    """
+    table = models.MonthlyAggregate
+    return db.query(
+        table.month, table.source, table.type_id, table.count, table.sum
+    ).filter(table.month >= month_from, table.month < month_to)
+
+
+def _report_snapshot(db: Session, years) -> columnar.ColumnarSnapshot | None:
+    """
+    Колонкові дані для звіту за роки years за налаштуванням REPORT_BACKEND.
+
+    Повертає None, якщо звіт рахується запитами до бази: REPORT_BACKEND=sql,
+    колонковий знімок ще завантажується у фоні або parquet-знімок не покриває
+    ці роки чи застарів (snapshots.get_snapshot).
+    """
+    if config.REPORT_BACKEND == "columnar":
+        return columnar.get_snapshot(db)
+    if config.REPORT_BACKEND == "parquet":
+        return snapshots.get_snapshot(db, years)
+    return None
+
+
+def _monthly_totals(db: Session, period_start: date, period_end: date):
+    """
+    Видачі та платежі за місяцями з таблиці агрегатів (src/rollups.py) одним запитом.
+
+    Повертає:
+    - Два словники {номер місяця: (кількість, сума)}: видачі та платежі з типом
+    """
+    credits_by_month = {}
+    payments_by_month = {}
+    for month, source, type_id, count, total in _monthly_aggregates(
+        db, period_start, period_end
+    ):
+        if source == rollups.SOURCE_CREDIT:
+            target = credits_by_month
+        elif type_id != rollups.NO_TYPE:
+            # Платежі без типу у звіт не входять
+            target = payments_by_month
+        else:
+            continue
+        old_count, old_sum = target.get(month.month, (0, 0))
+        target[month.month] = (old_count + count, old_sum + total)
+    return credits_by_month, payments_by_month
+
+
+def _plan_sums_by_month(
+    db: Session, period_start: date, period_end: date, category_ids
+):
+    """
+    Суми планів (місяць, category_id, сума) одним GROUP BY по півінтервалу.
+
+    Категорії фільтруються за id з реєстру довідника, без JOIN.
+    """
+    plan_month = extract("month", models.Plan.period)
+    return (
+        db.query(plan_month, models.Plan.category_id, func.sum(models.Plan.sum))
+        .filter(
+            models.Plan.period >= period_start,
+            models.Plan.period < period_end,
+            models.Plan.category_id.in_(category_ids),
+        )
+        .group_by(plan_month, models.Plan.category_id)
+    )
+
+
+@cached_report(scope=lambda target_date: [target_date.year])
 def get_plans_performance(
     db: Session, target_date: date
 ) -> schemas_logic.PlansPerformanceResponse:
@@ -135,56 +515,114 @@ def get_plans_performance(
         - actual_sum: фактична сума
         - performance_percent: % виконання
     """
-    plans = (
-        db.query(models.Plan)
-        .filter(
-            extract("year", models.Plan.period) == target_date.year,
-            extract("month", models.Plan.period) == target_date.month,
-        )
-        .all()
-    )
-    response = []
+    # Кешується лише цей звіт: ряд рахується без власного запису в кеші
+    series = get_plans_performance_series.__wrapped__(db, [target_date])
+    return series[0].plans
 
-    for plan in plans:
-        category_name = plan.category.name
-        planned_sum = plan.sum
-        if category_name.lower() == "видача":
-            actual_sum = (
-                db.query(func.sum(models.Credit.body))
-                .filter(
-                    models.Credit.issuance_date >= plan.period,
-                    models.Credit.issuance_date <= target_date,
-                )
-                .scalar()
-                or 0
-            )
-        else:
-            actual_sum = (
-                db.query(func.sum(models.Payment.sum))
-                .join(models.Payment.type)
-                .filter(
-                    models.Payment.payment_date >= plan.period,
-                    models.Payment.payment_date <= target_date,
-                    models.Dictionary.name == category_name,
-                )
-                .scalar()
-                or 0
+
+@cached_report(scope=lambda target_dates: [d.year for d in target_dates])
+def get_plans_performance_series(
+    db: Session, target_dates: List[date]
+) -> schemas_logic.PlansPerformanceSeriesResponse:
+    """
+    Повертає виконання планів одразу для кількох дат (часовий ряд).
+
+    Аргументи:
+    - db: сесія бази даних
+    - target_dates: дати, до яких розраховується виконання планів
+
+    Логіка:
+    - Одним запитом вибирає плани всіх місяців, що покривають target_dates
+      (назви категорій - з реєстру довідника, без JOIN)
+    - Одним запитом читає з денного журналу (DailyLedger) накопичені суми
+      видач і платежів потрібних типів за проміжок дат; з REPORT_BACKEND=columnar
+      чи parquet плани й накопичені суми беруться з колонкових даних (_report_snapshot)
+    - Факт для кожної пари (план, дата) - різниця двох накопичених сум
+
+    Повертає:
+    - Список PlansPerformanceSeriesItem у порядку target_dates
+    """
+    if not target_dates:
+        return []
+
+    months = sorted({rollups.month_start(d) for d in target_dates})
+    period_from, period_to = months[0], rollups.next_month_start(months[-1])
+    snapshot = _report_snapshot(db, [d.year for d in target_dates])
+    if snapshot is not None:
+        plan_rows = snapshot.plans_between(period_from, period_to)
+    else:
+        plan_rows = (
+            db.query(models.Plan)
+            .filter(
+                models.Plan.period >= period_from,
+                models.Plan.period < period_to,
+                models.Plan.category_id.isnot(None),
             )
+            .order_by(models.Plan.id)
+            .all()
+        )
 
-        percent = (actual_sum / planned_sum * 100) if planned_sum > 0 else 0
+    dictionary = registry.get_registry(db)
+    if any(dictionary.name_of(plan.category_id) is None for plan in plan_rows):
+        dictionary = registry.load_registry(db)
+    plans = [
+        (plan, dictionary.name_of(plan.category_id))
+        for plan in plan_rows
+        if dictionary.name_of(plan.category_id) is not None
+    ]
+    if not plans:
+        return [
+            schemas_logic.PlansPerformanceSeriesItem(target_date=d, plans=[])
+            for d in target_dates
+        ]
+
+    # Факт для "видачі" - ряд видач журналу, для інших категорій - ряд
+    # платежів з type_id, що дорівнює category_id плану
+    def ledger_key(plan, category_name):
+        if category_name.lower() == registry.ISSUE:
+            return rollups.SOURCE_CREDIT, rollups.NO_TYPE
+        return rollups.SOURCE_PAYMENT, plan.category_id
+
+    if snapshot is not None:
+        ledger = snapshot.series
+    else:
+        ledger = _ledger(
+            db,
+            {ledger_key(plan, name) for plan, name in plans},
+            min(plan.period for plan, _ in plans),
+            max(target_dates),
+        )
 
-        response.append(
-            schemas_logic.PlanPerformanceItem(
-                period=plan.period,
-                category_name=category_name,
-                planned_sum=planned_sum,
-                actual_sum=actual_sum,
-                performance_percent=percent,
+    response = []
+    for target_date in target_dates:
+        month = rollups.month_start(target_date)
+        items = []
+        for plan, category_name in plans:
+            # Плани інших місяців ряду не стосуються цієї дати
+            if rollups.month_start(plan.period) != month:
+                continue
+
+            series = ledger.get(ledger_key(plan, category_name))
+            actual_sum = series.between(plan.period, target_date) if series else 0
+            planned_sum = plan.sum
+            percent = (actual_sum / planned_sum * 100) if planned_sum > 0 else 0
+
+            items.append(
+                schemas_logic.PlanPerformanceItem(
+                    period=plan.period,
+                    category_name=category_name,
+                    planned_sum=planned_sum,
+                    actual_sum=actual_sum,
+                    performance_percent=percent,
+                )
             )
+        response.append(
+            schemas_logic.PlansPerformanceSeriesItem(target_date=target_date, plans=items)
         )
     return response
 
 
+@cached_report(scope=lambda year: [year])
 def get_year_performance(
     db: Session, year: int
 ) -> schemas_logic.YearPerformanceResponse:
@@ -196,6 +634,8 @@ def get_year_performance(
     - year: рік для звіту
 
     Логіка:
+    - Видачі й платежі по місяцях - з таблиці агрегатів (REPORT_BACKEND=sql),
+      з масивів у пам'яті (columnar) або з Parquet-знімка закритого року (parquet)
     - Розраховує кількість видач і суму за планом для кожного місяця
     - Розраховує кількість платежів і суму за планом по "збору"
     - Обчислює % виконання плану по місяцях
@@ -215,81 +655,50 @@ def get_year_performance(
         - issue_share_percent: % суми видач за місяць від річної суми
         - collect_share_percent: % суми платежів за місяць від річної суми
     """
-    response = []
-
-    total_issue_year = (
-        db.query(func.sum(models.Credit.body))
-        .filter(extract("year", models.Credit.issuance_date) == year)
-        .scalar()
-        or 1
-    )
-    total_collect_year = (
-        db.query(func.sum(models.Payment.sum))
-        .join(models.Payment.type)
-        .filter(extract("year", models.Payment.payment_date) == year)
-        .scalar()
-        or 1
-    )
-
-    for month in range(1, 13):
-        period_start = date(year, month, 1)
-        period_end = (
-            date(year, month + 1, 1) - timedelta(days=1)
-            if month < 12
-            else date(year, 12, 31)
+    period_start = date(year, 1, 1)
+    period_end = date(year + 1, 1, 1)
+
+    dictionary = registry.get_registry(db)
+    issue_ids = set(dictionary.ids_containing(registry.ISSUE))
+    collect_ids = set(dictionary.ids_containing(registry.COLLECT))
+
+    snapshot = _report_snapshot(db, [year])
+    if snapshot is not None:
+        credits_by_month, payments_by_month = snapshot.monthly_totals(year)
+        plan_rows = [
+            (plan.period.month, plan.category_id, plan.sum)
+            for plan in snapshot.plans_between(period_start, period_end)
+        ]
+    else:
+        credits_by_month, payments_by_month = _monthly_totals(
+            db, period_start, period_end
         )
-
-        credits_query = db.query(models.Credit).filter(
-            models.Credit.issuance_date >= period_start,
-            models.Credit.issuance_date <= period_end,
-        )
-        credits_count = credits_query.count()
-        actual_issue_sum = (
-            credits_query.with_entities(func.sum(models.Credit.body)).scalar() or 0
+        plan_rows = _plan_sums_by_month(
+            db, period_start, period_end, issue_ids | collect_ids
         )
 
-        plan_issue_sum = (
-            db.query(func.sum(models.Plan.sum))
-            .join(models.Plan.category)
-            .filter(
-                extract("year", models.Plan.period) == year,
-                extract("month", models.Plan.period) == month,
-                models.Dictionary.name.ilike("%видача%"),
-            )
-            .scalar()
-            or 0
-        )
+    plans_by_month = {}
+    for month, category_id, plan_sum in plan_rows:
+        issue, collect = plans_by_month.get(int(month), (0, 0))
+        if category_id in issue_ids:
+            issue += plan_sum or 0
+        if category_id in collect_ids:
+            collect += plan_sum or 0
+        plans_by_month[int(month)] = (issue, collect)
+
+    total_issue_year = sum(s for _, s in credits_by_month.values()) or 1
+    total_collect_year = sum(s for _, s in payments_by_month.values()) or 1
+
+    response = []
+    for month in range(1, 13):
+        credits_count, actual_issue_sum = credits_by_month.get(month, (0, 0))
+        payments_count, actual_collect_sum = payments_by_month.get(month, (0, 0))
+        plan_issue_sum, plan_collect_sum = plans_by_month.get(month, (0, 0))
 
         issue_percent = (
             (actual_issue_sum / plan_issue_sum * 100) if plan_issue_sum else 0
         )
         issue_share = actual_issue_sum / total_issue_year * 100
-
-        payments_query = (
-            db.query(models.Payment)
-            .join(models.Payment.type)
-            .filter(
-                models.Payment.payment_date >= period_start,
-                models.Payment.payment_date <= period_end,
-            )
-        )
-        payments_count = payments_query.count()
-        actual_collect_sum = (
-            payments_query.with_entities(func.sum(models.Payment.sum)).scalar() or 0
-        )
-
-        plan_collect_sum = (
-            db.query(func.sum(models.Plan.sum))
-            .join(models.Plan.category)
-            .filter(
-                extract("year", models.Plan.period) == year,
-                extract("month", models.Plan.period) == month,
-                models.Dictionary.name.ilike("%збір%"),
-            )
-            .scalar()
-            or 0
-        )
-
         collect_percent = (
             (actual_collect_sum / plan_collect_sum * 100) if plan_collect_sum else 0
         )
@@ -312,3 +721,277 @@ def get_year_performance(
         )
 
     return response
+
+
+# Інтервали днів прострочення (від, до включно; None - без обмеження)
+OVERDUE_BUCKETS = [(1, 30), (31, 60), (61, 90), (91, None)]
+# Максимальна кількість користувачів у рейтингу боржників
+OVERDUE_MAX_TOP_N = 1000
+
+
+def _overdue_bucket_label(days_from: int, days_to: int | None) -> str:
+    return f"{days_from}-{days_to}" if days_to is not None else f"{days_from - 1}+"
+
+
+def _not_negative(value):
+    """max(value, 0) виразом CASE (однаково в усіх діалектах)."""
+    return case((value > 0, value), else_=0)
+
+
+def get_overdue_portfolio(
+    db: Session, as_of: date, top_n: int = 10
+) -> schemas_logic.OverduePortfolioResponse:
+    """
+    Повертає прострочений портфель станом на дату: розподіл за днями
+    прострочення і користувачів з найбільшим простроченим боргом.
+
+    Аргументи:
+    - db: сесія бази даних
+    - as_of: дата, від якої рахуються дні прострочення
+    - top_n: кількість користувачів у рейтингу (0 - без рейтингу)
+
+    Логіка:
+    - Прострочені - відкриті кредити (actual_return_date IS NULL) з
+      return_date < as_of; умова збігається з частковим індексом
+      ix_credits_open_return_date, тож закриті кредити не читаються
+    - Інтервал прострочення визначається CASE по return_date з межами,
+      порахованими в Python (без функцій різниці дат, що залежать від діалекту)
+    - Несплачений борг - body - paid_body і percent - paid_percent, кожен
+      доданок не менший за нуль: переплата одного кредиту не зменшує борг
+      інших (суми платежів зберігаються в кредитах, src/rollups.py)
+    - Інтервали - один GROUP BY, рейтинг - другий GROUP BY user_id з LIMIT
+
+    Повертає:
+    - OverduePortfolioResponse: підсумок, інтервали (усі, навіть порожні)
+      і top_n користувачів за несплаченим боргом
+    """
+    credit = models.Credit
+    overdue = and_(credit.actual_return_date.is_(None), credit.return_date < as_of)
+    unpaid_body = _not_negative(credit.body - credit.paid_body)
+    unpaid_percent = _not_negative(credit.percent - credit.paid_percent)
+    outstanding_body = func.sum(unpaid_body)
+    outstanding_percent = func.sum(unpaid_percent)
+
+    # Кредит з return_date = as_of - n прострочений на n днів
+    bucket = case(
+        *(
+            (credit.return_date >= as_of - timedelta(days=days_to), index)
+            for index, (_, days_to) in enumerate(OVERDUE_BUCKETS)
+            if days_to is not None
+        ),
+        else_=len(OVERDUE_BUCKETS) - 1,
+    )
+    # Групування за колонкою підзапиту: CASE з параметрами в GROUP BY
+    # PostgreSQL не вважає тим самим виразом, що й у SELECT
+    aged = (
+        db.query(
+            bucket.label("bucket"),
+            unpaid_body.label("body"),
+            unpaid_percent.label("percent"),
+        )
+        .filter(overdue)
+        .subquery()
+    )
+    totals = {
+        index: (count, body or 0, percent or 0)
+        for index, count, body, percent in db.query(
+            aged.c.bucket,
+            func.count(),
+            func.sum(aged.c.body),
+            func.sum(aged.c.percent),
+        ).group_by(aged.c.bucket)
+    }
+
+    buckets = []
+    for index, (days_from, days_to) in enumerate(OVERDUE_BUCKETS):
+        count, body, percent = totals.get(index, (0, 0, 0))
+        buckets.append(
+            schemas_logic.OverdueBucket(
+                bucket=_overdue_bucket_label(days_from, days_to),
+                days_from=days_from,
+                days_to=days_to,
+                credits_count=count,
+                outstanding_body=body,
+                outstanding_percent=percent,
+                outstanding_total=body + percent,
+            )
+        )
+
+    top_users = []
+    if top_n:
+        outstanding_total = (outstanding_body + outstanding_percent).label("total")
+        user_key = credit.user_id.label("user_id")
+        if db.get_bind().dialect.name == "sqlite":
+            # Вираз замість колонки: інакше SQLite групує за індексом
+            # (user_id, issuance_date), читаючи всі кредити, а не лише прострочені
+            user_key = (credit.user_id + literal_column("0")).label("user_id")
+        top = (
+            db.query(
+                user_key,
+                func.count().label("count"),
+                outstanding_body.label("body"),
+                outstanding_percent.label("percent"),
+                outstanding_total,
+                func.min(credit.return_date).label("oldest_return_date"),
+            )
+            .filter(overdue, credit.user_id.is_not(None))
+            .group_by(user_key)
+            .order_by(outstanding_total.desc(), user_key)
+            .limit(top_n)
+            .subquery()
+        )
+        for row in (
+            db.query(top, models.User.login)
+            .outerjoin(models.User, models.User.id == top.c.user_id)
+            .order_by(top.c.total.desc(), top.c.user_id)
+        ):
+            top_users.append(
+                schemas_logic.OverdueUser(
+                    user_id=row.user_id,
+                    login=row.login,
+                    credits_count=row.count,
+                    outstanding_body=row.body,
+                    outstanding_percent=row.percent,
+                    outstanding_total=row.total,
+                    max_overdue_days=(as_of - row.oldest_return_date).days,
+                )
+            )
+
+    return schemas_logic.OverduePortfolioResponse(
+        as_of=as_of,
+        credits_count=sum(item.credits_count for item in buckets),
+        outstanding_body=sum(item.outstanding_body for item in buckets),
+        outstanding_percent=sum(item.outstanding_percent for item in buckets),
+        outstanding_total=sum(item.outstanding_total for item in buckets),
+        buckets=buckets,
+        top_users=top_users,
+    )
+
+
+def _cohort_totals(db: Session) -> tuple[dict, dict, dict]:
+    """
+    Підсумки за когортами реєстрації з агрегатів CohortAggregates
+    (формат як у columnar.CohortColumns.totals).
+
+    Кількість закритих кредитів - видані мінус відкриті; відкриті кредити
+    читаються за частковим індексом ix_credits_open_return_date.
+    """
+    table, user, credit = models.CohortAggregate, models.User, models.Credit
+
+    def months_between(cohort, month):
+        return (month.year - cohort.year) * 12 + month.month - cohort.month
+
+    users, credits, payments = {}, {}, {}
+    for cohort, month, source, count, total in db.query(
+        table.cohort, table.month, table.source, table.count, table.sum
+    ).filter(table.count != 0):
+        key = cohort, months_between(cohort, month)
+        if source == rollups.SOURCE_USER:
+            users[cohort] = count
+        elif source == rollups.SOURCE_CREDIT:
+            credits[key] = (count, total, count)
+        else:
+            payments[key] = (count, total)
+
+    cohort = (
+        extract("year", user.registration_date),
+        extract("month", user.registration_date),
+    )
+    issue_month = (
+        extract("year", credit.issuance_date),
+        extract("month", credit.issuance_date),
+    )
+    for cohort_year, cohort_month, year, month, open_count in (
+        db.query(*cohort, *issue_month, func.count())
+        .join(user, user.id == credit.user_id)
+        .filter(credit.actual_return_date.is_(None))
+        .group_by(*cohort, *issue_month)
+    ):
+        key = date(int(cohort_year), int(cohort_month), 1), (
+            (int(year) - int(cohort_year)) * 12 + int(month) - int(cohort_month)
+        )
+        if key in credits:
+            count, body, closed = credits[key]
+            credits[key] = (count, body, closed - open_count)
+    return users, credits, payments
+
+
+@cached_report(scope=lambda: None)
+def get_cohorts(db: Session) -> schemas_logic.CohortsResponse:
+    """
+    Повертає звіт по когортах користувачів за місяцем реєстрації.
+
+    Аргументи:
+    - db: сесія бази даних
+
+    Логіка:
+    - Когорта - місяць Users.registration_date; видачі кредитів і платежі
+      користувачів когорти групуються за кількістю місяців від реєстрації
+      до місяця видачі / платежу
+    - REPORT_BACKEND=columnar - підрахунок bincount по масивах у пам'яті,
+      інакше (або поки масиви завантажуються у фоні) - агрегати когорт
+      CohortAggregates (src/rollups.py) і відкриті кредити за частковим індексом
+    - Частка закриття - % закритих (actual_return_date заповнена) кредитів
+      серед виданих за місяць
+    - Кредити без користувача і платежі без кредиту не враховуються
+
+    Повертає:
+    - Список CohortItem у порядку місяця реєстрації з підсумками когорти
+      і показниками за кожен місяць від реєстрації (periods)
+    """
+    snapshot = None
+    if config.REPORT_BACKEND == "columnar":
+        snapshot = columnar.get_snapshot(db)
+    if snapshot is not None:
+        users, credits, payments = snapshot.cohorts.totals()
+    else:
+        users, credits, payments = _cohort_totals(db)
+
+    # (когорта, місяців від реєстрації) -> [видачі, сума, закриті, платежі, сума]
+    cells = defaultdict(lambda: [0, 0.0, 0, 0, 0.0])
+    for cell, (count, body, closed) in credits.items():
+        cells[cell][:3] = int(count), body, int(closed)
+    for cell, (count, total) in payments.items():
+        cells[cell][3:] = int(count), total
+    periods = defaultdict(list)
+    for (cohort, months), values in sorted(cells.items()):
+        periods[cohort].append((months, values))
+
+    response = []
+    for cohort in sorted(set(users) | set(periods)):
+        items = [
+            schemas_logic.CohortPeriodItem(
+                months_since_registration=months,
+                credits_count=credits_count,
+                issued_body=issued,
+                payments_count=payments_count,
+                collected_sum=collected,
+                closed_count=closed,
+                closure_rate_percent=(
+                    closed / credits_count * 100 if credits_count else 0
+                ),
+            )
+            for months, (
+                credits_count,
+                issued,
+                closed,
+                payments_count,
+                collected,
+            ) in periods[cohort]
+        ]
+        credits_count = sum(item.credits_count for item in items)
+        closed_count = sum(item.closed_count for item in items)
+        response.append(
+            schemas_logic.CohortItem(
+                cohort=f"{cohort.month:02d}.{cohort.year}",
+                users_count=users.get(cohort, 0),
+                credits_count=credits_count,
+                issued_body=sum(item.issued_body for item in items),
+                collected_sum=sum(item.collected_sum for item in items),
+                closure_rate_percent=(
+                    closed_count / credits_count * 100 if credits_count else 0
+                ),
+                periods=items,
+            )
+        )
+    return response
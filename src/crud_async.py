@@ -0,0 +1,172 @@
+from datetime import date
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from src import crud, profiling
+from src.schemas import schemas_logic
+from src.utils import plans_import
+
+
+# Асинхронні версії CRUD-функцій.
+#
+# Логіка запитів живе в src/crud.py. Для AsyncSession функція виконується через
+# AsyncSession.run_sync на асинхронному драйвері без блокування event loop,
+# для звичайної Session - у пулі потоків, як це робив FastAPI для sync endpoint'ів.
+
+
+async def run(db: AsyncSession | Session, fn, *args, **kwargs):
+    """
+    Виконує синхронну функцію fn(session, *args, **kwargs) для сесії будь-якого типу.
+
+    Аргументи:
+    - db: асинхронна або синхронна сесія
+    - fn: функція, перший аргумент якої - синхронна сесія
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    # Потік пулу не потрапляє в профіль запиту - профілюється окремо
+    return await run_in_threadpool(profiling.in_worker(fn), db, *args, **kwargs)
+
+
+async def get_user_credits(
+    db: AsyncSession | Session, user_id: int
+) -> schemas_logic.UserCreditsResponse:
+    """Асинхронна версія crud.get_user_credits."""
+    return await run(db, crud.get_user_credits, user_id)
+
+
+async def get_users_credits(
+    db: AsyncSession | Session, user_ids: List[int]
+) -> schemas_logic.UserCreditsBatchResponse:
+    """Асинхронна версія crud.get_users_credits."""
+    return await run(db, crud.get_users_credits, user_ids)
+
+
+async def get_user_credits_page(
+    db: AsyncSession | Session,
+    user_id: int,
+    limit: int = crud.USER_CREDITS_PAGE_SIZE,
+    cursor: str | None = None,
+    status: schemas_logic.CreditStatus | None = None,
+) -> schemas_logic.UserCreditsPage:
+    """Асинхронна версія crud.get_user_credits_page."""
+    return await run(
+        db,
+        crud.get_user_credits_page,
+        user_id,
+        limit=limit,
+        cursor=cursor,
+        status=status,
+    )
+
+
+async def iter_user_credits(
+    db: AsyncSession | Session,
+    user_id: int,
+    status: schemas_logic.CreditStatus | None = None,
+    batch_size: int = crud.USER_CREDITS_PAGE_SIZE,
+):
+    """
+    Асинхронна версія crud.iter_user_credits.
+
+    Кожна сторінка читається окремим викликом run(), тож між сторінками
+    event loop вільний, а в пам'яті не більше однієї сторінки.
+    """
+    after = None
+    while True:
+        items, after = await run(
+            db,
+            crud.get_user_credits_batch,
+            user_id,
+            batch_size,
+            after=after,
+            status=status,
+        )
+        for item in items:
+            yield item
+        if after is None:
+            return
+
+
+async def insert_plans(
+    db: AsyncSession | Session,
+    plan_items: List[schemas_logic.PlanInsertItem],
+    update_existing: bool = False,
+) -> schemas_logic.PlanInsertResponse:
+    """Асинхронна версія crud.insert_plans."""
+    return await run(db, crud.insert_plans, plan_items, update_existing=update_existing)
+
+
+async def import_plans(
+    db: AsyncSession | Session,
+    rows,
+    chunk_size: int = plans_import.DEFAULT_CHUNK_SIZE,
+    update_existing: bool = False,
+) -> schemas_logic.PlanImportResponse:
+    """
+    Асинхронна версія plans_import.import_plans.
+
+    Читання файлу, розбір і валідація частин виконуються в пулі потоків, а через
+    run() до бази передається лише запис частини, тож event loop не блокується
+    ні парсингом файлу, ні валідацією рядків.
+    """
+    rows, by_category_id = await run_in_threadpool(
+        profiling.in_worker(plans_import.read_header), rows
+    )
+    category_names = None
+    if by_category_id:
+        category_names = await run(db, plans_import.load_category_names)
+
+    chunks = plans_import.parse_chunks(rows, chunk_size, category_names)
+    response = schemas_logic.PlanImportResponse(message="")
+    while True:
+        try:
+            parsed = await run_in_threadpool(profiling.in_worker(next), chunks, None)
+        except plans_import.PlanFileError as exc:
+            # Попередні частини вже збережені - повертаємо їх звіт разом з помилкою
+            response.error = str(exc)
+            break
+        if parsed is None:
+            break
+        report, items = parsed
+        report = await run(
+            db, plans_import.save_chunk, report, items, update_existing=update_existing
+        )
+        plans_import.add_chunk(response, report)
+    return plans_import.finish(response)
+
+
+async def get_plans_performance(
+    db: AsyncSession | Session, target_date: date
+) -> schemas_logic.PlansPerformanceResponse:
+    """Асинхронна версія crud.get_plans_performance."""
+    return await run(db, crud.get_plans_performance, target_date)
+
+
+async def get_plans_performance_series(
+    db: AsyncSession | Session, target_dates: List[date]
+) -> schemas_logic.PlansPerformanceSeriesResponse:
+    """Асинхронна версія crud.get_plans_performance_series."""
+    return await run(db, crud.get_plans_performance_series, target_dates)
+
+
+async def get_year_performance(
+    db: AsyncSession | Session, year: int
+) -> schemas_logic.YearPerformanceResponse:
+    """Асинхронна версія crud.get_year_performance."""
+    return await run(db, crud.get_year_performance, year)
+
+
+async def get_overdue_portfolio(
+    db: AsyncSession | Session, as_of: date, top_n: int = 10
+) -> schemas_logic.OverduePortfolioResponse:
+    """Асинхронна версія crud.get_overdue_portfolio."""
+    return await run(db, crud.get_overdue_portfolio, as_of, top_n=top_n)
+
+
+async def get_cohorts(db: AsyncSession | Session) -> schemas_logic.CohortsResponse:
+    """Асинхронна версія crud.get_cohorts."""
+    return await run(db, crud.get_cohorts)
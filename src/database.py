@@ -1,18 +1,254 @@
-import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import time
+from importlib.util import find_spec
+from threading import Lock
+from sqlalchemy import create_engine, event, exc, insert, make_url
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from contextlib import contextmanager
 
+from src import config
 
-load_dotenv()
 
-URL_DATABASE = os.getenv("DB_URL")
+URL_DATABASE = config.DB_URL
+
+# Асинхронний режим для endpoint'ів (DB_ASYNC=true). Скрипти й тести
+# завжди працюють через синхронний engine.
+DB_ASYNC = config.DB_ASYNC
+
+# Асинхронні драйвери для діалектів, якщо DB_ASYNC_URL не задано явно
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "mysql": "asyncmy",
+    "mariadb": "asyncmy",
+    "postgresql": "asyncpg",
+}
+
+# Параметри пулу за замовчуванням; pool_recycle менший за тайм-аут простою сервера
+POOL_DEFAULTS = {
+    "mysql": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30, "pool_recycle": 3600},
+    "mariadb": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30, "pool_recycle": 3600},
+    "postgresql": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30, "pool_recycle": 1800},
+    "sqlite": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": -1},
+}
+
+
+def to_async_url(url: str):
+    """
+    Замінює драйвер у URL бази на асинхронний (mysql+pymysql -> mysql+asyncmy).
+
+    Помилки:
+    - RuntimeError: якщо асинхронний драйвер діалекту не встановлено
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    driver = ASYNC_DRIVERS[backend]
+    if find_spec(driver) is None:
+        raise RuntimeError(
+            f"DB_ASYNC=true requires the {driver} driver for {backend}: "
+            f"pip install {driver} or set DB_ASYNC_URL"
+        )
+    return url.set(drivername=f"{backend}+{driver}")
+
+
+class PoolStats:
+    """
+    Лічильники пулу з'єднань одного engine.
+
+    Атрибути:
+    - checkouts: скільки разів з'єднання видавалось з пулу
+    - connects: скільки нових з'єднань відкрито до БД
+    - waits / wait_seconds_total / wait_seconds_max: час отримання з'єднання з пулу
+      (очікування вільного з'єднання або відкриття нового)
+    - timeouts: скільки разів пул не видав з'єднання за pool_timeout
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+
+class _WaitTimingPool:
+    """Домішка до QueuePool, що вимірює час очікування на вільне з'єднання."""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def _instrumented_pool_class(base, stats: PoolStats):
+    # Окремий клас на engine: pool.recreate() (engine.dispose) зберігає лічильники
+    return type(base.__name__, (_WaitTimingPool, base), {"stats": stats})
+
+
+def engine_options(url, stats: PoolStats, is_async: bool = False) -> dict:
+    """
+    Формує параметри create_engine з налаштувань src.config.
+
+    Логіка:
+    - echo вимкнений, якщо не задано DB_ECHO
+    - для MySQL/PostgreSQL і файлових SQLite - QueuePool з параметрами діалекту
+      (перевизначаються DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE)
+    - DB_STATEMENT_TIMEOUT_MS передається серверу при підключенні
+    """
+    url = make_url(url)
+    dialect = url.get_backend_name()
+    options = {"echo": config.DB_ECHO, "pool_pre_ping": config.DB_POOL_PRE_PING}
+
+    # SQLite у пам'яті живе в межах одного з'єднання - пул не налаштовуємо
+    if dialect != "sqlite" or url.database not in (None, "", ":memory:"):
+        pool = dict(POOL_DEFAULTS.get(dialect, POOL_DEFAULTS["postgresql"]))
+        overrides = {
+            "pool_size": config.DB_POOL_SIZE,
+            "max_overflow": config.DB_MAX_OVERFLOW,
+            "pool_timeout": config.DB_POOL_TIMEOUT,
+            "pool_recycle": config.DB_POOL_RECYCLE,
+        }
+        pool.update({key: value for key, value in overrides.items() if value is not None})
+        base = AsyncAdaptedQueuePool if is_async else QueuePool
+        options.update(pool, poolclass=_instrumented_pool_class(base, stats))
+
+    timeout = config.DB_STATEMENT_TIMEOUT_MS
+    if timeout:
+        if dialect in ("mysql", "mariadb"):
+            options["connect_args"] = {
+                "init_command": f"SET SESSION max_execution_time = {timeout}"
+            }
+        elif dialect == "postgresql" and is_async:
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(timeout)}
+            }
+        elif dialect == "postgresql":
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+
+    return options
+
+
+def _sqlite_pragmas() -> list[str]:
+    pragmas = []
+    for pragma in config.DB_SQLITE_PRAGMAS.split(","):
+        if pragma.strip():
+            name, _, value = pragma.partition("=")
+            pragmas.append(f"PRAGMA {name.strip()} = {value.strip()}")
+    return pragmas
+
+
+def _attach_listeners(sync_engine, stats: PoolStats):
+    """Лічильники пулу та PRAGMA для нових з'єднань SQLite."""
+    pragmas = _sqlite_pragmas() if sync_engine.dialect.name == "sqlite" else []
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.record_connect()
+        if pragmas:
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.record_checkout()
+
+
+def create_db_engine(url=None):
+    """Створює синхронний engine за налаштуваннями src.config."""
+    url = url or URL_DATABASE
+    stats = PoolStats()
+    db_engine = create_engine(url, **engine_options(url, stats))
+    db_engine.pool_stats = stats
+    _attach_listeners(db_engine, stats)
+    return db_engine
+
+
+def create_async_db_engine(url=None):
+    """Створює асинхронний engine за налаштуваннями src.config."""
+    url = url or config.DB_ASYNC_URL or to_async_url(URL_DATABASE)
+    stats = PoolStats()
+    db_engine = create_async_engine(url, **engine_options(url, stats, is_async=True))
+    db_engine.sync_engine.pool_stats = stats
+    _attach_listeners(db_engine.sync_engine, stats)
+    return db_engine
+
+
+def pool_status(db_engine) -> dict:
+    """
+    Поточний стан пулу з'єднань engine (синхронного або асинхронного).
+
+    Повертає:
+    - pool: клас пулу
+    - size, checked_in, checked_out, overflow: стан пулу (None, якщо пул їх не веде)
+    - checkouts, connects, waits, wait_seconds_total, wait_seconds_max, timeouts
+    """
+    sync_engine = getattr(db_engine, "sync_engine", db_engine)
+    pool = sync_engine.pool
+    stats = getattr(sync_engine, "pool_stats", None) or PoolStats()
+
+    def gauge(name):
+        method = getattr(pool, name, None)
+        return method() if callable(method) else None
+
+    return {
+        "pool": type(pool).__name__,
+        "size": gauge("size"),
+        "checked_in": gauge("checkedin"),
+        "checked_out": gauge("checkedout"),
+        "overflow": gauge("overflow"),
+        "checkouts": stats.checkouts,
+        "connects": stats.connects,
+        "waits": stats.waits,
+        "wait_seconds_total": stats.wait_seconds_total,
+        "wait_seconds_max": stats.wait_seconds_max,
+        "timeouts": stats.timeouts,
+    }
+
 
 # Створюємо SQLAlchemy engine для підключення до бази даних
-engine = create_engine(URL_DATABASE, echo=True, future=True)
+engine = create_db_engine()
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    async_engine = create_async_db_engine()
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
 
 # Базовий клас для моделей SQLAlchemy
 class Base(DeclarativeBase):
@@ -44,3 +280,72 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Асинхронний генератор сесії бази даних для FastAPI Depends.
+
+    Працює лише з DB_ASYNC=true; сесія закривається після завершення endpoint.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Залежність, яку використовують endpoint'и: асинхронна або синхронна сесія
+get_db_session = get_async_db if DB_ASYNC else get_db
+
+
+def build_upsert(
+    db, table, conflict_columns, update_columns=None, increment_columns=None
+):
+    """
+    Будує INSERT, який не падає на порушенні унікального ключа.
+
+    Аргументи:
+    - db: сесія, engine або з'єднання (потрібні для визначення діалекту)
+    - table: таблиця SQLAlchemy
+    - conflict_columns: колонки унікального ключа
+    - update_columns: колонки, які треба оновити для вже існуючого рядка;
+      якщо не вказані, існуючі рядки пропускаються
+    - increment_columns: колонки, до значення яких у вже існуючому рядку
+      додається нове значення (лічильники, суми)
+
+    Логіка:
+    - SQLite/PostgreSQL: INSERT ... ON CONFLICT DO NOTHING / DO UPDATE
+    - MySQL/MariaDB: INSERT ... ON DUPLICATE KEY UPDATE
+    - Інші діалекти: звичайний INSERT
+    """
+    bind = db.get_bind() if isinstance(db, Session) else db
+    dialect = bind.dialect.name
+
+    if dialect in ("sqlite", "postgresql", "mysql", "mariadb"):
+        if dialect in ("mysql", "mariadb"):
+            stmt = mysql.insert(table)
+            new_values = stmt.inserted
+        else:
+            module = sqlite if dialect == "sqlite" else postgresql
+            stmt = module.insert(table)
+            new_values = stmt.excluded
+
+        values = {column: new_values[column] for column in update_columns or ()}
+        values.update(
+            {
+                column: table.c[column] + new_values[column]
+                for column in increment_columns or ()
+            }
+        )
+
+        if dialect in ("mysql", "mariadb"):
+            if not values:
+                # Присвоєння колонки самій собі - "порожнє" оновлення для дубліката
+                column = conflict_columns[0]
+                values = {column: table.c[column]}
+            return stmt.on_duplicate_key_update(values)
+        if values:
+            return stmt.on_conflict_do_update(
+                index_elements=conflict_columns, set_=values
+            )
+        return stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+
+    return insert(table)
@@ -1,17 +1,49 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from src.routes import router as api_router
-from src import models
-from src.database import engine
+from src import columnar, config, models
+from src.database import async_engine, engine
+from src.metrics import MetricsMiddleware
+from src.profiling import ProfilingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Запуск і завершення застосунку.
+
+    З REPORT_BACKEND=columnar масиви колонкового рушія завантажуються
+    й оновлюються у фоновому потоці, а не в запитах (src/columnar.py).
+    """
+    if config.REPORT_BACKEND == "columnar":
+        # Сесії асинхронного engine читають знімок його sync_engine,
+        # а фоновий потік читає базу через синхронний engine
+        columnar.start_refresher(
+            async_engine.sync_engine if async_engine is not None else engine, engine
+        )
+    yield
+    columnar.stop_refreshers()
+
 
 app = FastAPI(
     title="Credit Planner API",
     description="Система аналізу планів, видач та зборів кредитів",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Підключення роутів
 app.include_router(api_router)
 
+# Кількість і час SQL-запитів на кожен HTTP-запит (Server-Timing, /metrics)
+if config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Профілювання на вимогу; без PROFILING_ENABLED middleware не підключається
+if config.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 
 # Створення таблиць тільки при прямому запуску, не при імпорті
 if __name__ == "__main__":
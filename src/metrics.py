@@ -0,0 +1,248 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src import config
+
+
+# Метрики запитів до API і бази даних.
+#
+# MetricsMiddleware рахує для кожного HTTP-запиту кількість SQL-запитів і час
+# у БД (події Engine before/after_cursor_execute), додає заголовок Server-Timing
+# і накопичує гістограми за маршрутом для /metrics (формат Prometheus).
+# Повільні запити (SLOW_QUERY_MS) пишуться в лог разом з параметрами.
+
+logger = logging.getLogger("src.metrics")
+
+
+class RequestStats:
+    """Лічильники SQL-запитів одного HTTP-запиту."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Потоки threadpool та greenlet'и AsyncSession отримують копію контексту
+# з тим самим об'єктом RequestStats
+_request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def current_request_stats() -> RequestStats | None:
+    """Лічильники поточного HTTP-запиту або None поза запитом."""
+    return _request_stats.get()
+
+
+class Histogram:
+    """
+    Гістограма Prometheus з мітками.
+
+    Аргументи:
+    - name, documentation: назва та опис метрики
+    - label_names: назви міток
+    - buckets: верхні межі кошиків (le), за зростанням
+    """
+
+    def __init__(self, name: str, documentation: str, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = Lock()
+        self._series = {}
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, (counts, total, count) in series:
+            label_text = ",".join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)
+            )
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound:g}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+class Counter:
+    """Лічильник Prometheus без міток."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = Lock()
+        self.value = 0
+
+    def inc(self):
+        with self._lock:
+            self.value += 1
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {self.value}",
+        ]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Час обробки HTTP-запиту",
+    ("method", "route", "status"),
+    TIME_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Час виконання SQL-запитів за HTTP-запит",
+    ("method", "route"),
+    TIME_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Кількість SQL-запитів за HTTP-запит",
+    ("method", "route"),
+    QUERY_BUCKETS,
+)
+SLOW_QUERIES = Counter("db_slow_queries_total", "Кількість повільних SQL-запитів")
+
+REGISTRY = (REQUEST_SECONDS, REQUEST_DB_SECONDS, REQUEST_DB_QUERIES, SLOW_QUERIES)
+
+
+def render_metrics() -> str:
+    """Усі метрики у текстовому форматі Prometheus."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Час початку запиту зберігається в його контексті виконання, а не в з'єднанні:
+# запит, що завершився помилкою, не залишає "зайвого" значення для наступних
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_start", None)
+    if started is None:
+        return
+    context._query_start = None
+    elapsed = time.perf_counter() - started
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+    if config.SLOW_QUERY_MS and elapsed * 1000 >= config.SLOW_QUERY_MS:
+        SLOW_QUERIES.inc()
+        params = repr(parameters)
+        if len(params) > config.SLOW_QUERY_MAX_PARAMS_LENGTH:
+            params = params[: config.SLOW_QUERY_MAX_PARAMS_LENGTH] + "..."
+        logger.warning(
+            "Slow query %.1f ms%s: %s | parameters: %s",
+            elapsed * 1000,
+            " (executemany)" if executemany else "",
+            statement,
+            params,
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    if context is not None:
+        context._query_start = None
+
+
+def _route_label(scope) -> str:
+    # Шаблон маршруту ("/user_credits/{user_id}"), а не шлях - обмежена кількість міток
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: лічильники SQL-запитів у контексті HTTP-запиту,
+    заголовок Server-Timing та гістограми для /metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = time.perf_counter() - started
+                server_timing = (
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                    f"app;dur={elapsed * 1000:.1f}"
+                )
+                message.setdefault("headers", [])
+                message["headers"] = [
+                    *message["headers"],
+                    (b"server-timing", server_timing.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - started
+            method = scope["method"]
+            route = _route_label(scope)
+            REQUEST_SECONDS.observe(elapsed, method, route, str(status_code))
+            REQUEST_DB_SECONDS.observe(stats.db_seconds, method, route)
+            REQUEST_DB_QUERIES.observe(stats.queries, method, route)
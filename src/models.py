@@ -1,4 +1,13 @@
-from sqlalchemy import Integer, String, Date, Float, ForeignKey
+from sqlalchemy import (
+    Integer,
+    String,
+    Date,
+    Float,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.database import Base
 
@@ -18,7 +27,10 @@ class User(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     login: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
-    registration_date: Mapped[Date] = mapped_column(Date, nullable=False)
+    # active_history: стара дата потрібна для оновлення когорт (src/rollups.py)
+    registration_date: Mapped[Date] = mapped_column(
+        Date, nullable=False, active_history=True
+    )
 
     credits: Mapped[list["Credit"]] = relationship(
         back_populates="user", cascade="all, delete-orphan"
@@ -37,21 +49,62 @@ class Credit(Base):
     - actual_return_date: Фактична дата повернення (nullable)
     - body: Сума тіла кредиту
     - percent: Сума відсотків
+    - paid_body: Сума платежів по тілу
+    - paid_percent: Сума платежів по відсотках
+    - paid_total: Сума всіх платежів
+    - last_payment_date: Дата останнього платежу (nullable)
+    - external_id: Ідентифікатор у зовнішній системі (унікальний, nullable)
     - user: Зв'язок з користувачем
     - payments: Список платежів по кредиту
+
+    Індекси:
+    - (user_id, issuance_date): кредити користувача
+    - (issuance_date, body): суми видач за період без читання таблиці
+    - (return_date) лише для відкритих кредитів (actual_return_date IS NULL),
+      де діалект підтримує частковий індекс (SQLite, PostgreSQL)
+
+    Колонки paid_* та last_payment_date оновлюються в транзакції запису
+    платежів (src/rollups.py); звірка з Payments - src/utils/reconcile_credit_totals.py
     """
 
     __tablename__ = "Credits"
+    __table_args__ = (
+        Index("ix_credits_user_issuance", "user_id", "issuance_date"),
+        Index("ix_credits_issuance_body", "issuance_date", "body"),
+        Index(
+            "ix_credits_open_return_date",
+            "return_date",
+            sqlite_where=text("actual_return_date IS NULL"),
+            postgresql_where=text("actual_return_date IS NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int | None] = mapped_column(
-        ForeignKey("Users.id", ondelete="SET NULL"), nullable=True
+        ForeignKey("Users.id", ondelete="SET NULL"), nullable=True, active_history=True
+    )
+    # active_history: стара дата і сума потрібні для оновлення агрегатів (src/rollups.py)
+    issuance_date: Mapped[Date] = mapped_column(
+        Date, nullable=False, active_history=True
     )
-    issuance_date: Mapped[Date] = mapped_column(Date, nullable=False)
     return_date: Mapped[Date] = mapped_column(Date, nullable=False)
     actual_return_date: Mapped[Date | None] = mapped_column(Date, nullable=True)
-    body: Mapped[float] = mapped_column(Float, nullable=False)
+    body: Mapped[float] = mapped_column(Float, nullable=False, active_history=True)
     percent: Mapped[float] = mapped_column(Float, nullable=False)
+    paid_body: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0, server_default="0"
+    )
+    paid_percent: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0, server_default="0"
+    )
+    paid_total: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0, server_default="0"
+    )
+    last_payment_date: Mapped[Date | None] = mapped_column(Date, nullable=True)
+    # Ключ ідемпотентності масового завантаження (POST /credits/bulk)
+    external_id: Mapped[str | None] = mapped_column(
+        String(64), unique=True, nullable=True
+    )
 
     user: Mapped["User"] = relationship(back_populates="credits")
     payments: Mapped[list["Payment"]] = relationship(
@@ -86,9 +139,19 @@ class Plan(Base):
     - sum: Запланована сума
     - category_id: ID категорії з Dictionary
     - category: Зв'язок з категорією
+
+    На одну дату може існувати лише один план кожної категорії.
+
+    Індекси:
+    - унікальний (period, category_id): плани місяця та перевірка дублікатів
+    - (category_id, period): плани категорії, зовнішній ключ на Dictionary
     """
 
     __tablename__ = "Plans"
+    __table_args__ = (
+        UniqueConstraint("period", "category_id", name="uq_plans_period_category"),
+        Index("ix_plans_category_period", "category_id", "period"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     period: Mapped[Date] = mapped_column(Date, nullable=False)
@@ -110,21 +173,159 @@ class Payment(Base):
     - payment_date: Дата платежу
     - credit_id: ID кредиту (nullable)
     - type_id: ID типу платежу з Dictionary (nullable)
+    - external_id: Ідентифікатор у зовнішній системі (унікальний, nullable)
     - credit: Зв'язок з кредитом
     - type: Зв'язок з типом платежу
+
+    Індекси (покривні - sum включено, щоб агрегати не читали таблицю):
+    - (credit_id, type_id, sum): суми платежів по кредитах
+    - (payment_date, type_id, sum): суми платежів за період
+    - (type_id, payment_date, sum): суми платежів одного типу за період
     """
 
     __tablename__ = "Payments"
+    __table_args__ = (
+        Index("ix_payments_credit_type", "credit_id", "type_id", "sum"),
+        Index("ix_payments_date_type", "payment_date", "type_id", "sum"),
+        Index("ix_payments_type_date", "type_id", "payment_date", "sum"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    sum: Mapped[float] = mapped_column(Float, nullable=False)
-    payment_date: Mapped[Date] = mapped_column(Date, nullable=False)
+    # active_history: старі значення потрібні для оновлення агрегатів (src/rollups.py)
+    sum: Mapped[float] = mapped_column(Float, nullable=False, active_history=True)
+    payment_date: Mapped[Date] = mapped_column(
+        Date, nullable=False, active_history=True
+    )
     credit_id: Mapped[int | None] = mapped_column(
-        ForeignKey("Credits.id", ondelete="SET NULL"), nullable=True
+        ForeignKey("Credits.id", ondelete="SET NULL"),
+        nullable=True,
+        active_history=True,
     )
     type_id: Mapped[int | None] = mapped_column(
-        ForeignKey("Dictionary.id", ondelete="SET NULL"), nullable=True
+        ForeignKey("Dictionary.id", ondelete="SET NULL"),
+        nullable=True,
+        active_history=True,
+    )
+    # Ключ ідемпотентності масового завантаження (POST /payments/bulk)
+    external_id: Mapped[str | None] = mapped_column(
+        String(64), unique=True, nullable=True
     )
 
     credit: Mapped["Credit"] = relationship(back_populates="payments")
     type: Mapped["Dictionary"] = relationship()
+
+
+class MonthlyAggregate(Base):
+    """
+    Модель місячного агрегату видач і платежів
+
+    Підтримується в актуальному стані при кожному записі кредитів і платежів
+    (див. src/rollups.py), тому звіти по місяцях не читають сирі дані.
+
+    Атрибути:
+    - id: Унікальний ідентифікатор запису
+    - month: Перше число місяця
+    - source: Джерело даних: "credit" (видачі) або "payment" (платежі)
+    - type_id: ID типу платежу з Dictionary; 0 для видач і платежів без типу
+    - count: Кількість видач або платежів за місяць
+    - sum: Сума видач (тіло кредиту) або платежів за місяць
+    """
+
+    __tablename__ = "MonthlyAggregates"
+    __table_args__ = (
+        UniqueConstraint(
+            "month", "source", "type_id", name="uq_monthly_aggregates_key"
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    month: Mapped[Date] = mapped_column(Date, nullable=False)
+    source: Mapped[str] = mapped_column(String(16), nullable=False)
+    type_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+
+
+class CohortAggregate(Base):
+    """
+    Модель місячного агрегату когорти користувачів
+
+    Когорта - місяць реєстрації користувача. Для кожної когорти зберігає
+    кількість зареєстрованих користувачів, видачі кредитів її користувачів
+    і платежі по цих кредитах за місяцями; підтримується разом
+    з MonthlyAggregates (src/rollups.py).
+
+    Атрибути:
+    - id: Унікальний ідентифікатор запису
+    - cohort: Перше число місяця реєстрації
+    - month: Перше число місяця реєстрації, видачі або платежу
+    - source: Джерело даних: "user" (реєстрації), "credit" (видачі)
+      або "payment" (платежі)
+    - count: Кількість реєстрацій, видач або платежів за місяць
+    - sum: Сума видач (тіло кредиту) або платежів за місяць; 0 для реєстрацій
+    """
+
+    __tablename__ = "CohortAggregates"
+    __table_args__ = (
+        UniqueConstraint("cohort", "month", "source", name="uq_cohort_aggregates_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    cohort: Mapped[Date] = mapped_column(Date, nullable=False)
+    month: Mapped[Date] = mapped_column(Date, nullable=False)
+    source: Mapped[str] = mapped_column(String(16), nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+
+
+class DailyLedger(Base):
+    """
+    Модель денного журналу накопичених сум видач і платежів
+
+    Для кожного ряду (source, type_id) зберігає суму за день і накопичену суму
+    з початку історії, тому факт за будь-який проміжок дат - різниця двох
+    значень cumulative_sum. Підтримується разом з MonthlyAggregates (src/rollups.py).
+
+    Атрибути:
+    - id: Унікальний ідентифікатор запису
+    - day: Дата
+    - source: Джерело даних: "credit" (видачі) або "payment" (платежі)
+    - type_id: ID типу платежу з Dictionary; 0 для видач і платежів без типу
+    - count: Кількість видач або платежів за день
+    - sum: Сума видач або платежів за день
+    - cumulative_count: Кількість з початку історії по цей день включно
+    - cumulative_sum: Сума з початку історії по цей день включно
+    """
+
+    __tablename__ = "DailyLedger"
+    __table_args__ = (
+        UniqueConstraint("source", "type_id", "day", name="uq_daily_ledger_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[Date] = mapped_column(Date, nullable=False)
+    source: Mapped[str] = mapped_column(String(16), nullable=False)
+    type_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    cumulative_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cumulative_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+
+
+class LedgerSeries(Base):
+    """
+    Модель ряду агрегатів (source, type_id) - рядок-блокування для записів
+
+    Перед зміною агрегатів транзакція блокує рядки своїх рядів
+    (SELECT ... FOR UPDATE, див. src/rollups.py), тому паралельні записи
+    одного ряду в MonthlyAggregates і DailyLedger виконуються по черзі.
+
+    Атрибути:
+    - source: Джерело даних: "credit" (видачі) або "payment" (платежі)
+    - type_id: ID типу платежу з Dictionary; 0 для видач і платежів без типу
+    """
+
+    __tablename__ = "LedgerSeries"
+
+    source: Mapped[str] = mapped_column(String(16), primary_key=True)
+    type_id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -0,0 +1,150 @@
+import cProfile
+import pstats
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from threading import Lock
+from urllib.parse import parse_qs
+
+from src import config
+
+
+# Профілювання окремих запитів на вимогу.
+#
+# Якщо PROFILING_ENABLED, запит із заголовком "X-Profile: 1" або параметром
+# "?profile=1" виконується під cProfile. Профіль (pstats; перегляд - snakeviz,
+# flameprof, "python -m pstats") зберігається в PROFILE_DIR, а його id
+# повертається в заголовку X-Profile-Id. Без PROFILING_ENABLED middleware не
+# підключається і запити не мають жодних додаткових витрат.
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "profile"
+_TRUE_VALUES = ("1", "true", "yes", "on")
+# З Python 3.12 cProfile працює через sys.monitoring - спільний для всіх потоків:
+# профайлер запиту бачить і потоки пулу, а другий профайлер у потоці пулу
+# не запускається ("Another profiling tool is already active")
+_PROFILER_SEES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class RequestProfile:
+    """
+    Профіль одного запиту: профайлер потоку event loop і профілі функцій,
+    виконаних у пулі потоків (crud_async.run; до Python 3.12, див. in_worker).
+    """
+
+    def __init__(self, profile_id: str):
+        self.profile_id = profile_id
+        self.profiler = cProfile.Profile()
+        self._lock = Lock()
+        self._workers = []
+
+    def add_worker(self, profiler: cProfile.Profile):
+        with self._lock:
+            self._workers.append(profiler)
+
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self.profiler)
+        with self._lock:
+            for profiler in self._workers:
+                stats.add(profiler)
+        return stats
+
+
+_active_profile: ContextVar[RequestProfile | None] = ContextVar(
+    "active_profile", default=None
+)
+# cProfile профілює весь потік event loop, тож одночасно - лише один запит
+_busy = Lock()
+
+
+def in_worker(fn):
+    """
+    Повертає fn, що профілюється окремо в потоці пулу, якщо поточний запит
+    профілюється; інакше - fn без змін.
+
+    На Python 3.12+ fn і так потрапляє в профіль запиту, тому теж не змінюється.
+    """
+    if not config.PROFILING_ENABLED or _PROFILER_SEES_ALL_THREADS:
+        return fn
+    profile = _active_profile.get()
+    if profile is None:
+        return fn
+
+    @wraps(fn)
+    def profiled(*args, **kwargs):
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            profile.add_worker(profiler)
+
+    return profiled
+
+
+def _requested(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == PROFILE_HEADER:
+            return value.decode("latin-1").lower() in _TRUE_VALUES
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return any(
+        value.lower() in _TRUE_VALUES for value in query.get(PROFILE_QUERY_PARAM, ())
+    )
+
+
+def _new_profile_id(scope) -> str:
+    path = scope["path"].strip("/").replace("/", "_") or "root"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{path}-{uuid.uuid4().hex[:8]}"
+
+
+def profile_path(profile_id: str) -> Path:
+    """Файл профілю з вказаним id."""
+    return Path(config.PROFILE_DIR) / f"{profile_id}.pstats"
+
+
+class ProfilingMiddleware:
+    """ASGI middleware, що профілює запити з X-Profile / ?profile=1."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not _busy.acquire(blocking=False):
+            await self.app(
+                scope, receive, _with_headers(send, [(b"x-profile-skipped", b"busy")])
+            )
+            return
+
+        profile = RequestProfile(_new_profile_id(scope))
+        token = _active_profile.set(profile)
+        profile.profiler.enable()
+        try:
+            await self.app(
+                scope,
+                receive,
+                _with_headers(send, [(b"x-profile-id", profile.profile_id.encode())]),
+            )
+        finally:
+            profile.profiler.disable()
+            _active_profile.reset(token)
+            try:
+                path = profile_path(profile.profile_id)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                profile.stats().dump_stats(path)
+            finally:
+                _busy.release()
+
+
+def _with_headers(send, headers):
+    async def send_with_headers(message):
+        if message["type"] == "http.response.start":
+            message["headers"] = [*message.get("headers", []), *headers]
+        await send(message)
+
+    return send_with_headers
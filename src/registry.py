@@ -0,0 +1,110 @@
+import time
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from src import config, models
+
+
+# Реєстр довідника (таблиця Dictionary) у пам'яті процесу.
+#
+# Категорії планів і типи платежів - кілька рядків, які майже не змінюються.
+# Реєстр завантажує їх один раз на engine, тож звіти фільтрують за id
+# (category_id / type_id) без JOIN з Dictionary і без пошуку за назвою.
+
+# Назви записів довідника, на які спирається бізнес-логіка
+BODY = "тіло"
+PERCENT = "відсотки"
+ISSUE = "видача"
+COLLECT = "збір"
+
+
+class DictionaryRegistry:
+    """
+    Знімок таблиці Dictionary: відповідність назв та id.
+
+    Пошук за назвою не залежить від регістру.
+    """
+
+    def __init__(self, rows):
+        self.names = {id_: name for id_, name in rows}
+        self.ids = {name.lower(): id_ for id_, name in self.names.items()}
+        self.loaded_at = time.monotonic()
+
+    def id_of(self, name: str) -> int | None:
+        """id запису з назвою name або None."""
+        return self.ids.get(name.lower())
+
+    def name_of(self, id_: int | None) -> str | None:
+        """Назва запису з id або None."""
+        return self.names.get(id_)
+
+    def ids_containing(self, fragment: str) -> list[int]:
+        """id записів, назва яких містить fragment (аналог ILIKE '%fragment%')."""
+        fragment = fragment.lower()
+        return [id_ for name, id_ in self.ids.items() if fragment in name]
+
+
+_registries = WeakKeyDictionary()
+_lock = Lock()
+
+
+def _engine_of(db):
+    # Реєстр спільний для всіх сесій і з'єднань одного engine
+    return db.get_bind() if isinstance(db, Session) else db.engine
+
+
+def load_registry(db) -> DictionaryRegistry:
+    """Завантажує довідник з бази і зберігає його для engine сесії або з'єднання."""
+    registry = DictionaryRegistry(
+        db.execute(select(models.Dictionary.id, models.Dictionary.name)).all()
+    )
+    with _lock:
+        _registries[_engine_of(db)] = registry
+    return registry
+
+
+def get_registry(db) -> DictionaryRegistry:
+    """
+    Повертає реєстр довідника для engine сесії або з'єднання (Session / Connection).
+
+    Завантажує його при першому зверненні, після зміни Dictionary через ORM
+    та після закінчення DICTIONARY_REGISTRY_TTL секунд (зміни з інших процесів).
+    """
+    with _lock:
+        registry = _registries.get(_engine_of(db))
+    if registry is None or (
+        time.monotonic() - registry.loaded_at > config.DICTIONARY_REGISTRY_TTL
+    ):
+        registry = load_registry(db)
+    return registry
+
+
+def invalidate_registries():
+    """Скидає всі завантажені реєстри; наступне звернення перечитає довідник."""
+    with _lock:
+        _registries.clear()
+
+
+_DICTIONARY_CHANGED = "dictionary_changed"
+
+
+@event.listens_for(Session, "after_flush")
+def _track_dictionary_changes(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, models.Dictionary):
+            session.info[_DICTIONARY_CHANGED] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_commit(session):
+    if session.info.pop(_DICTIONARY_CHANGED, False):
+        invalidate_registries()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop(_DICTIONARY_CHANGED, None)
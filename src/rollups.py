@@ -0,0 +1,808 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from itertools import groupby
+from typing import Iterable
+
+from sqlalchemy import (
+    Date,
+    and_,
+    bindparam,
+    case,
+    delete,
+    event,
+    exists,
+    extract,
+    func,
+    inspect,
+    literal,
+    or_,
+    select,
+    tuple_,
+)
+from sqlalchemy.orm import Session
+
+from src import models, registry
+from src.database import build_upsert
+
+
+# Агрегати, що підтримуються інкрементально при записі кредитів і платежів:
+# місячні (MonthlyAggregates), денний журнал накопичених сум (DailyLedger),
+# місячні підсумки когорт користувачів (CohortAggregates) та суми платежів
+# по кожному кредиту (Credits.paid_*, last_payment_date).
+#
+# Записи через ORM потрапляють сюди автоматично (події Session), масові
+# вставки через Core мають викликати record_credits / record_payments у тій самій
+# транзакції. rebuild() перераховує все з нуля (python -m src.utils.rebuild_rollups).
+#
+# Паралельні транзакції змінюють агрегати одного ряду (source, type_id) по черзі:
+# перед записом транзакція блокує рядки своїх рядів у LedgerSeries і тримає
+# блокування до commit. Без цього дві транзакції могли б одночасно створити
+# рядок нового дня (порушення uq_daily_ledger_key), а UPDATE накопичених сум
+# не бачив би ще не зафіксований рядок іншої транзакції.
+#
+# Когорти видач і платежів визначаються за поточним власником (кредит ->
+# користувач -> місяць реєстрації). Перенесення кредиту до іншого користувача
+# чи зміна дати реєстрації не переносить уже враховані видачі й платежі -
+# після таких змін агрегати когорт перераховує rebuild_rollups.
+
+SOURCE_USER = "user"
+SOURCE_CREDIT = "credit"
+SOURCE_PAYMENT = "payment"
+# type_id для видач і платежів без типу
+NO_TYPE = 0
+# Колонки кредиту з сумами його платежів
+_CREDIT_TOTALS = ("paid_body", "paid_percent", "paid_total", "last_payment_date")
+
+
+def month_start(day: date) -> date:
+    """Перше число місяця для вказаної дати."""
+    return day.replace(day=1)
+
+
+def next_month_start(day: date) -> date:
+    """Перше число наступного місяця для вказаної дати."""
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+class RollupDeltas:
+    """
+    Накопичує зміни агрегатів для однієї транзакції і застосовує їх пачкою.
+
+    Ключ місячного агрегату - (month, source, type_id), денного журналу -
+    (day, source, type_id); значення - [count, sum]. Для кредитів - суми
+    платежів за type_id, найпізніша нова дата платежу і ознака, що дату
+    останнього платежу треба перечитати (платіж видалено або перенесено).
+
+    Агрегати когорт: cohorts - за відомою когортою (cohort, month, source),
+    owned - за власником запису (source, owner_id, month), когорту якого
+    apply() знаходить у базі (owner_id - користувач кредиту або кредит
+    платежу); owner_cohorts - вже відомі когорти власників.
+    """
+
+    def __init__(self):
+        self.monthly = defaultdict(lambda: [0, 0.0])
+        self.daily = defaultdict(lambda: [0, 0.0])
+        self.credits = defaultdict(
+            lambda: {"sums": defaultdict(float), "last": None, "recheck": False}
+        )
+        self.cohorts = defaultdict(lambda: [0, 0.0])
+        self.owned = defaultdict(lambda: [0, 0.0])
+        self.owner_cohorts = {}
+
+    def add(self, day: date, source: str, type_id: int, count: int, amount: float):
+        for totals in (
+            self.monthly[month_start(day), source, type_id],
+            self.daily[day, source, type_id],
+        ):
+            totals[0] += count
+            totals[1] += amount
+
+    def add_owned(self, source: str, owner_id: int | None, day: date, count, amount):
+        if owner_id is None:
+            return
+        totals = self.owned[source, owner_id, month_start(day)]
+        totals[0] += count
+        totals[1] += amount
+
+    def add_user(self, registration_date: date, sign: int = 1):
+        cohort = month_start(registration_date)
+        self.cohorts[cohort, cohort, SOURCE_USER][0] += sign
+
+    def add_credit(
+        self,
+        issuance_date: date,
+        body: float,
+        user_id: int | None = None,
+        sign: int = 1,
+    ):
+        self.add(issuance_date, SOURCE_CREDIT, NO_TYPE, sign, sign * (body or 0))
+        self.add_owned(SOURCE_CREDIT, user_id, issuance_date, sign, sign * (body or 0))
+
+    def add_payment(
+        self,
+        payment_date: date,
+        type_id: int | None,
+        amount: float,
+        credit_id: int | None = None,
+        sign: int = 1,
+    ):
+        self.add(
+            payment_date, SOURCE_PAYMENT, type_id or NO_TYPE, sign, sign * (amount or 0)
+        )
+        if credit_id is None:
+            return
+        self.add_owned(
+            SOURCE_PAYMENT, credit_id, payment_date, sign, sign * (amount or 0)
+        )
+        totals = self.credits[credit_id]
+        totals["sums"][type_id] += sign * (amount or 0)
+        if sign < 0:
+            totals["recheck"] = True
+        elif totals["last"] is None or payment_date > totals["last"]:
+            totals["last"] = payment_date
+
+    def apply(self, connection):
+        """Додає накопичені зміни до таблиць агрегатів."""
+        _lock_series(connection, {key[1:] for key in (*self.monthly, *self.daily)})
+        self._apply_monthly(connection)
+        self._apply_daily(connection)
+        self._apply_credits(connection)
+        self._apply_cohorts(connection)
+
+    def _apply_monthly(self, connection):
+        rows = [
+            {"month": month, "source": source, "type_id": type_id, "count": count, "sum": total}
+            for (month, source, type_id), (count, total) in self.monthly.items()
+            if count or total
+        ]
+        if rows:
+            stmt = build_upsert(
+                connection,
+                models.MonthlyAggregate.__table__,
+                ["month", "source", "type_id"],
+                increment_columns=["count", "sum"],
+            )
+            connection.execute(stmt, rows)
+        self.monthly.clear()
+
+    def _apply_daily(self, connection):
+        # Зміна за день d збільшує накопичені суми всіх днів від d і далі:
+        # спершу створюються відсутні дні (з накопиченою сумою попереднього
+        # дня ряду), потім одним UPDATE на ключ зсуваються накопичені значення
+        rows = [
+            {
+                "b_day": day,
+                "b_source": source,
+                "b_type_id": type_id,
+                "d_count": count,
+                "d_sum": total,
+            }
+            for (day, source, type_id), (count, total) in sorted(self.daily.items())
+            if count or total
+        ]
+        if rows:
+            connection.execute(_ledger_seed_statement(), rows)
+            connection.execute(_ledger_day_statement(), rows)
+            connection.execute(_ledger_cumulative_statement(), rows)
+        self.daily.clear()
+
+    def _apply_credits(self, connection):
+        if not self.credits:
+            return
+        dictionary = registry.get_registry(connection)
+        body_type_id = dictionary.id_of(registry.BODY)
+        percent_type_id = dictionary.id_of(registry.PERCENT)
+
+        rows = []
+        for credit_id, totals in sorted(self.credits.items()):
+            sums = totals["sums"]
+            rows.append(
+                {
+                    "b_id": credit_id,
+                    "d_body": sums.get(body_type_id, 0) if body_type_id else 0,
+                    "d_percent": sums.get(percent_type_id, 0) if percent_type_id else 0,
+                    "d_total": sum(sums.values()),
+                    "b_last": totals["last"],
+                }
+            )
+        connection.execute(_credit_totals_statement(), rows)
+
+        recheck = [
+            {"b_id": credit_id}
+            for credit_id, totals in sorted(self.credits.items())
+            if totals["recheck"]
+        ]
+        if recheck:
+            connection.execute(_credit_last_payment_statement(), recheck)
+        self.credits.clear()
+
+    def _apply_cohorts(self, connection):
+        owners = defaultdict(set)
+        for source, owner_id, _ in self.owned:
+            if (source, owner_id) not in self.owner_cohorts:
+                owners[source].add(owner_id)
+        for source, owner_ids in owners.items():
+            self.owner_cohorts.update(owner_cohorts(connection, source, owner_ids))
+
+        # Кредити без користувача і платежі без кредиту в когорти не потрапляють
+        for (source, owner_id, month), (count, total) in self.owned.items():
+            cohort = self.owner_cohorts.get((source, owner_id))
+            if cohort is not None:
+                totals = self.cohorts[cohort, month, source]
+                totals[0] += count
+                totals[1] += total
+
+        rows = [
+            {
+                "cohort": cohort,
+                "month": month,
+                "source": source,
+                "count": count,
+                "sum": total,
+            }
+            for (cohort, month, source), (count, total) in sorted(self.cohorts.items())
+            if count or total
+        ]
+        if rows:
+            stmt = build_upsert(
+                connection,
+                models.CohortAggregate.__table__,
+                ["cohort", "month", "source"],
+                increment_columns=["count", "sum"],
+            )
+            connection.execute(stmt, rows)
+        self.cohorts.clear()
+        self.owned.clear()
+
+
+def _lock_series(connection, series):
+    """
+    Блокує рядки рядів (source, type_id) у LedgerSeries до кінця транзакції.
+
+    Відсутні ряди створюються upsert'ом без помилки на дублікаті; рядки
+    блокуються в порядку ключа, щоб транзакції з кількома рядами не
+    блокували одна одну навхрест. SQLite і так виконує записи по черзі,
+    там FOR UPDATE не потрібен і не генерується.
+    """
+    if not series:
+        return
+    table = models.LedgerSeries.__table__
+    keys = sorted(series)
+    connection.execute(
+        build_upsert(connection, table, ["source", "type_id"]),
+        [{"source": source, "type_id": type_id} for source, type_id in keys],
+    )
+    connection.execute(
+        select(table.c.source)
+        .where(tuple_(table.c.source, table.c.type_id).in_(keys))
+        .order_by(table.c.source, table.c.type_id)
+        .with_for_update()
+    ).all()
+
+
+def _ledger_series(table):
+    return and_(
+        table.c.source == bindparam("b_source"),
+        table.c.type_id == bindparam("b_type_id"),
+    )
+
+
+def _ledger_seed_statement():
+    """INSERT рядка дня, якого ще немає, з накопиченими значеннями попереднього дня."""
+    table = models.DailyLedger.__table__
+    day = bindparam("b_day", type_=Date)
+
+    def previous(column):
+        return func.coalesce(
+            select(column)
+            .where(_ledger_series(table), table.c.day < day)
+            .order_by(table.c.day.desc())
+            .limit(1)
+            .scalar_subquery(),
+            0,
+        )
+
+    seed = select(
+        day,
+        bindparam("b_source"),
+        bindparam("b_type_id"),
+        literal(0),
+        literal(0.0),
+        previous(table.c.cumulative_count),
+        previous(table.c.cumulative_sum),
+    ).where(~exists().where(_ledger_series(table), table.c.day == day))
+    return table.insert().from_select(
+        ["day", "source", "type_id", "count", "sum", "cumulative_count", "cumulative_sum"],
+        seed,
+    )
+
+
+def _ledger_day_statement():
+    table = models.DailyLedger.__table__
+    return (
+        table.update()
+        .where(_ledger_series(table), table.c.day == bindparam("b_day", type_=Date))
+        .values(
+            count=table.c.count + bindparam("d_count"),
+            sum=table.c.sum + bindparam("d_sum"),
+        )
+    )
+
+
+def _ledger_cumulative_statement():
+    table = models.DailyLedger.__table__
+    return (
+        table.update()
+        .where(_ledger_series(table), table.c.day >= bindparam("b_day", type_=Date))
+        .values(
+            cumulative_count=table.c.cumulative_count + bindparam("d_count"),
+            cumulative_sum=table.c.cumulative_sum + bindparam("d_sum"),
+        )
+    )
+
+
+def _credit_totals_statement():
+    """UPDATE сум платежів кредиту на різницю і дати останнього платежу."""
+    table = models.Credit.__table__
+    last = bindparam("b_last", type_=Date)
+    return (
+        table.update()
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            paid_body=table.c.paid_body + bindparam("d_body"),
+            paid_percent=table.c.paid_percent + bindparam("d_percent"),
+            paid_total=table.c.paid_total + bindparam("d_total"),
+            last_payment_date=case(
+                (
+                    and_(
+                        last.isnot(None),
+                        or_(
+                            table.c.last_payment_date.is_(None),
+                            table.c.last_payment_date < last,
+                        ),
+                    ),
+                    last,
+                ),
+                else_=table.c.last_payment_date,
+            ),
+        )
+    )
+
+
+def _credit_last_payment_statement():
+    # Після видалення платежу найпізнішу дату можна лише перечитати
+    credits = models.Credit.__table__
+    payments = models.Payment.__table__
+    return (
+        credits.update()
+        .where(credits.c.id == bindparam("b_id"))
+        .values(
+            last_payment_date=select(func.max(payments.c.payment_date))
+            .where(payments.c.credit_id == credits.c.id)
+            .scalar_subquery()
+        )
+    )
+
+
+# Скільки id кредитів передається в один запит звірки (обмежує IN (...))
+CREDIT_IDS_CHUNK_SIZE = 10_000
+
+
+def owner_cohorts(connection, source: str, owner_ids: Iterable[int]) -> dict:
+    """
+    Когорти (місяць реєстрації користувача) власників записів.
+
+    Аргументи:
+    - connection: з'єднання з базою
+    - source: SOURCE_CREDIT - owner_ids є id користувачів,
+      SOURCE_PAYMENT - id кредитів
+    - owner_ids: id власників
+
+    Повертає:
+    - {(source, owner_id): перше число місяця реєстрації}; власників, яких
+      немає в базі (або кредитів без користувача), у словнику немає
+    """
+    users = models.User.__table__
+    credits = models.Credit.__table__
+    if source == SOURCE_CREDIT:
+        query = select(users.c.id, users.c.registration_date)
+        owner = users.c.id
+    else:
+        query = select(credits.c.id, users.c.registration_date).join_from(
+            credits, users, users.c.id == credits.c.user_id
+        )
+        owner = credits.c.id
+
+    cohorts = {}
+    for chunk in _credit_id_chunks(owner_ids):
+        for owner_id, registration_date in connection.execute(
+            query.where(owner.in_(chunk))
+        ):
+            cohorts[source, owner_id] = month_start(registration_date)
+    return cohorts
+
+
+def _payment_totals(connection, credit_ids=None):
+    """
+    Підзапит фактичних сум платежів кредитів з Payments одним GROUP BY.
+
+    Колонки: credit_id, paid_body, paid_percent, paid_total, last_payment_date.
+    """
+    dictionary = registry.get_registry(connection)
+    payments = models.Payment.__table__
+
+    def paid_of(name):
+        type_id = dictionary.id_of(name)
+        if type_id is None:
+            return literal(0.0)
+        return func.coalesce(
+            func.sum(case((payments.c.type_id == type_id, payments.c.sum), else_=0)),
+            0,
+        )
+
+    query = select(
+        payments.c.credit_id,
+        paid_of(registry.BODY).label("paid_body"),
+        paid_of(registry.PERCENT).label("paid_percent"),
+        func.coalesce(func.sum(payments.c.sum), 0).label("paid_total"),
+        func.max(payments.c.payment_date).label("last_payment_date"),
+    ).where(payments.c.credit_id.isnot(None))
+    if credit_ids is not None:
+        query = query.where(payments.c.credit_id.in_(credit_ids))
+    return query.group_by(payments.c.credit_id).subquery("actual")
+
+
+def _totals_differ(credits, actual: dict, tolerance: float):
+    """Умова розбіжності збережених сум кредиту з фактичними значеннями actual."""
+    return or_(
+        credits.c.last_payment_date.is_distinct_from(actual["last_payment_date"]),
+        *(
+            func.abs(func.coalesce(credits.c[name], 0) - actual[name]) > tolerance
+            for name in ("paid_body", "paid_percent", "paid_total")
+        ),
+    )
+
+
+def _credit_id_chunks(credit_ids):
+    """Частини списку id кредитів; None - один прохід по всіх кредитах."""
+    if credit_ids is None:
+        yield None
+        return
+    credit_ids = sorted(set(credit_ids))
+    for start in range(0, len(credit_ids), CREDIT_IDS_CHUNK_SIZE):
+        yield credit_ids[start : start + CREDIT_IDS_CHUNK_SIZE]
+
+
+def find_credit_totals_mismatches(
+    connection, tolerance: float = 0.005, credit_ids: Iterable[int] | None = None
+) -> list[dict]:
+    """
+    Звіряє збережені суми платежів кредитів з таблицею Payments.
+
+    Аргументи:
+    - connection: з'єднання з базою
+    - tolerance: допустиме розходження сум (похибка float)
+    - credit_ids: id кредитів; якщо не вказані - усі кредити
+
+    Логіка:
+    - Порівняння виконується в базі (LEFT JOIN з GROUP BY по Payments),
+      у пам'ять потрапляють лише кредити з розбіжностями
+
+    Повертає:
+    - Список словників: id кредиту, збережені значення та фактичні (actual_*)
+    """
+    credits = models.Credit.__table__
+    mismatches = []
+    for chunk in _credit_id_chunks(credit_ids):
+        totals = _payment_totals(connection, chunk)
+        actual = {
+            "paid_body": func.coalesce(totals.c.paid_body, 0),
+            "paid_percent": func.coalesce(totals.c.paid_percent, 0),
+            "paid_total": func.coalesce(totals.c.paid_total, 0),
+            "last_payment_date": totals.c.last_payment_date,
+        }
+        query = (
+            select(
+                credits.c.id,
+                *(credits.c[name] for name in _CREDIT_TOTALS),
+                *(actual[name].label(f"actual_{name}") for name in _CREDIT_TOTALS),
+            )
+            .select_from(
+                credits.outerjoin(totals, totals.c.credit_id == credits.c.id)
+            )
+            .where(_totals_differ(credits, actual, tolerance))
+        )
+        if chunk is not None:
+            query = query.where(credits.c.id.in_(chunk))
+        rows = connection.execute(query.order_by(credits.c.id))
+        mismatches.extend(dict(row._mapping) for row in rows)
+    return mismatches
+
+
+def repair_credit_totals(connection, credit_ids: Iterable[int] | None = None) -> int:
+    """
+    Перераховує суми платежів кредитів з таблиці Payments.
+
+    Аргументи:
+    - connection: з'єднання з базою
+    - credit_ids: id кредитів; якщо не вказані - усі кредити
+
+    Логіка:
+    - Двома UPDATE без читання кредитів у пам'ять: кредити з платежами
+      отримують суми з GROUP BY по Payments (UPDATE ... FROM), кредити без
+      платежів - нулі
+    - Оновлюються лише кредити, значення яких розходяться
+    - Список credit_ids обробляється частинами по CREDIT_IDS_CHUNK_SIZE
+
+    Повертає:
+    - Кількість оновлених кредитів
+    """
+    credits = models.Credit.__table__
+    payments = models.Payment.__table__
+    empty = {
+        "paid_body": 0,
+        "paid_percent": 0,
+        "paid_total": 0,
+        "last_payment_date": None,
+    }
+
+    repaired = 0
+    for chunk in _credit_id_chunks(credit_ids):
+        totals = _payment_totals(connection, chunk)
+        actual = {name: totals.c[name] for name in _CREDIT_TOTALS}
+        with_payments = (
+            credits.update()
+            .where(
+                credits.c.id == totals.c.credit_id,
+                _totals_differ(credits, actual, tolerance=0),
+            )
+            .values(actual)
+        )
+        without_payments = (
+            credits.update()
+            .where(
+                ~exists().where(payments.c.credit_id == credits.c.id),
+                _totals_differ(credits, empty, tolerance=0),
+            )
+            .values(empty)
+        )
+        if chunk is not None:
+            without_payments = without_payments.where(credits.c.id.in_(chunk))
+        repaired += connection.execute(with_payments).rowcount
+        repaired += connection.execute(without_payments).rowcount
+    return repaired
+
+
+def record_credits(connection, rows: Iterable[dict]):
+    """
+    Враховує в агрегатах нові кредити, вставлені в обхід ORM.
+
+    Аргументи:
+    - connection: з'єднання транзакції, в якій вставлено кредити
+    - rows: словники з ключами issuance_date, body, user_id
+    """
+    deltas = RollupDeltas()
+    for row in rows:
+        deltas.add_credit(row["issuance_date"], row["body"], row.get("user_id"))
+    deltas.apply(connection)
+
+
+def record_payments(connection, rows: Iterable[dict]):
+    """
+    Враховує в агрегатах нові платежі, вставлені в обхід ORM.
+
+    Аргументи:
+    - connection: з'єднання транзакції, в якій вставлено платежі
+    - rows: словники з ключами payment_date, type_id, sum, credit_id
+    """
+    deltas = RollupDeltas()
+    for row in rows:
+        deltas.add_payment(
+            row["payment_date"], row.get("type_id"), row["sum"], row.get("credit_id")
+        )
+    deltas.apply(connection)
+
+
+def rebuild(connection):
+    """
+    Перераховує місячні агрегати, денний журнал, агрегати когорт і суми
+    платежів кредитів з таблиць Users, Credits і Payments.
+
+    Повертає:
+    - Кількість записів місячних агрегатів
+    """
+    connection.execute(delete(models.MonthlyAggregate.__table__))
+    connection.execute(delete(models.DailyLedger.__table__))
+    connection.execute(delete(models.CohortAggregate.__table__))
+
+    queries = [
+        select(
+            models.Credit.issuance_date,
+            literal(SOURCE_CREDIT),
+            literal(NO_TYPE),
+            func.count(models.Credit.id),
+            func.sum(models.Credit.body),
+        ).group_by(models.Credit.issuance_date),
+        select(
+            models.Payment.payment_date,
+            literal(SOURCE_PAYMENT),
+            func.coalesce(models.Payment.type_id, NO_TYPE),
+            func.count(models.Payment.id),
+            func.sum(models.Payment.sum),
+        ).group_by(models.Payment.payment_date, models.Payment.type_id),
+    ]
+
+    deltas = RollupDeltas()
+    for query in queries:
+        for day, source, type_id, count, total in connection.execute(query):
+            deltas.add(day, source, type_id, count, total or 0)
+    size = len(deltas.monthly)
+
+    # Денний журнал будується одразу з накопиченими сумами, без UPDATE по днях
+    ledger = []
+    for (source, type_id), days in groupby(
+        sorted(deltas.daily.items(), key=lambda item: (item[0][1:], item[0][0])),
+        key=lambda item: item[0][1:],
+    ):
+        cumulative_count, cumulative_sum = 0, 0.0
+        for (day, _, _), (count, total) in days:
+            cumulative_count += count
+            cumulative_sum += total
+            ledger.append(
+                {
+                    "day": day,
+                    "source": source,
+                    "type_id": type_id,
+                    "count": count,
+                    "sum": total,
+                    "cumulative_count": cumulative_count,
+                    "cumulative_sum": cumulative_sum,
+                }
+            )
+    deltas.daily.clear()
+    if ledger:
+        connection.execute(models.DailyLedger.__table__.insert(), ledger)
+    deltas.apply(connection)
+    _rebuild_cohorts(connection)
+    repair_credit_totals(connection)
+    return size
+
+
+def _rebuild_cohorts(connection):
+    """Заповнює CohortAggregates згрупованими запитами по Users, Credits і Payments."""
+    users = models.User.__table__
+    credits = models.Credit.__table__
+    payments = models.Payment.__table__
+
+    def month_of(column):
+        return extract("year", column), extract("month", column)
+
+    cohort = month_of(users.c.registration_date)
+    queries = [
+        select(
+            *cohort, *cohort, literal(SOURCE_USER), func.count(), literal(0.0)
+        ).group_by(*cohort),
+        select(
+            *cohort,
+            *month_of(credits.c.issuance_date),
+            literal(SOURCE_CREDIT),
+            func.count(),
+            func.sum(credits.c.body),
+        )
+        .join_from(credits, users, users.c.id == credits.c.user_id)
+        .group_by(*cohort, *month_of(credits.c.issuance_date)),
+        select(
+            *cohort,
+            *month_of(payments.c.payment_date),
+            literal(SOURCE_PAYMENT),
+            func.count(),
+            func.sum(payments.c.sum),
+        )
+        .join_from(payments, credits, credits.c.id == payments.c.credit_id)
+        .join(users, users.c.id == credits.c.user_id)
+        .group_by(*cohort, *month_of(payments.c.payment_date)),
+    ]
+    rows = [
+        {
+            "cohort": date(int(cohort_year), int(cohort_month), 1),
+            "month": date(int(year), int(month), 1),
+            "source": source,
+            "count": count,
+            "sum": total or 0,
+        }
+        for query in queries
+        for cohort_year, cohort_month, year, month, source, count, total in (
+            connection.execute(query)
+        )
+    ]
+    if rows:
+        connection.execute(models.CohortAggregate.__table__.insert(), rows)
+
+
+# Колонки, зміна яких впливає на агрегати
+_TRACKED = {
+    models.User: ("registration_date",),
+    models.Credit: ("issuance_date", "body", "user_id"),
+    models.Payment: ("payment_date", "type_id", "sum", "credit_id"),
+}
+_TOUCHED_CREDITS = "rollups_touched_credits"
+_DELETED_OWNERS = "rollups_deleted_owners"
+
+
+def _state_values(state, fields, old: bool):
+    """Значення колонок до (old=True) або після flush з історії атрибутів."""
+    values = []
+    for field in fields:
+        history = state.attrs[field].history
+        current = (history.deleted if old else history.added) or history.unchanged
+        values.append(current[0] if current else None)
+    return values
+
+
+def _add(deltas: RollupDeltas, model, values, sign: int):
+    if values[0] is None:
+        return
+    if model is models.User:
+        deltas.add_user(*values, sign=sign)
+    elif model is models.Credit:
+        deltas.add_credit(*values, sign=sign)
+    else:
+        deltas.add_payment(*values, sign=sign)
+
+
+@event.listens_for(Session, "before_flush")
+def _load_deleted_values(session, flush_context, instances):
+    # Після видалення рядка прострочені атрибути вже не завантажити, а когорту
+    # видаленого кредиту (користувача) - вже не знайти в базі
+    owners = defaultdict(set)
+    for instance in session.deleted:
+        fields = _TRACKED.get(type(instance))
+        if fields:
+            for field in fields:
+                getattr(instance, field)
+        if isinstance(instance, models.Credit) and instance.user_id is not None:
+            owners[SOURCE_CREDIT].add(instance.user_id)
+        elif isinstance(instance, models.Payment) and instance.credit_id is not None:
+            owners[SOURCE_PAYMENT].add(instance.credit_id)
+    if owners:
+        cohorts = session.info.setdefault(_DELETED_OWNERS, {})
+        with session.no_autoflush:
+            connection = session.connection()
+            for source, owner_ids in owners.items():
+                cohorts.update(owner_cohorts(connection, source, owner_ids))
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_flush_deltas(session, flush_context):
+    deltas = RollupDeltas()
+    for instances, signs in (
+        (session.new, (1,)),
+        (session.deleted, (-1,)),
+        (session.dirty, (-1, 1)),
+    ):
+        for instance in instances:
+            model = type(instance)
+            fields = _TRACKED.get(model)
+            if not fields:
+                continue
+            state = inspect(instance)
+            if len(signs) == 2 and not any(
+                state.attrs[field].history.has_changes() for field in fields
+            ):
+                continue
+            for sign in signs:
+                # Для видалених і змінених віднімаємо старі значення
+                old = sign < 0
+                _add(deltas, model, _state_values(state, fields, old), sign)
+    session.info.setdefault(_TOUCHED_CREDITS, set()).update(deltas.credits)
+    deltas.owner_cohorts.update(session.info.pop(_DELETED_OWNERS, {}))
+    deltas.apply(session.connection())
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_credit_totals(session, flush_context):
+    # Завантажені в сесію кредити мають застарілі paid_* - перечитуються при доступі
+    for credit_id in session.info.pop(_TOUCHED_CREDITS, ()):
+        credit = session.identity_map.get(Session.identity_key(models.Credit, credit_id))
+        if credit is not None:
+            session.expire(credit, _CREDIT_TOTALS)
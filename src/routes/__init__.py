@@ -1,7 +1,10 @@
 from fastapi import APIRouter
-from src.routes import users, plans, reports
+from src.routes import users, plans, reports, exports, ingest, system
 
 router = APIRouter()
 router.include_router(users.router)
 router.include_router(plans.router)
 router.include_router(reports.router)
+router.include_router(exports.router)
+router.include_router(ingest.router)
+router.include_router(system.router)
@@ -0,0 +1,59 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from src.schemas import schemas_logic
+from src.database import get_db
+from src.utils import export_data
+
+# Створення маршрутизатора для експорту даних
+router = APIRouter(tags=["Export"])
+
+
+@router.get("/export/{table}", response_class=StreamingResponse)
+async def export_table(
+    table: schemas_logic.ExportTable,
+    export_format: schemas_logic.ExportFormat = Query(
+        schemas_logic.ExportFormat.csv, alias="format"
+    ),
+    date_from: date | None = None,
+    date_to: date | None = None,
+    after_id: int | None = Query(None, ge=0),
+    batch_size: int = Query(export_data.DEFAULT_BATCH_SIZE, ge=100, le=100_000),
+    db: Session = Depends(get_db),
+):
+    """
+    Endpoint для потокового експорту кредитів або платежів.
+
+    - **table**: `credits` або `payments`
+    - **format**: `csv` (табуляція, як `data/*.csv`), `ndjson` або `parquet`
+    - **date_from**, **date_to**: проміжок дат видачі / платежу (включно)
+    - **after_id**: продовжити після рядка з цим id (перерваний експорт)
+    - **batch_size**: кількість рядків, що читаються з бази за раз
+    - **db**: синхронна сесія бази даних
+
+    Рядки впорядковані за id і читаються курсором на стороні сервера пачками,
+    тож пам'ять не залежить від розміру проміжку. Щоб продовжити перерваний
+    експорт, передайте `after_id` = id останнього отриманого рядка
+    (CSV при цьому без заголовка).
+    """
+
+    def chunks():
+        # Запит виконується в пулі потоків, як і все читання відповіді
+        yield from export_data.export_chunks(
+            db.connection(),
+            table.value,
+            export_format.value,
+            date_from=date_from,
+            date_to=date_to,
+            after_id=after_id,
+            batch_size=batch_size,
+        )
+
+    filename = f"{table.value}.{export_format.value}"
+    return StreamingResponse(
+        chunks(),
+        media_type=export_data.MEDIA_TYPES[export_format.value],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
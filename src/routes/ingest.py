@@ -0,0 +1,112 @@
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from src import config, crud_async
+from src.schemas import schemas_logic
+from src.database import get_db_session
+from src.utils import bulk_ingest
+
+# Створення маршрутизатора для масового завантаження кредитів і платежів
+router = APIRouter(tags=["Ingest"])
+
+# Тіло запиту - NDJSON, а не JSON-схема, тому описується для OpenAPI вручну
+NDJSON_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+    }
+}
+
+
+async def _ingest(
+    request: Request, table_name: str, batch_size: int, db: AsyncSession | Session
+) -> schemas_logic.BulkIngestResponse:
+    """Читає тіло запиту пачками і зберігає кожну в окремій транзакції."""
+    started = time.perf_counter()
+    batches = []
+    async for lines in bulk_ingest.iter_ndjson_batches(request.stream(), batch_size):
+        batches.append(
+            await crud_async.run(
+                db, bulk_ingest.ingest_batch, table_name, len(batches) + 1, lines
+            )
+        )
+    if not batches:
+        raise HTTPException(status_code=400, detail="Request body has no NDJSON lines")
+    return bulk_ingest.summarize(table_name, batches, time.perf_counter() - started)
+
+
+@router.post(
+    "/credits/bulk",
+    response_model=schemas_logic.BulkIngestResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=NDJSON_BODY,
+)
+async def bulk_credits(
+    request: Request,
+    batch_size: int = Query(
+        config.BULK_INGEST_BATCH_SIZE, ge=1, le=bulk_ingest.MAX_BATCH_SIZE
+    ),
+    db: AsyncSession | Session = Depends(get_db_session),
+):
+    """
+    📌 Endpoint для масового завантаження кредитів потоком NDJSON.
+
+    - **тіло запиту**: по одному кредиту `CreditCreate` на рядок, наприклад
+      `{"external_id": "loan-1", "user_id": 1, "issuance_date": "2021-01-10",
+      "return_date": "2021-02-10", "body": 1000, "percent": 200}`
+    - **batch_size**: кількість рядків в одній транзакції
+    - **db**: підключення до бази даних (Session або AsyncSession)
+
+    Процес:
+    1. Читає тіло запиту потоково і розбиває на пачки по `batch_size` рядків.
+    2. Кожну пачку валідує, вставляє і фіксує окремим commit разом з агрегатами.
+    3. Кредити з уже завантаженим `external_id` пропускає (повторне надсилання
+       безпечне), некоректні рядки потрапляють у звіт пачки.
+
+    Повертає:
+    - Об'єкт BulkIngestResponse з підсумками, швидкістю та звітом по кожній пачці.
+
+    Помилки:
+    - HTTP 400: якщо тіло запиту порожнє.
+    """
+    return await _ingest(request, "credits", batch_size, db)
+
+
+@router.post(
+    "/payments/bulk",
+    response_model=schemas_logic.BulkIngestResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=NDJSON_BODY,
+)
+async def bulk_payments(
+    request: Request,
+    batch_size: int = Query(
+        config.BULK_INGEST_BATCH_SIZE, ge=1, le=bulk_ingest.MAX_BATCH_SIZE
+    ),
+    db: AsyncSession | Session = Depends(get_db_session),
+):
+    """
+    📌 Endpoint для масового завантаження платежів потоком NDJSON.
+
+    - **тіло запиту**: по одному платежу `PaymentCreate` на рядок, наприклад
+      `{"external_id": "pay-1", "credit_id": 1, "type_id": 1, "sum": 500,
+      "payment_date": "2021-01-31"}`
+    - **batch_size**: кількість рядків в одній транзакції
+    - **db**: підключення до бази даних (Session або AsyncSession)
+
+    Процес:
+    1. Читає тіло запиту потоково і розбиває на пачки по `batch_size` рядків.
+    2. Кожну пачку валідує, вставляє і фіксує окремим commit разом з агрегатами
+       та сумами платежів кредитів.
+    3. Платежі з уже завантаженим `external_id` пропускає (повторне надсилання
+       безпечне), некоректні рядки потрапляють у звіт пачки.
+
+    Повертає:
+    - Об'єкт BulkIngestResponse з підсумками, швидкістю та звітом по кожній пачці.
+
+    Помилки:
+    - HTTP 400: якщо тіло запиту порожнє.
+    """
+    return await _ingest(request, "payments", batch_size, db)
@@ -1,25 +1,60 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
+from typing import List
+
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 import pandas as pd
-from src import crud
+from src import crud_async
 from src.schemas import schemas_logic
-from src.database import get_db
+from src.database import get_db_session
+from src.utils import plans_import
 
 # Створення маршрутизатора для роботи з планами
 router = APIRouter(tags=["Plans"])
 
 
+def _read_plan_items(file: UploadFile) -> List[schemas_logic.PlanInsertItem]:
+    """Читає Excel файл планів і створює PlanInsertItem для кожного рядка."""
+    try:
+        # Читання Excel файлу у DataFrame
+        df = pd.read_excel(file.file)
+    except Exception:
+        # Повертаємо помилку, якщо файл некоректний
+        raise HTTPException(status_code=400, detail="Invalid Excel file")
+
+    # Перевірка наявності обов'язкових колонок
+    required_cols = {"period", "category_name", "sum"}
+    if not required_cols.issubset(df.columns):
+        raise HTTPException(
+            status_code=400, detail=f"Excel must have columns: {required_cols}"
+        )
+
+    # Створення списку об'єктів PlanInsertItem для вставки в базу
+    return [
+        schemas_logic.PlanInsertItem(
+            period=row["period"], category_name=row["category_name"], sum=row["sum"]
+        )
+        for _, row in df.iterrows()
+    ]
+
+
 @router.post(
     "/plans_insert",
     response_model=schemas_logic.PlanInsertResponse,
     status_code=status.HTTP_201_CREATED,
 )
-def upload_plans(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_plans(
+    file: UploadFile = File(...),
+    update_existing: bool = False,
+    db: AsyncSession | Session = Depends(get_db_session),
+):
     """
     📌 Endpoint для імпорту планів із Excel файлу.
 
     - **file**: Excel файл з колонками `period`, `category_name`, `sum`
-    - **db**: підключення до бази даних (Session)
+    - **update_existing**: оновити суму вже існуючих планів замість пропуску
+    - **db**: підключення до бази даних (Session або AsyncSession)
 
     Процес:
     1. Читає Excel файл у pandas DataFrame.
@@ -33,27 +68,54 @@ def upload_plans(file: UploadFile = File(...), db: Session = Depends(get_db)):
     Помилки:
     - HTTP 400: якщо файл не Excel або не має потрібних колонок.
     """
-    try:
-        # Читання Excel файлу у DataFrame
-        df = pd.read_excel(file.file)
-    except Exception:
-        # Повертаємо помилку, якщо файл некоректний
-        raise HTTPException(status_code=400, detail="Invalid Excel file")
+    # Читання і валідація файлу в пулі потоків, щоб не блокувати event loop
+    plan_items = await run_in_threadpool(_read_plan_items, file)
 
-    # Перевірка наявності обов'язкових колонок
-    required_cols = {"period", "category_name", "sum"}
-    if not required_cols.issubset(df.columns):
-        raise HTTPException(
-            status_code=400, detail=f"Excel must have columns: {required_cols}"
-        )
+    # Виклик CRUD-функції для збереження планів у базі
+    return await crud_async.insert_plans(
+        db, plan_items, update_existing=update_existing
+    )
 
-    # Створення списку об'єктів PlanInsertItem для вставки в базу
-    plan_items = [
-        schemas_logic.PlanInsertItem(
-            period=row["period"], category_name=row["category_name"], sum=row["sum"]
-        )
-        for _, row in df.iterrows()
-    ]
 
-    # Виклик CRUD-функції для збереження планів у базі
-    return crud.insert_plans(db, plan_items)
+@router.post(
+    "/plans_import",
+    response_model=schemas_logic.PlanImportResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_plans(
+    file: UploadFile = File(...),
+    chunk_size: int = Query(plans_import.DEFAULT_CHUNK_SIZE, ge=1, le=100_000),
+    update_existing: bool = False,
+    db: AsyncSession | Session = Depends(get_db_session),
+):
+    """
+    📌 Endpoint для потокового імпорту великих файлів планів.
+
+    - **file**: `.xlsx` з колонками `period`, `category_name`, `sum` або `.csv`
+      у форматі `data/plans.csv` (табуляція, дати `dd.mm.yyyy`, `category_id`
+      або `category_name`)
+    - **chunk_size**: кількість рядків, що валідуються і зберігаються разом
+    - **update_existing**: оновити суму вже існуючих планів замість пропуску
+    - **db**: підключення до бази даних (Session або AsyncSession)
+
+    Процес:
+    1. Читає файл построково (openpyxl read-only / csv reader), без DataFrame.
+    2. Валідує і зберігає рядки частинами по `chunk_size` з окремим commit.
+    3. Некоректні рядки не зупиняють імпорт і потрапляють у звіт частини.
+    4. Якщо файл перестає читатися посередині, імпорт зупиняється: вже збережені
+       частини лишаються в базі, а причина повертається в полі `error`.
+
+    Повертає:
+    - Об'єкт PlanImportResponse з підсумками та звітом по кожній частині.
+
+    Помилки:
+    - HTTP 400: якщо файл не .xlsx/.csv, не читається або не має потрібних колонок.
+    """
+    try:
+        rows = plans_import.iter_plan_rows(file.file, file.filename or "")
+        # Файл читається і валідується в пулі потоків, у сесії - лише запис частин
+        return await crud_async.import_plans(
+            db, rows, chunk_size=chunk_size, update_existing=update_existing
+        )
+    except plans_import.PlanFileError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
@@ -1,25 +1,31 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import date
-from src import crud
+from datetime import date, timedelta
+from src import crud, crud_async
 from src.schemas import schemas_logic
-from src.database import get_db
+from src.database import get_db_session
 
 # Створення маршрутизатора для звітів
 router = APIRouter(tags=["Reports"])
 
+# Максимальна довжина часового ряду виконання планів (у днях)
+MAX_SERIES_DAYS = 366
+
 
 @router.get(
     "/plans_performance",
     response_model=schemas_logic.PlansPerformanceResponse,
     status_code=status.HTTP_200_OK,
 )
-def plans_performance(target_date: date, db: Session = Depends(get_db)):
+async def plans_performance(
+    target_date: date, db: AsyncSession | Session = Depends(get_db_session)
+):
     """
     Endpoint для отримання інформації про виконання планів станом на певну дату.
 
     - **target_date**: дата, до якої потрібно перевірити виконання планів
-    - **db**: підключення до бази даних (Session)
+    - **db**: підключення до бази даних (Session або AsyncSession)
 
     Повертає:
     - Список планів з наступною інформацією:
@@ -31,7 +37,46 @@ def plans_performance(target_date: date, db: Session = Depends(get_db)):
 
     Використовує CRUD-функцію `get_plans_performance` для отримання даних.
     """
-    return crud.get_plans_performance(db, target_date)
+    return await crud_async.get_plans_performance(db, target_date)
+
+
+@router.get(
+    "/plans_performance_series",
+    response_model=schemas_logic.PlansPerformanceSeriesResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def plans_performance_series(
+    date_from: date,
+    date_to: date,
+    db: AsyncSession | Session = Depends(get_db_session),
+):
+    """
+    Endpoint для отримання виконання планів на кожен день проміжку дат.
+
+    - **date_from**: перша дата ряду
+    - **date_to**: остання дата ряду (включно)
+    - **db**: підключення до бази даних (Session або AsyncSession)
+
+    Повертає:
+    - Список елементів по датах (`target_date`) з виконанням планів (`plans`)
+      у форматі `/plans_performance`
+
+    Весь ряд розраховується фіксованою кількістю запитів через
+    CRUD-функцію `get_plans_performance_series`.
+
+    Помилки:
+    - HTTP 400: якщо date_from > date_to або ряд довший за MAX_SERIES_DAYS днів.
+    """
+    days = (date_to - date_from).days + 1
+    if days < 1:
+        raise HTTPException(status_code=400, detail="date_from must be <= date_to")
+    if days > MAX_SERIES_DAYS:
+        raise HTTPException(
+            status_code=400, detail=f"Series is limited to {MAX_SERIES_DAYS} days"
+        )
+
+    target_dates = [date_from + timedelta(days=i) for i in range(days)]
+    return await crud_async.get_plans_performance_series(db, target_dates)
 
 
 @router.get(
@@ -39,12 +84,14 @@ def plans_performance(target_date: date, db: Session = Depends(get_db)):
     response_model=schemas_logic.YearPerformanceResponse,
     status_code=status.HTTP_200_OK,
 )
-def year_performance(year: int, db: Session = Depends(get_db)):
+async def year_performance(
+    year: int, db: AsyncSession | Session = Depends(get_db_session)
+):
     """
     Endpoint для отримання річного звіту по місяцях.
 
     - **year**: рік для генерації звіту
-    - **db**: підключення до бази даних (Session)
+    - **db**: підключення до бази даних (Session або AsyncSession)
 
     Повертає:
     - Список по місяцях з наступною інформацією:
@@ -57,4 +104,62 @@ def year_performance(year: int, db: Session = Depends(get_db)):
 
     Використовує CRUD-функцію `get_year_performance` для отримання даних.
     """
-    return crud.get_year_performance(db, year)
+    return await crud_async.get_year_performance(db, year)
+
+
+@router.get(
+    "/overdue_portfolio",
+    response_model=schemas_logic.OverduePortfolioResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def overdue_portfolio(
+    as_of: date | None = None,
+    top_n: int = Query(10, ge=0, le=crud.OVERDUE_MAX_TOP_N),
+    db: AsyncSession | Session = Depends(get_db_session),
+):
+    """
+    Endpoint для звіту по простроченому портфелю.
+
+    - **as_of**: дата, від якої рахуються дні прострочення (за замовчуванням сьогодні)
+    - **top_n**: кількість користувачів з найбільшим простроченим боргом
+    - **db**: підключення до бази даних (Session або AsyncSession)
+
+    Повертає:
+    - Підсумок по відкритих кредитах з return_date < as_of: кількість
+      і несплачені тіло та відсотки (`outstanding_body`, `outstanding_percent`)
+    - Ті самі показники за інтервалами прострочення 1-30, 31-60, 61-90, 90+ днів
+      (`buckets`)
+    - Користувачів з найбільшим несплаченим простроченим боргом і найбільшою
+      кількістю днів прострочення (`top_users`)
+
+    Весь звіт рахується двома згрупованими запитами через CRUD-функцію
+    `get_overdue_portfolio`.
+    """
+    return await crud_async.get_overdue_portfolio(
+        db, as_of or date.today(), top_n=top_n
+    )
+
+
+@router.get(
+    "/cohorts",
+    response_model=schemas_logic.CohortsResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def cohorts(db: AsyncSession | Session = Depends(get_db_session)):
+    """
+    Endpoint для звіту по когортах користувачів за місяцем реєстрації.
+
+    - **db**: підключення до бази даних (Session або AsyncSession)
+
+    Повертає:
+    - Список когорт (`cohort` - місяць.рік реєстрації) з кількістю
+      користувачів і підсумками видач, платежів та частки закриття
+    - Для кожної когорти - показники за місяцями від реєстрації (`periods`):
+        - Кількість і сума видач (`credits_count`, `issued_body`)
+        - Кількість і сума платежів (`payments_count`, `collected_sum`)
+        - Кількість закритих кредитів з виданих за місяць та їх % (`closed_count`,
+          `closure_rate_percent`)
+
+    Використовує CRUD-функцію `get_cohorts` (з кешем звітів).
+    """
+    return await crud_async.get_cohorts(db)
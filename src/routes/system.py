@@ -0,0 +1,64 @@
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+from src import database, metrics
+from src.cache import report_cache
+from src.schemas import schemas_logic
+
+# Створення маршрутизатора для службової інформації
+router = APIRouter(tags=["System"])
+
+
+@router.get(
+    "/db_pool_stats",
+    response_model=schemas_logic.PoolStatsResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def db_pool_stats():
+    """
+    Endpoint зі станом пулів з'єднань до бази даних.
+
+    Повертає для синхронного та (якщо увімкнено) асинхронного engine:
+    - Розмір пулу, вільні та видані з'єднання, overflow
+    - Кількість видач і нових підключень
+    - Кількість і час отримання з'єднань (`wait_seconds_total`, `wait_seconds_max`)
+    - Кількість тайм-аутів очікування (`timeouts`)
+    """
+    engines = [("sync", database.engine)]
+    if database.async_engine is not None:
+        engines.append(("async", database.async_engine))
+    return [
+        {"engine": name, **database.pool_status(db_engine)}
+        for name, db_engine in engines
+    ]
+
+
+@router.get(
+    "/report_cache_stats",
+    response_model=schemas_logic.ReportCacheStats,
+    status_code=status.HTTP_200_OK,
+)
+async def report_cache_stats():
+    """
+    Endpoint зі станом кешу звітів `/year_performance` та `/plans_performance`.
+
+    Повертає:
+    - Чи увімкнено кеш, поточний і максимальний розмір, TTL
+    - Лічильники влучань (`hits`), промахів (`misses`) та витіснень (`evictions`)
+    """
+    return report_cache.stats()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Endpoint з метриками у текстовому форматі Prometheus.
+
+    Повертає гістограми за методом і шаблоном маршруту:
+    - `http_request_duration_seconds`: час обробки запиту (також за статусом)
+    - `http_request_db_seconds`: час SQL-запитів за HTTP-запит
+    - `http_request_db_queries`: кількість SQL-запитів за HTTP-запит
+    - `db_slow_queries_total`: кількість запитів, повільніших за SLOW_QUERY_MS
+    """
+    return PlainTextResponse(
+        metrics.render_metrics(), media_type="text/plain; version=0.0.4"
+    )
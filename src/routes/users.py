@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from src import crud
+from src import crud, crud_async
 from src.schemas import schemas_logic
-from src.database import get_db
+from src.database import get_db_session
 
 # Створення маршрутизатора для користувачів
 router = APIRouter(tags=["Users"])
@@ -13,12 +15,14 @@ router = APIRouter(tags=["Users"])
     response_model=schemas_logic.UserCreditsResponse,
     status_code=status.HTTP_200_OK,
 )
-def read_user_credits(user_id: int, db: Session = Depends(get_db)):
+async def read_user_credits(
+    user_id: int, db: AsyncSession | Session = Depends(get_db_session)
+):
     """
     Endpoint для отримання списку кредитів певного користувача.
 
     - **user_id**: ID користувача, для якого повертаються кредити
-    - **db**: підключення до бази даних (Session)
+    - **db**: підключення до бази даних (Session або AsyncSession)
 
     Повертає:
     - Список кредитів користувача з детальною інформацією про кожен кредит:
@@ -29,4 +33,97 @@ def read_user_credits(user_id: int, db: Session = Depends(get_db)):
 
     Використовує CRUD-функцію `get_user_credits` для отримання даних з бази.
     """
-    return crud.get_user_credits(db, user_id)
+    return await crud_async.get_user_credits(db, user_id)
+
+
+@router.get(
+    "/user_credits/{user_id}/page",
+    response_model=schemas_logic.UserCreditsPage,
+    status_code=status.HTTP_200_OK,
+)
+async def read_user_credits_page(
+    user_id: int,
+    limit: int = Query(
+        crud.USER_CREDITS_PAGE_SIZE, ge=1, le=crud.USER_CREDITS_MAX_PAGE_SIZE
+    ),
+    cursor: str | None = None,
+    credit_status: schemas_logic.CreditStatus | None = Query(None, alias="status"),
+    db: AsyncSession | Session = Depends(get_db_session),
+):
+    """
+    Endpoint для посторінкового отримання кредитів користувача.
+
+    - **user_id**: ID користувача
+    - **limit**: кількість кредитів на сторінці
+    - **cursor**: `next_cursor` попередньої сторінки (без нього - перша сторінка)
+    - **status**: `open` або `closed` - лише відкриті чи закриті кредити
+    - **db**: підключення до бази даних (Session або AsyncSession)
+
+    Кредити впорядковані за датою видачі та id. Сторінки будуються за курсором
+    (keyset), тож час відповіді не залежить від номера сторінки.
+
+    Повертає:
+    - `items`: кредити у форматі `/user_credits/{user_id}`
+    - `next_cursor`: курсор наступної сторінки або null для останньої
+
+    Помилки:
+    - HTTP 400: якщо курсор пошкоджений
+    """
+    try:
+        return await crud_async.get_user_credits_page(
+            db, user_id, limit=limit, cursor=cursor, status=credit_status
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@router.get("/user_credits/{user_id}/stream", response_class=StreamingResponse)
+async def stream_user_credits(
+    user_id: int,
+    credit_status: schemas_logic.CreditStatus | None = Query(None, alias="status"),
+    db: AsyncSession | Session = Depends(get_db_session),
+):
+    """
+    Endpoint для потокового отримання всіх кредитів користувача у форматі NDJSON.
+
+    - **user_id**: ID користувача
+    - **status**: `open` або `closed` - лише відкриті чи закриті кредити
+    - **db**: підключення до бази даних (Session або AsyncSession)
+
+    Кожен рядок відповіді - один кредит у форматі `/user_credits/{user_id}`.
+    Кредити читаються з бази сторінками та надсилаються одразу, тож пам'ять
+    не залежить від кількості кредитів користувача.
+    """
+
+    async def lines():
+        async for item in crud_async.iter_user_credits(
+            db, user_id, status=credit_status
+        ):
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/user_credits/batch",
+    response_model=schemas_logic.UserCreditsBatchResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def read_users_credits(
+    request: schemas_logic.UserCreditsBatchRequest,
+    db: AsyncSession | Session = Depends(get_db_session),
+):
+    """
+    Endpoint для отримання кредитів багатьох користувачів одним запитом.
+
+    - **user_ids**: список ID користувачів (до 10000)
+    - **db**: підключення до бази даних (Session або AsyncSession)
+
+    Кредити читаються кількома запитами `user_id IN (...)` незалежно від
+    кількості користувачів, замість окремого `/user_credits/{user_id}` на кожного.
+
+    Повертає:
+    - Список `{user_id, credits}` у порядку запиту; `credits` - у форматі
+      `/user_credits/{user_id}`, порожній для користувачів без кредитів
+    """
+    return await crud_async.get_users_credits(db, request.user_ids)
@@ -30,7 +30,7 @@ class CreditBase(BaseModel):
 
 
 class CreditCreate(CreditBase):
-    pass
+    external_id: str = Field(..., min_length=1, max_length=64)
 
 
 class CreditRead(CreditBase):
@@ -75,7 +75,7 @@ class PaymentBase(BaseModel):
 
 
 class PaymentCreate(PaymentBase):
-    pass
+    external_id: str = Field(..., min_length=1, max_length=64)
 
 
 class PaymentRead(PaymentBase):
@@ -1,4 +1,5 @@
 from datetime import date
+from enum import Enum
 from typing import Optional, List, Union
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -31,6 +32,79 @@ class UserCreditOpen(UserCreditBase):
 UserCreditsResponse = List[Union[UserCreditClosed, UserCreditOpen]]
 
 
+class CreditStatus(str, Enum):
+    """Фільтр кредитів за станом"""
+    open = "open"
+    closed = "closed"
+
+
+class UserCreditsPage(BaseModel):
+    """Сторінка кредитів користувача (keyset-пагінація за датою видачі та id)"""
+    items: UserCreditsResponse = Field(..., description="Кредити сторінки")
+    next_cursor: Optional[str] = Field(
+        None, description="Курсор наступної сторінки; null - це остання сторінка"
+    )
+
+
+# /user_credits/batch
+class UserCreditsBatchRequest(BaseModel):
+    """Список користувачів для пакетного запиту кредитів"""
+    user_ids: List[int] = Field(
+        ..., min_length=1, max_length=10000, description="ID користувачів"
+    )
+
+
+class UserCreditsBatchItem(BaseModel):
+    """Кредити одного користувача у пакетній відповіді"""
+    user_id: int
+    credits: UserCreditsResponse = Field(..., description="Кредити користувача")
+
+
+UserCreditsBatchResponse = List[UserCreditsBatchItem]
+
+
+# /export/{table}
+class ExportTable(str, Enum):
+    """Таблиця для експорту"""
+    credits = "credits"
+    payments = "payments"
+
+
+class ExportFormat(str, Enum):
+    """Формат експорту"""
+    csv = "csv"
+    ndjson = "ndjson"
+    parquet = "parquet"
+
+
+# /credits/bulk, /payments/bulk
+class BulkIngestBatch(BaseModel):
+    """Звіт по одній пачці масового завантаження (одна транзакція)"""
+    batch: int = Field(..., description="Номер пачки (з 1)")
+    rows: int = Field(..., description="Кількість рядків NDJSON у пачці")
+    inserted_count: int = 0
+    duplicate_count: int = Field(0, description="Рядки з уже завантаженим external_id")
+    rejected_count: int = 0
+    rejected: List[str] = Field(default_factory=list, description="Приклади відхилених рядків")
+    failed_count: int = Field(0, description="Рядки, не вставлені через помилку транзакції")
+    error: Optional[str] = Field(None, description="Причина відкоту транзакції пачки")
+    elapsed_ms: float = 0
+    rows_per_second: float = 0
+
+
+class BulkIngestResponse(BaseModel):
+    """Вихід після масового завантаження кредитів або платежів"""
+    total_rows: int = 0
+    inserted_count: int = 0
+    duplicate_count: int = 0
+    rejected_count: int = 0
+    failed_count: int = 0
+    elapsed_ms: float = 0
+    rows_per_second: float = 0
+    batches: List[BulkIngestBatch] = Field(default_factory=list)
+    message: str
+
+
 # /plans_insert
 class PlanInsertItem(BaseModel):
     """Один запис із Excel-файлу (вхід)"""
@@ -42,10 +116,38 @@ class PlanInsertItem(BaseModel):
 class PlanInsertResponse(BaseModel):
     """Вихід після імпорту планів"""
     inserted_count: int
+    updated_count: int = Field(0, description="Плани, суму яких оновлено")
     skipped: List[str] = Field(default_factory=list, description="Плани, що вже були у БД")
     message: str
 
 
+# /plans_import
+class PlanImportChunk(BaseModel):
+    """Звіт по одній частині потокового імпорту планів"""
+    chunk: int = Field(..., description="Номер частини (з 1)")
+    rows: int = Field(..., description="Кількість рядків у частині")
+    inserted_count: int = 0
+    updated_count: int = 0
+    skipped_count: int = 0
+    errors_count: int = 0
+    skipped: List[str] = Field(default_factory=list, description="Приклади пропущених планів")
+    errors: List[str] = Field(default_factory=list, description="Приклади некоректних рядків")
+
+
+class PlanImportResponse(BaseModel):
+    """Вихід після потокового імпорту планів"""
+    total_rows: int = 0
+    inserted_count: int = 0
+    updated_count: int = 0
+    skipped_count: int = 0
+    errors_count: int = 0
+    chunks: List[PlanImportChunk] = Field(default_factory=list)
+    error: Optional[str] = Field(
+        None, description="Чому імпорт зупинено; збережені частини лишаються в БД"
+    )
+    message: str
+
+
 # /plans_performance 
 class PlanPerformanceItem(BaseModel):
     period: date
@@ -58,6 +160,16 @@ class PlanPerformanceItem(BaseModel):
 PlansPerformanceResponse = List[PlanPerformanceItem]
 
 
+# /plans_performance_series
+class PlansPerformanceSeriesItem(BaseModel):
+    """Виконання планів станом на одну дату з часового ряду"""
+    target_date: date
+    plans: List[PlanPerformanceItem]
+
+
+PlansPerformanceSeriesResponse = List[PlansPerformanceSeriesItem]
+
+
 # /year_performance
 class YearPerformanceItem(BaseModel):
     period: str = Field(..., description="Місяць і рік (формат MM.YYYY)")
@@ -77,3 +189,90 @@ class YearPerformanceItem(BaseModel):
 
 
 YearPerformanceResponse = List[YearPerformanceItem]
+
+
+# /overdue_portfolio
+class OverdueTotals(BaseModel):
+    credits_count: int = Field(0, description="Кількість прострочених кредитів")
+    outstanding_body: float = Field(0, description="Несплачене тіло")
+    outstanding_percent: float = Field(0, description="Несплачені відсотки")
+    outstanding_total: float = Field(0, description="Несплачене тіло і відсотки")
+
+
+class OverdueBucket(OverdueTotals):
+    """Прострочені кредити одного інтервалу днів прострочення"""
+    bucket: str = Field(..., description="Інтервал днів прострочення, наприклад 31-60")
+    days_from: int
+    days_to: Optional[int] = Field(None, description="Включно; None - без обмеження")
+
+
+class OverdueUser(OverdueTotals):
+    """Користувач з найбільшим простроченим боргом"""
+    user_id: int
+    login: Optional[str] = None
+    max_overdue_days: int
+
+
+class OverduePortfolioResponse(OverdueTotals):
+    """Прострочений портфель станом на дату"""
+    as_of: date
+    buckets: List[OverdueBucket]
+    top_users: List[OverdueUser]
+
+
+# /cohorts
+class CohortPeriodItem(BaseModel):
+    """Показники когорти за один місяць від реєстрації"""
+    months_since_registration: int = Field(..., description="0 - місяць реєстрації")
+    credits_count: int = Field(..., description="Кількість видач за місяць")
+    issued_body: float = Field(..., description="Сума видач за місяць")
+    payments_count: int = Field(..., description="Кількість платежів за місяць")
+    collected_sum: float = Field(..., description="Сума платежів за місяць")
+    closed_count: int = Field(..., description="Закриті кредити з виданих за місяць")
+    closure_rate_percent: float = Field(..., description="% закритих з виданих за місяць")
+
+
+class CohortItem(BaseModel):
+    """Когорта користувачів, зареєстрованих в одному місяці"""
+    cohort: str = Field(..., description="Місяць реєстрації (мм.рррр)")
+    users_count: int
+    credits_count: int
+    issued_body: float
+    collected_sum: float
+    closure_rate_percent: float = Field(..., description="% закритих з усіх кредитів когорти")
+    periods: List[CohortPeriodItem]
+
+
+CohortsResponse = List[CohortItem]
+
+
+# /db_pool_stats
+class PoolStatsItem(BaseModel):
+    """Стан пулу з'єднань одного engine"""
+    engine: str = Field(..., description="sync або async")
+    pool: str = Field(..., description="Клас пулу з'єднань")
+    size: Optional[int] = Field(None, description="Розмір пулу")
+    checked_in: Optional[int] = Field(None, description="Вільні з'єднання в пулі")
+    checked_out: Optional[int] = Field(None, description="Видані з'єднання")
+    overflow: Optional[int] = Field(None, description="З'єднання понад розмір пулу")
+    checkouts: int
+    connects: int
+    waits: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+    timeouts: int
+
+
+PoolStatsResponse = List[PoolStatsItem]
+
+
+# /report_cache_stats
+class ReportCacheStats(BaseModel):
+    """Стан кешу звітів"""
+    enabled: bool
+    size: int = Field(..., description="Кількість закешованих звітів")
+    max_size: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int = Field(..., description="Записи, витіснені через обмеження розміру")
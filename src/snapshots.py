@@ -0,0 +1,365 @@
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+from sqlalchemy import func, select
+
+from src import columnar, config, models, rollups
+from src.cache import data_versions
+from src.utils import export_data
+
+
+# Знімки Credits, Payments і Plans у локальних Parquet-файлах, розбиті за місяцями
+# (REPORT_BACKEND=parquet).
+#
+# Знімок - каталог SNAPSHOT_DIR/<id>/<таблиця>/month=YYYY-MM/part-0.parquet
+# і manifest.json з часом створення, датою даних і кількістю рядків.
+# manifest.json у SNAPSHOT_DIR вказує на поточний знімок і замінюється
+# атомарно, тож читачі не бачать знімок, який ще записується.
+#
+# Звіти за роки, що закінчилися до дати знімка (закриті роки), читають лише
+# партиції потрібних місяців і потрібні колонки; решта звітів іде в базу.
+# Маніфест зберігає також місячні агрегати (MonthlyAggregates) на момент знімка.
+# Перед першим використанням знімка років процес звіряє їх (і плани знімка)
+# з базою: якщо агрегати місяців закритого року вже інші (платежі чи видачі
+# заднім числом, видалення) або плани перезаписано, звіт за цей рік рахується
+# запитами до бази. Далі знімок років використовується без запитів, доки не
+# зміниться версія даних цих років (src/cache.py) або не мине REPORT_CACHE_TTL -
+# записи інших процесів, як і для кешу звітів, помітні після TTL.
+
+MANIFEST_NAME = "manifest.json"
+PARTITION_KEY = "month"
+# Скільки знімків залишати (попередній - для читачів, що ще його читають)
+KEEP_SNAPSHOTS = 2
+
+# Колонки, які читають звіти
+REPORT_COLUMNS = {
+    "credits": ["issuance_date", "body"],
+    "payments": ["payment_date", "type_id", "sum"],
+    "plans": ["id", "period", "category_id", "sum"],
+}
+# Допустима розбіжність сум агрегатів (порядок додавання при rebuild_rollups)
+AGGREGATE_TOLERANCE = 0.005
+
+
+def _month_key(month: date) -> str:
+    return f"{month.year:04d}-{month.month:02d}"
+
+
+def _iter_months(first: date, last: date):
+    month = rollups.month_start(first)
+    while month <= last:
+        yield month
+        month = rollups.next_month_start(month)
+
+
+def write_snapshot(
+    connection,
+    directory: str | Path,
+    batch_size: int = export_data.DEFAULT_BATCH_SIZE,
+    today: date | None = None,
+) -> dict:
+    """
+    Записує знімок усіх таблиць і робить його поточним.
+
+    Аргументи:
+    - connection: з'єднання з базою даних
+    - directory: каталог знімків (SNAPSHOT_DIR)
+    - batch_size: кількість рядків, що читаються з бази за раз
+    - today: дата даних знімка (за замовчуванням - сьогодні)
+
+    Логіка:
+    - Записує в маніфест місячні агрегати бази (read_aggregates) до читання
+      таблиць: рядок, доданий під час запису, робить знімок застарілим, а не
+      непомітним
+    - Для кожного місяця між мінімальною та максимальною датою таблиці читає
+      його рядки потоково (export_data.iter_batches) і пише окрему партицію
+    - Записує manifest.json знімка, потім атомарно замінює поточний manifest.json
+    - Видаляє старі знімки, крім KEEP_SNAPSHOTS останніх
+
+    Повертає:
+    - Маніфест знімка
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directory = Path(directory)
+    snapshot_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    snapshot_dir = directory / snapshot_id
+    manifest = {
+        "snapshot_id": snapshot_id,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "data_through": (today or date.today()).isoformat(),
+        "aggregates": read_aggregates(connection),
+        "tables": {},
+    }
+
+    for table_name, (model, date_column, columns) in export_data.EXPORT_TABLES.items():
+        schema = export_data.arrow_schema(model, columns)
+        column = getattr(model, date_column)
+        first, last = connection.execute(
+            select(func.min(column), func.max(column))
+        ).one()
+        months = {}
+        for month in _iter_months(first, last) if first is not None else ():
+            batches = export_data.iter_batches(
+                connection,
+                table_name,
+                date_from=month,
+                date_to=rollups.next_month_start(month) - timedelta(days=1),
+                batch_size=batch_size,
+            )
+            writer = None
+            rows = 0
+            for batch in batches:
+                if writer is None:
+                    path = (
+                        snapshot_dir
+                        / table_name
+                        / f"{PARTITION_KEY}={_month_key(month)}"
+                        / "part-0.parquet"
+                    )
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    writer = pq.ParquetWriter(path, schema)
+                writer.write_table(
+                    pa.Table.from_pylist(
+                        [dict(zip(columns, row)) for row in batch], schema
+                    )
+                )
+                rows += len(batch)
+            if writer is not None:
+                writer.close()
+                months[_month_key(month)] = rows
+        manifest["tables"][table_name] = {
+            "rows": sum(months.values()),
+            "months": months,
+        }
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    (snapshot_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    pending = directory / f"{MANIFEST_NAME}.tmp"
+    pending.write_text(json.dumps(manifest, indent=2))
+    os.replace(pending, directory / MANIFEST_NAME)
+
+    snapshots = sorted(
+        path.name
+        for path in directory.iterdir()
+        if path.is_dir() and (path / MANIFEST_NAME).exists()
+    )
+    for name in snapshots[:-KEEP_SNAPSHOTS]:
+        shutil.rmtree(directory / name, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(directory: str | Path | None = None) -> dict | None:
+    """Маніфест поточного знімка або None, якщо знімків немає."""
+    path = Path(directory or config.SNAPSHOT_DIR) / MANIFEST_NAME
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+
+
+def _year_months(years) -> set[str]:
+    return {f"{year:04d}-{month:02d}" for year in years for month in range(1, 13)}
+
+
+def read_aggregates(connection, years=None) -> dict:
+    """
+    Місячні агрегати бази у форматі маніфесту.
+
+    Аргументи:
+    - connection: сесія або з'єднання бази даних
+    - years: роки, за які потрібні агрегати (None - усі)
+
+    Повертає:
+    - {"YYYY-MM": {"source:type_id": [кількість, сума]}} без порожніх рядків
+    """
+    table = models.MonthlyAggregate
+    query = select(table.month, table.source, table.type_id, table.count, table.sum)
+    if years:
+        query = query.where(
+            table.month >= date(min(years), 1, 1),
+            table.month < date(max(years) + 1, 1, 1),
+        )
+    months = _year_months(years) if years else None
+    result = {}
+    for month, source, type_id, count, total in connection.execute(query):
+        key = _month_key(month)
+        if (count or total) and (months is None or key in months):
+            result.setdefault(key, {})[f"{source}:{type_id}"] = [count, total]
+    return result
+
+
+def is_current(connection, manifest: dict, years) -> bool:
+    """
+    Чи збігаються агрегати місяців років years у базі з агрегатами маніфесту.
+
+    Знімок без агрегатів (записаний до їх появи) вважається застарілим.
+    Плани порівнює get_snapshot окремо, з планами прочитаного знімка.
+    """
+    recorded = manifest.get("aggregates")
+    if recorded is None:
+        return False
+    months = _year_months(years)
+    recorded = {month: rows for month, rows in recorded.items() if month in months}
+    actual = read_aggregates(connection, years)
+    if recorded.keys() != actual.keys():
+        return False
+    for month, rows in actual.items():
+        if rows.keys() != recorded[month].keys():
+            return False
+        for key, (count, total) in rows.items():
+            recorded_count, recorded_total = recorded[month][key]
+            if (
+                count != recorded_count
+                or abs(total - recorded_total) > AGGREGATE_TOLERANCE
+            ):
+                return False
+    return True
+
+
+def covers(manifest: dict | None, years) -> bool:
+    """Чи всі роки years закінчилися до дати даних знімка."""
+    if manifest is None:
+        return False
+    data_through = date.fromisoformat(manifest["data_through"])
+    return all(date(year + 1, 1, 1) <= data_through for year in years)
+
+
+def _read_months(table_dir: Path, months: list[str], columns: list[str]):
+    """Таблиця Arrow лише з партицій months і колонок columns."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(
+        table_dir,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([(PARTITION_KEY, pa.string())]), flavor="hive"
+        ),
+    )
+    # Фільтр за ключем партиції відкидає файли інших місяців без читання
+    return dataset.to_table(
+        columns=columns, filter=ds.field(PARTITION_KEY).isin(months)
+    )
+
+
+def _column(table, name: str, dtype, null=None) -> np.ndarray:
+    """Колонка таблиці Arrow як масив NumPy (порожній, якщо таблиці немає)."""
+    if table is None:
+        return np.array([], dtype=dtype)
+    column = table.column(name)
+    if null is not None:
+        column = column.fill_null(null)
+    return column.to_numpy().astype(dtype)
+
+
+_cache_lock = Lock()
+_cache = {}
+# Звірені з базою знімки: {ключ _cache: (версія даних років, час до наступної звірки)}
+_checked = {}
+
+
+def _read_plans(connection, years) -> list[columnar.PlanRow]:
+    """Плани за місяці років years з бази у порядку id."""
+    plan = models.Plan
+    return [
+        columnar.PlanRow(*row)
+        for row in connection.execute(
+            select(plan.id, plan.period, plan.category_id, plan.sum)
+            .where(
+                plan.period >= date(years[0], 1, 1),
+                plan.period < date(years[-1] + 1, 1, 1),
+            )
+            .order_by(plan.id)
+        )
+    ]
+
+
+def get_snapshot(connection, years, directory: str | Path | None = None):
+    """
+    Знімок колонкових даних (columnar.ColumnarSnapshot) за місяці років years.
+
+    Аргументи:
+    - connection: сесія або з'єднання бази даних (звірка знімка з базою)
+    - years: роки, для яких потрібні дані
+    - directory: каталог знімків (за замовчуванням SNAPSHOT_DIR)
+
+    Логіка:
+    - Знімок років звіряється з базою (агрегати - is_current, плани -
+      з планами знімка) лише при першому використанні, після зміни версії
+      даних цих років у процесі або через REPORT_CACHE_TTL; інакше запитів
+      до бази немає
+
+    Повертає:
+    - ColumnarSnapshot з видачами, платежами і планами зі знімка
+    - None, якщо поточний знімок не покриває ці роки (рік ще не закінчився
+      на дату знімка або знімків немає) чи дані цих років у базі вже змінилися
+    """
+    directory = Path(directory or config.SNAPSHOT_DIR)
+    manifest = read_manifest(directory)
+    years = tuple(sorted(set(years)))
+    if not covers(manifest, years):
+        return None
+
+    key = (str(directory), manifest["snapshot_id"], years)
+    # Версія - до звірки: запис, зафіксований під час неї, викличе нову звірку
+    version = data_versions.snapshot(years)
+    with _cache_lock:
+        snapshot = _cache.get(key)
+        checked = _checked.get(key)
+    if snapshot is not None and checked is not None:
+        checked_version, check_until = checked
+        if checked_version == version and check_until > time.monotonic():
+            return snapshot
+
+    if not is_current(connection, manifest, years):
+        return None
+    if snapshot is None:
+        snapshot = _read_snapshot(directory, manifest, years)
+    if snapshot.plans != _read_plans(connection, years):
+        return None
+    with _cache_lock:
+        # Лише знімки поточного маніфесту: старі стають недоступними після заміни
+        for old_key in [k for k in _cache if k[1] != manifest["snapshot_id"]]:
+            del _cache[old_key]
+            _checked.pop(old_key, None)
+        _cache[key] = snapshot
+        _checked[key] = (version, time.monotonic() + config.REPORT_CACHE_TTL)
+    return snapshot
+
+
+def _read_snapshot(directory: Path, manifest: dict, years) -> columnar.ColumnarSnapshot:
+    """Ряди видач і платежів та плани років years з партицій знімка."""
+    snapshot_dir = directory / manifest["snapshot_id"]
+    tables = manifest["tables"]
+    wanted = _year_months(years)
+
+    def read(table_name):
+        months = sorted(wanted & set(tables[table_name]["months"]))
+        if not months:
+            return None
+        return _read_months(
+            snapshot_dir / table_name, months, REPORT_COLUMNS[table_name]
+        )
+
+    credits, payments, plans = read("credits"), read("payments"), read("plans")
+    return columnar.build_snapshot(
+        _column(credits, "issuance_date", "datetime64[D]"),
+        _column(credits, "body", np.float64),
+        _column(payments, "payment_date", "datetime64[D]"),
+        _column(payments, "type_id", np.int16, null=rollups.NO_TYPE),
+        _column(payments, "sum", np.float64),
+        sorted(
+            (columnar.PlanRow(**row) for row in plans.to_pylist())
+            if plans is not None
+            else (),
+            key=lambda plan: plan.id,
+        ),
+    )
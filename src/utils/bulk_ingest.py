@@ -0,0 +1,241 @@
+import time
+from typing import AsyncIterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src import models, registry, rollups
+from src.cache import bump_data_version
+from src.schemas import schemas_base, schemas_logic
+
+
+# Масове завантаження кредитів і платежів з NDJSON пачками
+# (POST /credits/bulk, POST /payments/bulk).
+#
+# Кожна пачка валідується і вставляється в окремій транзакції разом з оновленням
+# агрегатів (src/rollups.py), тож у пам'яті одночасно лише одна пачка. Рядки
+# з уже завантаженим external_id пропускаються, тому перерване завантаження
+# можна просто надіслати ще раз.
+
+# Максимальний розмір пачки (обмежує кількість параметрів IN (...) та INSERT)
+MAX_BATCH_SIZE = 10_000
+# Скільки повідомлень про відхилені рядки зберігати для однієї пачки
+MAX_BATCH_MESSAGES = 50
+# Скільки разів вставляти пачку при конфлікті external_id з паралельним запитом
+INSERT_ATTEMPTS = 2
+
+# Таблиця -> (модель, схема рядка, колонка дати, оновлення агрегатів)
+INGEST_TABLES = {
+    "credits": (
+        models.Credit,
+        schemas_base.CreditCreate,
+        "issuance_date",
+        rollups.record_credits,
+    ),
+    "payments": (
+        models.Payment,
+        schemas_base.PaymentCreate,
+        "payment_date",
+        rollups.record_payments,
+    ),
+}
+
+# Рядок пачки: (номер рядка в тілі запиту, рядок NDJSON)
+NdjsonLine = Tuple[int, bytes]
+
+
+async def iter_ndjson_batches(
+    chunks: AsyncIterator[bytes], batch_size: int
+) -> AsyncIterator[List[NdjsonLine]]:
+    """
+    Розбиває потік тіла запиту на пачки непорожніх рядків NDJSON.
+
+    Аргументи:
+    - chunks: частини тіла запиту (Request.stream())
+    - batch_size: кількість рядків у пачці
+
+    Повертає:
+    - Пачки [(номер рядка, рядок)]; у пам'яті лише поточна пачка і
+      неповний рядок з кінця останньої частини
+    """
+    batch = []
+    tail = b""
+    number = 0
+    async for chunk in chunks:
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            number += 1
+            if line.strip():
+                batch.append((number, line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if tail.strip():
+        batch.append((number + 1, tail))
+    if batch:
+        yield batch
+
+
+def _missing_references(db: Session, table_name: str, rows: dict) -> dict:
+    """
+    Рядки, що посилаються на неіснуючі записи.
+
+    Аргументи:
+    - rows: {external_id: рядок}
+
+    Повертає:
+    - {external_id: опис помилки}
+    """
+    if table_name == "credits":
+        user_ids = {row["user_id"] for row in rows.values()}
+        known = set(
+            db.scalars(select(models.User.id).where(models.User.id.in_(user_ids)))
+        )
+        return {
+            external_id: f"user_id - unknown user {row['user_id']}"
+            for external_id, row in rows.items()
+            if row["user_id"] not in known
+        }
+
+    credit_ids = {row["credit_id"] for row in rows.values()}
+    known = set(
+        db.scalars(select(models.Credit.id).where(models.Credit.id.in_(credit_ids)))
+    )
+    dictionary = registry.get_registry(db)
+    if any(dictionary.name_of(row["type_id"]) is None for row in rows.values()):
+        # Тип могли додати в іншому процесі - перечитуємо довідник
+        dictionary = registry.load_registry(db)
+
+    missing = {}
+    for external_id, row in rows.items():
+        if row["credit_id"] not in known:
+            missing[external_id] = f"credit_id - unknown credit {row['credit_id']}"
+        elif dictionary.name_of(row["type_id"]) is None:
+            missing[external_id] = f"type_id - unknown payment type {row['type_id']}"
+    return missing
+
+
+def _existing_external_ids(db: Session, table, rows: dict) -> set:
+    """external_id рядків пачки, що вже є в базі."""
+    if not rows:
+        return set()
+    query = select(table.c.external_id).where(table.c.external_id.in_(list(rows)))
+    return set(db.scalars(query))
+
+
+def ingest_batch(
+    db: Session, table_name: str, number: int, lines: List[NdjsonLine]
+) -> schemas_logic.BulkIngestBatch:
+    """
+    Валідує і вставляє одну пачку кредитів або платежів в окремій транзакції.
+
+    Аргументи:
+    - db: сесія бази даних
+    - table_name: "credits" або "payments"
+    - number: номер пачки для звіту
+    - lines: рядки NDJSON пачки (див. iter_ndjson_batches)
+
+    Логіка:
+    - Кожен рядок валідується схемою CreditCreate / PaymentCreate
+    - Відхиляє рядки з некоректними полями і посиланнями на неіснуючих
+      користувачів, кредити або типи платежів
+    - Рядки з external_id, що вже є в базі або раніше в цій пачці,
+      вважаються дублікатами і пропускаються
+    - Нові рядки вставляються одним executemany, агрегати оновлюються
+      rollups.record_credits / record_payments у тій самій транзакції
+    - Якщо вставка порушує цілісність, транзакція відкочується і external_id
+      пачки перечитуються: коли паралельний запит встиг вставити частину з них,
+      пачка вставляється ще раз без них (до INSERT_ATTEMPTS спроб). Рішення
+      не залежить від тексту помилки драйвера (назви індексу, мови)
+    - Інша помилка цілісності (наприклад, кредит видалено після перевірки)
+      або конфлікт і в останній спробі - рядки пачки не вставлені: вони
+      рахуються в failed_count, а причина записується в error
+
+    Повертає:
+    - BulkIngestBatch з кількістю вставлених, дублікатів, відхилених
+      і невставлених рядків та швидкістю обробки пачки
+    """
+    started = time.perf_counter()
+    model, schema, date_column, record = INGEST_TABLES[table_name]
+    table = model.__table__
+    report = schemas_logic.BulkIngestBatch(batch=number, rows=len(lines))
+    rejected = []
+
+    rows, line_of = {}, {}
+    for line, raw in lines:
+        try:
+            item = schema.model_validate_json(raw)
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            field = error["loc"][-1] if error["loc"] else "json"
+            rejected.append(f"line {line}: {field} - {error['msg']}")
+            continue
+        if item.external_id in rows:
+            report.duplicate_count += 1
+            continue
+        rows[item.external_id] = item.model_dump()
+        line_of[item.external_id] = line
+
+    if rows:
+        for external_id, error in _missing_references(db, table_name, rows).items():
+            rejected.append(f"line {line_of[external_id]}: {error}")
+            del rows[external_id]
+
+    new_rows, existing = [], _existing_external_ids(db, table, rows)
+    for _ in range(INSERT_ATTEMPTS):
+        new_rows = [row for key, row in rows.items() if key not in existing]
+        try:
+            if new_rows:
+                db.execute(insert(table), new_rows)
+                record(db.connection(), new_rows)
+            db.commit()
+            report.error = None
+            break
+        except IntegrityError as exc:
+            db.rollback()
+            report.error = str(exc.orig)
+            # Повторна спроба пропустить рядки, вставлені паралельним запитом;
+            # якщо таких немає, помилка інша і повтор її не виправить
+            inserted_elsewhere = _existing_external_ids(db, table, rows)
+            if inserted_elsewhere <= existing:
+                break
+            existing = inserted_elsewhere
+    if report.error is not None:
+        report.failed_count, new_rows = len(new_rows), []
+    if new_rows:
+        bump_data_version({row[date_column].year for row in new_rows})
+
+    elapsed = time.perf_counter() - started
+    report.inserted_count = len(new_rows)
+    report.duplicate_count += len(existing)
+    report.rejected_count = len(rejected)
+    report.rejected = rejected[:MAX_BATCH_MESSAGES]
+    report.elapsed_ms = round(elapsed * 1000, 3)
+    report.rows_per_second = round(report.rows / elapsed if elapsed else 0, 1)
+    return report
+
+
+def summarize(
+    table_name: str, batches: List[schemas_logic.BulkIngestBatch], elapsed: float
+) -> schemas_logic.BulkIngestResponse:
+    """Підсумок масового завантаження за звітами його пачок."""
+    response = schemas_logic.BulkIngestResponse(batches=batches, message="")
+    for batch in batches:
+        response.total_rows += batch.rows
+        response.inserted_count += batch.inserted_count
+        response.duplicate_count += batch.duplicate_count
+        response.rejected_count += batch.rejected_count
+        response.failed_count += batch.failed_count
+    response.elapsed_ms = round(elapsed * 1000, 3)
+    response.rows_per_second = round(response.total_rows / elapsed if elapsed else 0, 1)
+    response.message = (
+        f"{response.inserted_count} {table_name} inserted, "
+        f"{response.duplicate_count} duplicates, {response.rejected_count} rejected "
+        f"in {len(batches)} batches"
+    )
+    if response.failed_count:
+        response.message += f", {response.failed_count} failed"
+    return response
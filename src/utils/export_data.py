@@ -0,0 +1,294 @@
+import argparse
+import io
+import json
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import Date, Float, Integer, select
+
+from src import models
+from src.database import engine
+from src.utils.load_data import CSV_DATE_FORMAT
+
+
+# Потоковий експорт Credits і Payments за проміжок дат у CSV (формат data/*.csv),
+# NDJSON або Parquet.
+#
+# Рядки читаються курсором на стороні сервера (stream_results + yield_per)
+# пачками по batch_size і одразу записуються, тож пам'ять не залежить від
+# розміру проміжку. Рядки впорядковані за id: перерваний експорт продовжується
+# з after_id - id останнього записаного рядка.
+# Запуск:
+#     python -m src.utils.export_data payments --format csv --date-from 2021-01-01 \
+#         --date-to 2021-12-31 [--after-id 0] [--output payments.csv]
+
+# Таблиця: (модель, колонка дати для проміжку, колонки як у data/*.csv)
+EXPORT_TABLES = {
+    "credits": (
+        models.Credit,
+        "issuance_date",
+        [
+            "id",
+            "user_id",
+            "issuance_date",
+            "return_date",
+            "actual_return_date",
+            "body",
+            "percent",
+        ],
+    ),
+    "payments": (
+        models.Payment,
+        "payment_date",
+        ["id", "credit_id", "payment_date", "type_id", "sum"],
+    ),
+    "plans": (models.Plan, "period", ["id", "period", "sum", "category_id"]),
+}
+
+MEDIA_TYPES = {
+    "csv": "text/tab-separated-values; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+DEFAULT_BATCH_SIZE = 5000
+CSV_LINE_END = "\r\n"
+
+
+def iter_batches(
+    connection,
+    table_name: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    after_id: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: dict | None = None,
+) -> Iterator[list]:
+    """
+    Читає рядки таблиці пачками курсором на стороні сервера.
+
+    Аргументи:
+    - connection: з'єднання з базою даних
+    - table_name: "credits", "payments" або "plans"
+    - date_from, date_to: проміжок дат видачі / платежу (включно)
+    - after_id: пропустити рядки з id <= after_id (продовження експорту)
+    - batch_size: кількість рядків у пачці
+    - progress: словник, у якому оновлюються "rows" і "last_id" записаних рядків
+
+    Повертає:
+    - Генератор списків рядків у порядку id
+    """
+    model, date_column, columns = EXPORT_TABLES[table_name]
+    query = select(*(getattr(model, name) for name in columns)).order_by(model.id)
+    if date_from is not None:
+        query = query.where(getattr(model, date_column) >= date_from)
+    if date_to is not None:
+        query = query.where(getattr(model, date_column) <= date_to)
+    if after_id is not None:
+        query = query.where(model.id > after_id)
+
+    result = connection.execution_options(
+        stream_results=True, yield_per=batch_size
+    ).execute(query)
+    try:
+        for batch in result.partitions():
+            yield batch
+            # Пачку враховано, лише коли споживач її обробив і попросив наступну
+            if progress is not None:
+                progress["rows"] = progress.get("rows", 0) + len(batch)
+                progress["last_id"] = batch[-1].id
+    finally:
+        result.close()
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.strftime(CSV_DATE_FORMAT)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def iter_csv(batches, columns: list[str], header: bool = True) -> Iterator[bytes]:
+    """CSV з табуляцією, датами dd.mm.yyyy і переносом \\r\\n, як data/*.csv."""
+    if header:
+        yield ("\t".join(columns) + CSV_LINE_END).encode()
+    for batch in batches:
+        yield "".join(
+            "\t".join(_csv_value(value) for value in row) + CSV_LINE_END
+            for row in batch
+        ).encode()
+
+
+def iter_ndjson(batches, columns: list[str]) -> Iterator[bytes]:
+    """Один JSON-об'єкт на рядок, дати у форматі ISO."""
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=date.isoformat) + "\n"
+            for row in batch
+        ).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файл лише для запису, з якого записані байти забираються частинами."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def arrow_schema(model, columns: list[str]):
+    """Схема Arrow для колонок моделі (дати - date32, цілі - int64)."""
+    import pyarrow as pa
+
+    types = []
+    for name in columns:
+        column_type = model.__table__.c[name].type
+        if isinstance(column_type, Date):
+            types.append((name, pa.date32()))
+        elif isinstance(column_type, Integer):
+            types.append((name, pa.int64()))
+        elif isinstance(column_type, Float):
+            types.append((name, pa.float64()))
+        else:
+            types.append((name, pa.string()))
+    return pa.schema(types)
+
+
+def iter_parquet(batches, table_name: str) -> Iterator[bytes]:
+    """
+    Parquet-файл, по одній групі рядків на пачку.
+
+    Кожна група записується і віддається одразу; футер з метаданими -
+    після останньої пачки.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    model, _, columns = EXPORT_TABLES[table_name]
+    schema = arrow_schema(model, columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_table(
+                pa.Table.from_pylist([dict(zip(columns, row)) for row in batch], schema)
+            )
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(
+    connection,
+    table_name: str,
+    export_format: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    after_id: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: dict | None = None,
+) -> Iterator[bytes]:
+    """
+    Експорт таблиці частинами байтів у вказаному форматі.
+
+    Аргументи - як у iter_batches; export_format: "csv", "ndjson" або "parquet".
+    При продовженні (after_id) CSV не містить заголовка, щоб частини можна
+    було дописати в той самий файл.
+    """
+    _, _, columns = EXPORT_TABLES[table_name]
+    batches = iter_batches(
+        connection,
+        table_name,
+        date_from=date_from,
+        date_to=date_to,
+        after_id=after_id,
+        batch_size=batch_size,
+        progress=progress,
+    )
+    if export_format == "csv":
+        return iter_csv(batches, columns, header=not after_id)
+    if export_format == "ndjson":
+        return iter_ndjson(batches, columns)
+    if export_format == "parquet":
+        return iter_parquet(batches, table_name)
+    raise ValueError(f"Unknown export format: {export_format}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Потоковий експорт кредитів і платежів"
+    )
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--format", choices=sorted(MEDIA_TYPES), default="csv")
+    parser.add_argument("--date-from", type=date.fromisoformat)
+    parser.add_argument("--date-to", type=date.fromisoformat)
+    parser.add_argument(
+        "--after-id",
+        type=int,
+        help="продовжити після рядка з цим id (CSV/NDJSON дописуються в --output)",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--output", help="файл результату (за замовчуванням stdout)")
+    args = parser.parse_args()
+    # Parquet не дописується: продовження - окремий файл-частина
+    resume_append = bool(args.after_id) and args.format != "parquet"
+    if args.after_id and args.format == "parquet" and args.output:
+        if Path(args.output).exists():
+            parser.error("parquet resume must be written to a new --output file")
+
+    progress = {"rows": 0, "last_id": args.after_id}
+    started = time.perf_counter()
+    output = (
+        open(args.output, "ab" if resume_append else "wb")
+        if args.output
+        else sys.stdout.buffer
+    )
+    try:
+        with engine.connect() as connection:
+            for chunk in export_chunks(
+                connection,
+                args.table,
+                args.format,
+                date_from=args.date_from,
+                date_to=args.date_to,
+                after_id=args.after_id,
+                batch_size=args.batch_size,
+                progress=progress,
+            ):
+                output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{args.table}: {progress['rows']} rows in {elapsed:.2f}s, "
+            f"last id {progress['last_id']} (resume with --after-id)",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+from src.database import Base, engine
+from src import models, rollups
+from src.utils.load_data import deferred_indexes
+
+
+# Детермінований генератор синтетичних даних у формі data/*.csv.
+#
+# Масштабує кількість кредитів (і пропорційно користувачів, платежів і планів)
+# до 10^5-10^7. Однаковий seed дає однакові дані.
+# Запуск:
+#     DB_URL=sqlite:///bench.db python -m src.utils.generate_data --credits 100000 [--reset]
+
+DEFAULT_SEED = 42
+DEFAULT_START = date(2020, 1, 1)
+DEFAULT_YEARS = 3
+DEFAULT_BATCH_SIZE = 10000
+
+# Параметри форми даних, оцінені за data/*.csv
+DICTIONARY = [(1, "тіло"), (2, "відсотки"), (3, "видача"), (4, "збір")]
+BODY_TYPE_ID, PERCENT_TYPE_ID, ISSUE_CATEGORY_ID, COLLECT_CATEGORY_ID = 1, 2, 3, 4
+BODY_AMOUNTS = range(500, 5001, 500)
+TERM_DAYS = 14
+DAILY_RATE = 0.015
+CLOSED_SHARE = 0.67
+MEAN_CLOSE_DAYS = 72
+MAX_CLOSE_DAYS = 580
+# Платежів на кредит: мінімум 2, в середньому ~11.5
+MIN_PAYMENTS = 2
+MEAN_EXTRA_PAYMENTS = 9.5
+
+
+def _split(rng: random.Random, amount: float, parts: int) -> list[float]:
+    """Ділить суму на parts платежів з копійками, сума частин дорівнює amount."""
+    if parts <= 1:
+        return [round(amount, 2)]
+    weights = [rng.random() + 0.1 for _ in range(parts)]
+    scale = amount / sum(weights)
+    values = [round(weight * scale, 2) for weight in weights[:-1]]
+    values.append(round(amount - sum(values), 2))
+    return values
+
+
+class DataGenerator:
+    """
+    Генерує користувачів, кредити, платежі та плани.
+
+    Кредити впорядковані за датою видачі (як у data/credits.csv), платежі
+    генеруються одразу за своїм кредитом, тому пам'ять не залежить від масштабу.
+    """
+
+    def __init__(
+        self,
+        credits: int,
+        seed: int = DEFAULT_SEED,
+        start: date = DEFAULT_START,
+        years: int = DEFAULT_YEARS,
+    ):
+        self.credits = credits
+        self.users = max(credits, 1)
+        self.seed = seed
+        self.start = start
+        self.end = date(start.year + years, start.month, start.day)
+        self.span_days = (self.end - start).days
+
+    def _day(self, index: int, total: int) -> date:
+        return self.start + timedelta(days=index * self.span_days // total)
+
+    def iter_users(self):
+        for index in range(self.users):
+            yield {
+                "id": index + 1,
+                "login": f"user{index + 1:08d}",
+                "registration_date": self._day(index, self.users),
+            }
+
+    def iter_credits(self):
+        """Пари (кредит, список його платежів)."""
+        rng = random.Random(self.seed)
+        payment_id = 0
+        for index in range(self.credits):
+            issuance_date = self._day(index, self.credits)
+            # Лише користувачі, зареєстровані до дати видачі
+            registered = index * self.users // self.credits + 1
+            body = float(rng.choice(BODY_AMOUNTS))
+            return_date = issuance_date + timedelta(days=TERM_DAYS)
+
+            if rng.random() < CLOSED_SHARE:
+                close_days = min(int(rng.expovariate(1 / MEAN_CLOSE_DAYS)), MAX_CLOSE_DAYS)
+                actual_return_date = issuance_date + timedelta(days=close_days)
+                if actual_return_date >= self.end:
+                    actual_return_date = None
+            else:
+                actual_return_date = None
+
+            last_day = actual_return_date or min(
+                issuance_date + timedelta(days=MAX_CLOSE_DAYS), self.end - timedelta(days=1)
+            )
+            active_days = (last_day - issuance_date).days
+            percent = round(body * DAILY_RATE * (max(active_days, TERM_DAYS) + 1), 2)
+
+            credit = {
+                "id": index + 1,
+                "user_id": rng.randint(1, registered),
+                "issuance_date": issuance_date,
+                "return_date": return_date,
+                "actual_return_date": actual_return_date,
+                "body": body,
+                "percent": percent,
+            }
+
+            # Закритий кредит сплачено повністю, відкритий - частково
+            count = MIN_PAYMENTS + int(rng.expovariate(1 / MEAN_EXTRA_PAYMENTS))
+            paid_share = 1 if actual_return_date else rng.random()
+            body_count = max(1, count // 3)
+            payments = []
+            for type_id, amount, parts in (
+                (BODY_TYPE_ID, body * paid_share, body_count),
+                (PERCENT_TYPE_ID, percent * paid_share, count - body_count),
+            ):
+                for value in _split(rng, amount, parts):
+                    payment_id += 1
+                    payments.append(
+                        {
+                            "id": payment_id,
+                            "credit_id": credit["id"],
+                            "payment_date": issuance_date
+                            + timedelta(days=rng.randint(0, active_days)),
+                            "type_id": type_id,
+                            "sum": value,
+                        }
+                    )
+            yield credit, payments
+
+    def iter_plans(self):
+        """Плани видач і збору на кожен місяць з сумою близькою до очікуваної."""
+        rng = random.Random(self.seed + 1)
+        monthly_credits = self.credits * 30 / max(self.span_days, 1)
+        mean_body = sum(BODY_AMOUNTS) / len(BODY_AMOUNTS)
+        plan_id = 0
+        month = rollups.month_start(self.start)
+        while month < self.end:
+            for category_id, expected in (
+                (ISSUE_CATEGORY_ID, monthly_credits * mean_body),
+                (COLLECT_CATEGORY_ID, monthly_credits * mean_body * 2.5),
+            ):
+                plan_id += 1
+                yield {
+                    "id": plan_id,
+                    "period": month,
+                    "sum": round(expected * rng.uniform(0.8, 1.2), -3),
+                    "category_id": category_id,
+                }
+            month = rollups.next_month_start(month)
+
+
+def _batches(rows, batch_size: int):
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def generate(
+    bind,
+    credits: int,
+    seed: int = DEFAULT_SEED,
+    years: int = DEFAULT_YEARS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict:
+    """
+    Створює схему і заповнює базу синтетичними даними.
+
+    Аргументи:
+    - bind: engine бази даних (таблиці мають бути порожні)
+    - credits: кількість кредитів
+    - seed: початкове значення генератора випадкових чисел
+    - years: кількість років історії від 2020-01-01
+    - batch_size: кількість кредитів в одній транзакції
+
+    Логіка:
+    - Вставляє довідник, користувачів і плани
+    - Кредити вставляє пачками разом з їх платежами (порядок зовнішніх ключів)
+    - Перераховує агрегати (src/rollups.py)
+
+    Повертає:
+    - Словник {назва таблиці: кількість рядків}
+    """
+    Base.metadata.create_all(bind=bind)
+    generator = DataGenerator(credits, seed=seed, years=years)
+    counts = {}
+
+    with deferred_indexes(bind):
+        with bind.begin() as connection:
+            connection.execute(
+                models.Dictionary.__table__.insert(),
+                [{"id": id_, "name": name} for id_, name in DICTIONARY],
+            )
+            counts["Dictionary"] = len(DICTIONARY)
+            for model, rows in (
+                (models.User, generator.iter_users()),
+                (models.Plan, generator.iter_plans()),
+            ):
+                counts[model.__tablename__] = 0
+                for batch in _batches(rows, batch_size):
+                    connection.execute(model.__table__.insert(), batch)
+                    counts[model.__tablename__] += len(batch)
+
+        counts["Credits"] = counts["Payments"] = 0
+        for batch in _batches(generator.iter_credits(), batch_size):
+            with bind.begin() as connection:
+                connection.execute(
+                    models.Credit.__table__.insert(), [credit for credit, _ in batch]
+                )
+                payments = [payment for _, rows in batch for payment in rows]
+                connection.execute(models.Payment.__table__.insert(), payments)
+            counts["Credits"] += len(batch)
+            counts["Payments"] += len(payments)
+
+    with bind.begin() as connection:
+        rollups.rebuild(connection)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерація синтетичних даних")
+    parser.add_argument("--credits", type=int, required=True, help="кількість кредитів")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--years", type=int, default=DEFAULT_YEARS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--reset", action="store_true", help="перестворити таблиці перед генерацією"
+    )
+    args = parser.parse_args()
+
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+
+    started = time.perf_counter()
+    counts = generate(
+        engine, args.credits, seed=args.seed, years=args.years, batch_size=args.batch_size
+    )
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
+    print(f"Total: {total} rows in {elapsed:.2f}s ({total / elapsed:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
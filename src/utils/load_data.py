@@ -0,0 +1,256 @@
+import argparse
+import csv
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+from sqlalchemy import Date, Float, Integer, create_engine, text
+
+from src.database import Base, URL_DATABASE, engine
+from src import models, rollups
+
+
+# Завантаження датасетів data/*.csv у базу даних пачками.
+#
+# Запуск:
+#     python -m src.utils.load_data [--data-dir data] [--batch-size 5000] [--reset] [--native]
+
+# Файли у порядку зовнішніх ключів: довідник і користувачі - перед кредитами,
+# кредити - перед платежами
+DATASETS = [
+    ("dictionary.csv", models.Dictionary),
+    ("users.csv", models.User),
+    ("credits.csv", models.Credit),
+    ("plans.csv", models.Plan),
+    ("payments.csv", models.Payment),
+]
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+DEFAULT_BATCH_SIZE = 5000
+CSV_DATE_FORMAT = "%d.%m.%Y"
+
+
+def _converter(column):
+    """Повертає функцію перетворення текстового значення CSV у тип колонки."""
+    if isinstance(column.type, Date):
+        return lambda value: datetime.strptime(value, CSV_DATE_FORMAT).date()
+    if isinstance(column.type, Integer):
+        return int
+    if isinstance(column.type, Float):
+        return float
+    return str
+
+
+def iter_batches(path: Path, table, batch_size: int):
+    """
+    Читає CSV файл з табуляцією і повертає пачки рядків для executemany.
+
+    Порожні значення стають NULL, дати у форматі dd.mm.yyyy - об'єктами date.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        reader = csv.reader(file, delimiter="\t")
+        header = [name.strip() for name in next(reader)]
+        converters = [_converter(table.c[name]) for name in header]
+
+        rows = (
+            {
+                name: convert(value) if value != "" else None
+                for name, convert, value in zip(header, converters, row)
+            }
+            for row in reader
+            if row
+        )
+        while batch := list(islice(rows, batch_size)):
+            yield batch
+
+
+def _read_header(path: Path):
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        first_line = file.readline()
+    line_end = "\r\n" if first_line.endswith("\r\n") else "\n"
+    return [name.strip() for name in first_line.split("\t")], line_end
+
+
+def _load_postgresql(connection, path: Path, table) -> int:
+    """Завантажує файл через COPY ... FROM STDIN (psycopg2)."""
+    header, _ = _read_header(path)
+    columns = ", ".join(f'"{name}"' for name in header)
+    cursor = connection.connection.cursor()
+    cursor.execute("SET DateStyle = 'ISO, DMY'")
+    with open(path, encoding="utf-8") as file:
+        cursor.copy_expert(
+            f'COPY "{table.name}" ({columns}) FROM STDIN '
+            "WITH (FORMAT csv, DELIMITER E'\\t', HEADER true)",
+            file,
+        )
+    return cursor.rowcount
+
+
+def _load_mysql(connection, path: Path, table) -> int:
+    """Завантажує файл через LOAD DATA LOCAL INFILE."""
+    header, line_end = _read_header(path)
+    variables, assignments = [], []
+    for index, name in enumerate(header):
+        variable = f"@c{index}"
+        variables.append(variable)
+        value = f"NULLIF({variable}, '')"
+        if isinstance(table.c[name].type, Date):
+            value = f"STR_TO_DATE({value}, '%d.%m.%Y')"
+        assignments.append(f"`{name}` = {value}")
+
+    result = connection.exec_driver_sql(
+        f"LOAD DATA LOCAL INFILE '{path.as_posix()}' INTO TABLE `{table.name}` "
+        "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' "
+        f"LINES TERMINATED BY '{line_end.encode('unicode_escape').decode()}' "
+        f"IGNORE 1 LINES ({', '.join(variables)}) SET {', '.join(assignments)}"
+    )
+    return result.rowcount
+
+
+NATIVE_LOADERS = {
+    "postgresql": _load_postgresql,
+    "mysql": _load_mysql,
+    "mariadb": _load_mysql,
+}
+
+
+def _secondary_indexes():
+    """Неунікальні індекси, які дешевше створити вже після завантаження."""
+    return [
+        index
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+        if not index.unique
+    ]
+
+
+def _reset_sequences(connection):
+    """Після вставки явних id вирівнює послідовності PostgreSQL."""
+    for _, model in DATASETS:
+        table = model.__table__.name
+        connection.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                f'COALESCE(MAX(id), 1)) FROM "{table}"'
+            )
+        )
+
+
+@contextmanager
+def deferred_indexes(bind):
+    """
+    Видаляє неунікальні індекси на час масового завантаження і створює їх
+    заново після нього (навіть якщо завантаження перервано).
+    """
+    indexes = _secondary_indexes()
+    with bind.begin() as connection:
+        for index in indexes:
+            index.drop(connection, checkfirst=True)
+    try:
+        yield
+    finally:
+        started = time.perf_counter()
+        with bind.begin() as connection:
+            for index in indexes:
+                index.create(connection, checkfirst=True)
+            if bind.dialect.name == "postgresql":
+                _reset_sequences(connection)
+        print(f"Indexes created in {time.perf_counter() - started:.2f}s")
+
+
+def load_data(
+    bind,
+    data_dir: Path = DEFAULT_DATA_DIR,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    reset: bool = False,
+    native: bool = False,
+):
+    """
+    Завантажує всі датасети з data_dir у базу.
+
+    Аргументи:
+    - bind: engine бази даних
+    - data_dir: директорія з файлами *.csv
+    - batch_size: кількість рядків в одному executemany
+    - reset: видалити і створити таблиці заново перед завантаженням
+    - native: використовувати COPY (PostgreSQL) / LOAD DATA (MySQL), якщо доступно
+
+    Логіка:
+    - Створює схему, видаляє неунікальні індекси
+    - Завантажує файли в порядку зовнішніх ключів, кожен в окремій транзакції
+    - Створює індекси заново, перераховує місячні агрегати і виводить
+      швидкість завантаження
+
+    Повертає:
+    - Словник {назва таблиці: кількість завантажених рядків}
+    """
+    if reset:
+        Base.metadata.drop_all(bind=bind)
+    Base.metadata.create_all(bind=bind)
+
+    native_loader = NATIVE_LOADERS.get(bind.dialect.name) if native else None
+    loaded = {}
+
+    with deferred_indexes(bind):
+        for filename, model in DATASETS:
+            path = Path(data_dir) / filename
+            table = model.__table__
+            started = time.perf_counter()
+
+            with bind.begin() as connection:
+                if native_loader:
+                    count = native_loader(connection, path.resolve(), table)
+                else:
+                    count = 0
+                    for batch in iter_batches(path, table, batch_size):
+                        connection.execute(table.insert(), batch)
+                        count += len(batch)
+
+            elapsed = time.perf_counter() - started
+            loaded[table.name] = count
+            print(
+                f"{table.name}: {count} rows in {elapsed:.2f}s "
+                f"({count / elapsed if elapsed else 0:,.0f} rows/sec)"
+            )
+
+    # Дані вставлено через Core, тож події ORM агрегати не оновлювали
+    with bind.begin() as connection:
+        rollups.rebuild(connection)
+
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Завантаження data/*.csv у базу даних")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--reset", action="store_true", help="перестворити таблиці перед завантаженням"
+    )
+    parser.add_argument(
+        "--native", action="store_true", help="використати COPY / LOAD DATA, якщо можливо"
+    )
+    args = parser.parse_args()
+
+    bind = engine
+    if args.native and engine.dialect.name in ("mysql", "mariadb"):
+        # LOAD DATA LOCAL вимагає явного дозволу на рівні з'єднання
+        bind = create_engine(URL_DATABASE, connect_args={"local_infile": True})
+
+    started = time.perf_counter()
+    loaded = load_data(
+        bind,
+        data_dir=args.data_dir,
+        batch_size=args.batch_size,
+        reset=args.reset,
+        native=args.native,
+    )
+    elapsed = time.perf_counter() - started
+    total = sum(loaded.values())
+    print(f"Total: {total} rows in {elapsed:.2f}s ({total / elapsed:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import codecs
+import csv
+from datetime import datetime
+from itertools import chain, islice
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from openpyxl import load_workbook
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+
+from src import crud, models
+from src.schemas import schemas_logic
+
+
+# Потокове завантаження планів з .xlsx та .csv файлів частинами (chunks)
+
+# Розмір частини за замовчуванням
+DEFAULT_CHUNK_SIZE = 5000
+# Скільки повідомлень про пропуски/помилки зберігати для однієї частини
+MAX_CHUNK_MESSAGES = 50
+# Формат дат у data/*.csv
+CSV_DATE_FORMAT = "%d.%m.%Y"
+
+_plan_items_adapter = TypeAdapter(List[schemas_logic.PlanInsertItem])
+
+# Розібрана частина файлу: (звіт частини, валідні плани частини)
+ParsedChunk = Tuple[schemas_logic.PlanImportChunk, List[schemas_logic.PlanInsertItem]]
+
+
+class PlanFileError(ValueError):
+    """Файл планів неможливо прочитати або в ньому немає потрібних колонок."""
+
+
+def iter_plan_rows(file: BinaryIO, filename: str) -> Iterator[dict]:
+    """
+    Повертає ітератор рядків файлу планів як словників {колонка: значення}.
+
+    Формат визначається за розширенням: .xlsx читається openpyxl у режимі
+    read-only, .csv - як файл з табуляцією у форматі data/plans.csv.
+    """
+    name = filename.lower()
+    if name.endswith(".xlsx"):
+        return _iter_xlsx_rows(file)
+    if name.endswith(".csv"):
+        return _iter_csv_rows(file)
+    raise PlanFileError("Only .xlsx and .csv files are supported")
+
+
+def _iter_xlsx_rows(file: BinaryIO) -> Iterator[dict]:
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise PlanFileError("Invalid Excel file")
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(column).strip() if column is not None else "" for column in header]
+        for values in rows:
+            if all(value is None for value in values):
+                continue
+            yield dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+def _iter_csv_rows(file: BinaryIO) -> Iterator[dict]:
+    lines = codecs.iterdecode(file, "utf-8-sig")
+    reader = csv.DictReader(lines, delimiter="\t")
+    try:
+        for row in reader:
+            if not any(row.values()):
+                continue
+            yield {key.strip(): value for key, value in row.items() if key}
+    except UnicodeDecodeError:
+        raise PlanFileError("CSV file must be UTF-8 encoded")
+
+
+def _parse_period(value):
+    """Приводить дату з Excel (datetime) або CSV (dd.mm.yyyy) до date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            return datetime.strptime(value, CSV_DATE_FORMAT).date()
+        except ValueError:
+            # Інші формати (наприклад ISO) перевірить pydantic
+            return value
+    return value
+
+
+def _category_key(value) -> str:
+    """Приводить category_id з Excel (3 або 3.0) чи CSV ("3") до рядка "3"."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() if value is not None else ""
+
+
+def read_header(rows: Iterator[dict]) -> Tuple[Iterator[dict], bool]:
+    """
+    Читає перший рядок файлу і перевіряє наявність потрібних колонок.
+
+    Аргументи:
+    - rows: ітератор рядків файлу (див. iter_plan_rows)
+
+    Повертає:
+    - (ітератор усіх рядків разом з першим, чи задано категорію колонкою
+      category_id замість category_name)
+
+    Помилки:
+    - PlanFileError: якщо у файлі немає рядків даних або потрібних колонок
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        raise PlanFileError("File has no data rows")
+
+    columns = set(first)
+    if not {"period", "sum"}.issubset(columns) or not columns & {
+        "category_name",
+        "category_id",
+    }:
+        raise PlanFileError(
+            "File must have columns: period, sum and category_name or category_id"
+        )
+    return chain([first], rows), "category_name" not in columns
+
+
+def load_category_names(db: Session) -> Dict[str, str]:
+    """Назви категорій за id у вигляді рядка, як у колонці category_id."""
+    return {
+        str(category_id): name
+        for category_id, name in db.query(models.Dictionary.id, models.Dictionary.name)
+    }
+
+
+def parse_chunks(
+    rows: Iterator[dict],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    category_names: Optional[Dict[str, str]] = None,
+) -> Iterator[ParsedChunk]:
+    """
+    Читає і валідує рядки файлу частинами, без звернень до бази.
+
+    Аргументи:
+    - rows: рядки файлу після read_header
+    - chunk_size: кількість рядків в одній частині
+    - category_names: {category_id: назва}, якщо категорію задає category_id
+
+    Повертає:
+    - Пари (звіт частини з некоректними рядками, валідні плани частини)
+
+    Помилки:
+    - PlanFileError: якщо файл перестає читатися посередині
+    """
+    line = 1  # рядок 1 - заголовок
+    for number, chunk in enumerate(_chunks(rows, chunk_size), start=1):
+        report = schemas_logic.PlanImportChunk(chunk=number, rows=len(chunk))
+        errors = []
+
+        raw_items = []
+        for row in chunk:
+            line += 1
+            category_name = row.get("category_name")
+            if category_names is not None:
+                category_id = _category_key(row.get("category_id"))
+                category_name = category_names.get(category_id)
+                if category_name is None:
+                    errors.append(f"row {line}: unknown category_id {category_id!r}")
+                    continue
+            raw_items.append(
+                (
+                    line,
+                    {
+                        "period": _parse_period(row.get("period")),
+                        "category_name": category_name,
+                        "sum": row.get("sum"),
+                    },
+                )
+            )
+
+        items = _validate_chunk(raw_items, errors)
+        report.errors_count = len(errors)
+        report.errors = errors[:MAX_CHUNK_MESSAGES]
+        yield report, items
+
+
+def save_chunk(
+    db: Session,
+    report: schemas_logic.PlanImportChunk,
+    items: List[schemas_logic.PlanInsertItem],
+    update_existing: bool = False,
+) -> schemas_logic.PlanImportChunk:
+    """Зберігає валідні плани частини crud.insert_plans і доповнює її звіт."""
+    if items:
+        result = crud.insert_plans(db, items, update_existing=update_existing)
+        report.inserted_count = result.inserted_count
+        report.updated_count = result.updated_count
+        report.skipped_count = len(result.skipped)
+        report.skipped = result.skipped[:MAX_CHUNK_MESSAGES]
+    return report
+
+
+def add_chunk(
+    response: schemas_logic.PlanImportResponse, report: schemas_logic.PlanImportChunk
+):
+    """Додає звіт збереженої частини до підсумків імпорту."""
+    response.total_rows += report.rows
+    response.inserted_count += report.inserted_count
+    response.updated_count += report.updated_count
+    response.skipped_count += report.skipped_count
+    response.errors_count += report.errors_count
+    response.chunks.append(report)
+
+
+def finish(
+    response: schemas_logic.PlanImportResponse,
+) -> schemas_logic.PlanImportResponse:
+    """Заповнює підсумкове повідомлення імпорту."""
+    response.message = (
+        f"{response.inserted_count} plans inserted, {response.updated_count} updated, "
+        f"{response.skipped_count} skipped, {response.errors_count} invalid rows "
+        f"in {len(response.chunks)} chunks"
+    )
+    if response.error:
+        response.message += f", stopped: {response.error}"
+    return response
+
+
+def import_plans(
+    db: Session,
+    rows: Iterator[dict],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    update_existing: bool = False,
+) -> schemas_logic.PlanImportResponse:
+    """
+    Імпортує плани потоково, частинами по chunk_size рядків.
+
+    Аргументи:
+    - db: сесія бази даних
+    - rows: ітератор рядків файлу (див. iter_plan_rows)
+    - chunk_size: кількість рядків в одній частині (одна транзакція)
+    - update_existing: оновлювати суму вже існуючих планів
+
+    Логіка:
+    - Категорію задає колонка category_name або category_id (як у data/plans.csv)
+    - Кожна частина валідується пачкою (parse_chunks) і зберігається
+      crud.insert_plans з окремим commit (save_chunk), тому в пам'яті
+      одночасно лише одна частина
+    - Некоректні рядки не зупиняють імпорт, а потрапляють у errors частини
+    - Якщо файл перестає читатися посередині (наприклад, помилка кодування
+      в пізнішій частині), імпорт зупиняється, вже збережені частини
+      залишаються в базі, а причина записується в error відповіді
+    - Асинхронна версія з розбором файлу в пулі потоків -
+      crud_async.import_plans
+
+    Повертає:
+    - PlanImportResponse з підсумками та звітом по кожній частині
+
+    Помилки:
+    - PlanFileError: якщо у файлі немає рядків даних або потрібних колонок
+    """
+    rows, by_category_id = read_header(rows)
+    category_names = load_category_names(db) if by_category_id else None
+
+    response = schemas_logic.PlanImportResponse(message="")
+    try:
+        for report, items in parse_chunks(rows, chunk_size, category_names):
+            add_chunk(response, save_chunk(db, report, items, update_existing))
+    except PlanFileError as exc:
+        # Попередні частини вже збережені - повертаємо їх звіт разом з помилкою
+        response.error = str(exc)
+    return finish(response)
+
+
+def _validate_chunk(raw_items, errors) -> List[schemas_logic.PlanInsertItem]:
+    """
+    Валідує частину рядків однією пачкою.
+
+    Якщо є помилки, некоректні рядки записуються в errors, а решта
+    валідується повторно.
+    """
+    values = [item for _, item in raw_items]
+    try:
+        return _plan_items_adapter.validate_python(values)
+    except ValidationError as exc:
+        bad = {}
+        for error in exc.errors():
+            index, field = error["loc"][0], error["loc"][-1]
+            bad.setdefault(index, f"row {raw_items[index][0]}: {field} - {error['msg']}")
+        errors.extend(bad.values())
+        values = [item for index, item in enumerate(values) if index not in bad]
+        return _plan_items_adapter.validate_python(values)
+
+
+def _chunks(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    while chunk := list(islice(rows, size)):
+        yield chunk
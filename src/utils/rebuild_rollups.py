@@ -0,0 +1,25 @@
+import time
+
+from src.database import Base, engine
+from src import rollups
+from src.cache import bump_data_version
+
+
+# Перерахунок місячних агрегатів (таблиця MonthlyAggregates) з історії.
+#
+# Потрібен після завантаження даних в обхід ORM або для виправлення агрегатів.
+# Запуск:
+#     python -m src.utils.rebuild_rollups
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        count = rollups.rebuild(connection)
+    bump_data_version()
+    print(f"MonthlyAggregates: {count} rows in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
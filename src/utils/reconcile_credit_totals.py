@@ -0,0 +1,50 @@
+import argparse
+
+from src.database import engine
+from src import rollups
+from src.cache import bump_data_version
+
+
+# Звірка сум платежів, збережених у кредитах (paid_*, last_payment_date),
+# з таблицею Payments.
+#
+# Запуск:
+#     python -m src.utils.reconcile_credit_totals [--repair] [--tolerance 0.005]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Звірка сум платежів кредитів з таблицею Payments"
+    )
+    parser.add_argument(
+        "--repair", action="store_true", help="виправити кредити з розбіжностями"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.005)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        mismatches = rollups.find_credit_totals_mismatches(
+            connection, tolerance=args.tolerance
+        )
+        for mismatch in mismatches:
+            print(
+                f"credit {mismatch['id']}: "
+                f"paid_total {mismatch['paid_total']} != {mismatch['actual_paid_total']}, "
+                f"paid_body {mismatch['paid_body']} != {mismatch['actual_paid_body']}, "
+                f"paid_percent {mismatch['paid_percent']} != {mismatch['actual_paid_percent']}, "
+                f"last_payment_date {mismatch['last_payment_date']} != "
+                f"{mismatch['actual_last_payment_date']}"
+            )
+        print(f"Mismatched credits: {len(mismatches)}")
+
+        if args.repair and mismatches:
+            repaired = rollups.repair_credit_totals(
+                connection, [mismatch["id"] for mismatch in mismatches]
+            )
+            print(f"Repaired credits: {repaired}")
+    if args.repair and mismatches:
+        bump_data_version()
+
+
+if __name__ == "__main__":
+    main()
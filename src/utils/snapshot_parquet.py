@@ -0,0 +1,37 @@
+import argparse
+import time
+
+from src import config, snapshots
+from src.database import engine
+from src.utils.export_data import DEFAULT_BATCH_SIZE
+
+
+# Знімок Credits, Payments і Plans у Parquet-файли за місяцями (src/snapshots.py).
+#
+# Після знімка REPORT_BACKEND=parquet відповідає на звіти закритих років з файлів.
+# Запуск:
+#     python -m src.utils.snapshot_parquet [--dir snapshots] [--batch-size 5000]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parquet-знімок даних для звітів")
+    parser.add_argument("--dir", default=config.SNAPSHOT_DIR, help="каталог знімків")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        manifest = snapshots.write_snapshot(
+            connection, args.dir, batch_size=args.batch_size
+        )
+    elapsed = time.perf_counter() - started
+    for table_name, table in manifest["tables"].items():
+        print(f"{table_name}: {table['rows']} rows in {len(table['months'])} months")
+    print(
+        f"Snapshot {manifest['snapshot_id']} (data through {manifest['data_through']}) "
+        f"in {elapsed:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,3 +4,83 @@ import os
 
 # Додаємо кореневу директорію проєкту в шлях імпорту
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Для тестів достатньо SQLite у пам'яті, якщо DB_URL не задано
+os.environ.setdefault("DB_URL", "sqlite://")
+
+import pytest
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src import models
+from src.cache import report_cache
+
+
+@pytest.fixture
+def db():
+    """Сесія до чистої SQLite бази в пам'яті зі створеними таблицями."""
+    report_cache.clear()
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def seeded_db(db):
+    """База з довідником, двома користувачами, кредитами, платежами та планами."""
+    db.add_all(
+        [
+            models.Dictionary(id=1, name="тіло"),
+            models.Dictionary(id=2, name="відсотки"),
+            models.Dictionary(id=3, name="видача"),
+            models.Dictionary(id=4, name="збір"),
+            models.User(id=1, login="first", registration_date=date(2021, 1, 5)),
+            models.User(id=2, login="second", registration_date=date(2021, 2, 10)),
+            models.Credit(
+                id=1,
+                user_id=1,
+                issuance_date=date(2021, 1, 10),
+                return_date=date(2021, 2, 10),
+                actual_return_date=date(2021, 2, 5),
+                body=1000,
+                percent=200,
+            ),
+            models.Credit(
+                id=2,
+                user_id=1,
+                issuance_date=date(2021, 2, 15),
+                return_date=date(2021, 3, 15),
+                body=2000,
+                percent=400,
+            ),
+            models.Credit(
+                id=3,
+                user_id=2,
+                issuance_date=date(2021, 2, 20),
+                return_date=date(2021, 4, 20),
+                body=500,
+                percent=50,
+            ),
+            models.Payment(id=1, credit_id=1, type_id=1, sum=1000, payment_date=date(2021, 1, 31)),
+            models.Payment(id=2, credit_id=1, type_id=2, sum=200, payment_date=date(2021, 2, 5)),
+            models.Payment(id=3, credit_id=2, type_id=1, sum=300, payment_date=date(2021, 2, 28)),
+            models.Payment(id=4, credit_id=2, type_id=2, sum=100, payment_date=date(2021, 3, 1)),
+            models.Plan(id=1, period=date(2021, 1, 1), sum=2000, category_id=3),
+            models.Plan(id=2, period=date(2021, 1, 1), sum=1000, category_id=4),
+            models.Plan(id=3, period=date(2021, 2, 1), sum=5000, category_id=3),
+            models.Plan(id=4, period=date(2021, 2, 1), sum=800, category_id=4),
+        ]
+    )
+    db.commit()
+    return db
@@ -1,4 +1,5 @@
 import io
+import json
 from datetime import date, datetime
 import pandas as pd
 import pytest
@@ -58,7 +59,10 @@ def test_upload_plans_excel(monkeypatch):
     # Мок insert_plans, повертаємо поля відповідно до response_model
     monkeypatch.setattr(
         "src.crud.insert_plans",
-        lambda db, plan_items: {"inserted_count": len(plan_items), "message": "success"}
+        lambda db, plan_items, update_existing=False: {
+            "inserted_count": len(plan_items),
+            "message": "success",
+        },
     )
 
     response = client.post(
@@ -116,3 +120,55 @@ def test_year_performance(monkeypatch):
     data = response.json()
     assert data["total_credits"] == 10
     assert data["total_payments"] == 8000
+
+
+def test_user_credits_page_stream_and_batch(seeded_db):
+    from src.database import get_db_session
+
+    app.dependency_overrides[get_db_session] = lambda: seeded_db
+    try:
+        page = client.get("/user_credits/1/page", params={"limit": 1})
+        next_page = client.get(
+            "/user_credits/1/page",
+            params={"limit": 1, "cursor": page.json()["next_cursor"]},
+        )
+        bad_cursor = client.get("/user_credits/1/page", params={"cursor": "x"})
+        stream = client.get("/user_credits/1/stream", params={"status": "open"})
+        batch = client.post("/user_credits/batch", json={"user_ids": [2, 1]})
+        empty_batch = client.post("/user_credits/batch", json={"user_ids": []})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert page.status_code == 200
+    assert page.json()["items"][0]["issuance_date"] == "2021-01-10"
+    assert next_page.json()["items"][0]["issuance_date"] == "2021-02-15"
+    assert next_page.json()["next_cursor"] is None
+    assert bad_cursor.status_code == 400
+
+    assert stream.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in stream.text.splitlines()]
+    assert [line["issuance_date"] for line in lines] == ["2021-02-15"]
+    assert lines[0]["body_payments_sum"] == 300
+
+    assert [item["user_id"] for item in batch.json()] == [2, 1]
+    assert len(batch.json()[1]["credits"]) == 2
+    assert empty_batch.status_code == 422
+
+
+def test_overdue_portfolio(seeded_db):
+    from src.database import get_db_session
+
+    app.dependency_overrides[get_db_session] = lambda: seeded_db
+    try:
+        response = client.get(
+            "/overdue_portfolio", params={"as_of": "2021-05-01", "top_n": 5}
+        )
+        too_many = client.get("/overdue_portfolio", params={"top_n": 100_000})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["credits_count"] == 2
+    assert [user["user_id"] for user in report["top_users"]] == [1, 2]
+    assert too_many.status_code == 422
@@ -0,0 +1,151 @@
+import asyncio
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+
+from src import models
+from src.database import get_db_session
+from src.main import app
+from src.utils import bulk_ingest
+
+
+def post_ndjson(db, path, rows, **params):
+    body = "".join(
+        (row if isinstance(row, str) else json.dumps(row)) + "\n" for row in rows
+    )
+    app.dependency_overrides[get_db_session] = lambda: db
+    try:
+        return TestClient(app).post(
+            path,
+            content=body.encode(),
+            params=params,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+
+def payment(external_id, **values):
+    row = {"sum": 50, "payment_date": "2021-02-25", "credit_id": 3, "type_id": 1}
+    return {"external_id": external_id, **row, **values}
+
+
+def test_payments_bulk_is_idempotent(seeded_db):
+    rows = [
+        payment("p-1"),
+        payment("p-2", sum=25, type_id=2),
+        "{not json",
+        payment("p-3", credit_id=99),
+        payment("p-1"),
+        payment("p-4", type_id=99),
+    ]
+    response = post_ndjson(seeded_db, "/payments/bulk", rows, batch_size=4)
+
+    assert response.status_code == 201
+    result = response.json()
+    assert [batch["rows"] for batch in result["batches"]] == [4, 2]
+    assert (result["inserted_count"], result["duplicate_count"]) == (2, 1)
+    assert result["rejected_count"] == 3
+    assert [error.split(":")[0] for error in result["batches"][0]["rejected"]] == [
+        "line 3",
+        "line 4",
+    ]
+    assert result["batches"][0]["rows_per_second"] > 0
+
+    # Агрегати і суми платежів кредиту оновлені в тій самій транзакції
+    seeded_db.expire_all()
+    credit = seeded_db.get(models.Credit, 3)
+    assert (credit.paid_body, credit.paid_percent, credit.paid_total) == (50, 25, 75)
+    assert credit.last_payment_date == date(2021, 2, 25)
+
+    repeated = post_ndjson(seeded_db, "/payments/bulk", rows[:2]).json()
+    assert (repeated["inserted_count"], repeated["duplicate_count"]) == (0, 2)
+    assert seeded_db.query(models.Payment).count() == 6
+
+
+def test_credits_bulk_rejects_unknown_users(seeded_db):
+    credit = {
+        "issuance_date": "2021-03-01",
+        "return_date": "2021-04-01",
+        "body": 700,
+        "percent": 70,
+    }
+    rows = [
+        {"external_id": "c-1", "user_id": 2, **credit},
+        {"external_id": "c-2", "user_id": 42, **credit},
+        {"user_id": 2, **credit},
+    ]
+    result = post_ndjson(seeded_db, "/credits/bulk", rows).json()
+
+    assert (result["inserted_count"], result["rejected_count"]) == (1, 2)
+    assert sorted(result["batches"][0]["rejected"]) == [
+        "line 2: user_id - unknown user 42",
+        "line 3: external_id - Field required",
+    ]
+    assert seeded_db.query(models.Credit).filter_by(external_id="c-1").one().body == 700
+    assert post_ndjson(seeded_db, "/credits/bulk", []).status_code == 400
+
+
+@pytest.mark.parametrize(
+    "error, concurrent, failed",
+    [
+        # Паралельний запит вставив той самий external_id; PostgreSQL називає
+        # лише обмеження, MySQL - індекс, тож текст помилки не містить колонки
+        ('duplicate key value violates unique constraint "uq_payments_key"', True, 0),
+        # Інша помилка цілісності не повторюється і не видається за відхилення
+        ("FOREIGN KEY constraint failed", False, 1),
+    ],
+)
+def test_ingest_batch_retries_only_external_id_conflicts(
+    seeded_db, monkeypatch, error, concurrent, failed
+):
+    model, schema, date_column, record = bulk_ingest.INGEST_TABLES["payments"]
+    calls = []
+
+    def failing_record(connection, rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise IntegrityError("INSERT", {}, Exception(error))
+        record(connection, rows)
+
+    rollback = seeded_db.rollback
+
+    def rollback_after_concurrent_insert():
+        rollback()
+        if concurrent:
+            row = {**payment("p-1"), "payment_date": date(2021, 2, 25)}
+            seeded_db.add(models.Payment(**row))
+            seeded_db.commit()
+
+    monkeypatch.setitem(
+        bulk_ingest.INGEST_TABLES,
+        "payments",
+        (model, schema, date_column, failing_record),
+    )
+    monkeypatch.setattr(seeded_db, "rollback", rollback_after_concurrent_insert)
+    lines = [(1, json.dumps(payment("p-1")).encode())]
+    report = bulk_ingest.ingest_batch(seeded_db, "payments", 1, lines)
+
+    assert (report.inserted_count, report.failed_count) == (0, failed)
+    assert report.duplicate_count == int(concurrent)
+    assert report.rejected_count == 0
+    assert (report.error is None) == (failed == 0)
+    stored = seeded_db.query(models.Payment).filter_by(external_id="p-1").count()
+    assert stored == int(concurrent)
+
+
+def test_ndjson_batches_across_chunks():
+    async def chunks():
+        for chunk in (b'{"a": 1}\n{"b"', b': 2}\n\n{"c": 3}\n', b'{"d": 4}'):
+            yield chunk
+
+    async def collect():
+        return [batch async for batch in bulk_ingest.iter_ndjson_batches(chunks(), 2)]
+
+    assert asyncio.run(collect()) == [
+        [(1, b'{"a": 1}'), (2, b'{"b": 2}')],
+        [(4, b'{"c": 3}'), (5, b'{"d": 4}')],
+    ]
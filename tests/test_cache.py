@@ -0,0 +1,102 @@
+from datetime import date
+
+from src import crud, models
+from src.cache import ReportCache, report_cache
+from src.schemas import schemas_logic
+from tests.test_crud import count_queries
+
+
+def test_year_performance_is_cached_until_year_changes(seeded_db):
+    first = crud.get_year_performance(seeded_db, 2021)
+    crud.get_year_performance(seeded_db, 2020)
+    counter = count_queries(seeded_db)
+
+    assert crud.get_year_performance(seeded_db, 2021) == first
+    assert counter["count"] == 0
+
+    seeded_db.add(
+        models.Credit(
+            user_id=2,
+            issuance_date=date(2021, 3, 1),
+            return_date=date(2021, 4, 1),
+            body=100,
+            percent=10,
+        )
+    )
+    seeded_db.commit()
+    counter["count"] = 0
+    crud.get_year_performance(seeded_db, 2020)
+    assert counter["count"] == 0
+
+    refreshed = crud.get_year_performance(seeded_db, 2021)
+    assert refreshed[2].credits_count == 1
+    assert counter["count"] > 0
+
+
+def test_insert_plans_invalidates_plans_performance(seeded_db):
+    hits = report_cache.stats()["hits"]
+    before = crud.get_plans_performance(seeded_db, date(2021, 3, 10))
+    assert before == []
+
+    crud.insert_plans(
+        seeded_db,
+        [
+            schemas_logic.PlanInsertItem(
+                period=date(2021, 3, 1), category_name="видача", sum=100
+            )
+        ],
+    )
+
+    after = crud.get_plans_performance(seeded_db, date(2021, 3, 10))
+    assert [item.planned_sum for item in after] == [100]
+    assert report_cache.stats()["hits"] == hits
+
+
+def test_cohorts_are_cached_until_any_write(seeded_db):
+    first = crud.get_cohorts(seeded_db)
+    counter = count_queries(seeded_db)
+    assert crud.get_cohorts(seeded_db) == first
+    assert counter["count"] == 0
+
+    # Платіж 2020 року інвалідує когорти, хоча звіти 2021 року лишаються в кеші
+    year = crud.get_year_performance(seeded_db, 2021)
+    seeded_db.add(
+        models.Payment(credit_id=3, type_id=1, sum=10, payment_date=date(2020, 12, 1))
+    )
+    seeded_db.commit()
+
+    counter["count"] = 0
+    assert crud.get_year_performance(seeded_db, 2021) == year
+    assert counter["count"] == 0
+    assert crud.get_cohorts(seeded_db)[1].collected_sum == 10
+
+
+def test_cached_report_returns_copies(seeded_db):
+    size = report_cache.stats()["size"]
+    first = crud.get_plans_performance(seeded_db, date(2021, 2, 20))
+    # Звіт кешується одним записом, без окремого запису для ряду
+    assert report_cache.stats()["size"] == size + 1
+
+    first[0].actual_sum = -1
+    first.append(first[0])
+    second = crud.get_plans_performance(seeded_db, date(2021, 2, 20))
+    assert len(second) == 2 and second[0].actual_sum != -1
+
+    second[1].planned_sum = -1
+    assert crud.get_plans_performance(seeded_db, date(2021, 2, 20))[1].planned_sum > 0
+
+
+def test_report_cache_lru_and_ttl():
+    cache = ReportCache(max_size=2, ttl=60)
+    cache.set("a", 1, "A")
+    cache.set("b", 1, "B")
+    assert cache.get("a", 1) == (True, "A")
+
+    cache.set("c", 1, "C")
+    assert cache.get("b", 1) == (False, None)
+    assert cache.get("a", 2) == (False, None)
+    assert cache.stats()["evictions"] == 1
+
+    expired = ReportCache(max_size=2, ttl=0)
+    expired.set("a", 1, "A")
+    assert expired.get("a", 1) == (False, None)
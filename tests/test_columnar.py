@@ -0,0 +1,227 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session
+
+from src import columnar, config, crud, database, models, registry
+from src.utils import generate_data
+
+
+# Паритет колонкового рушія (REPORT_BACKEND=columnar) з SQL-реалізацією звітів.
+
+
+@pytest.fixture
+def report_backend(monkeypatch):
+    monkeypatch.setattr(config, "REPORT_CACHE_ENABLED", False)
+
+    def run(backend, call):
+        monkeypatch.setattr(config, "REPORT_BACKEND", backend)
+        return call()
+
+    return run
+
+
+@pytest.fixture
+def generated_db(db):
+    generate_data.generate(db.get_bind(), 2000, seed=7, years=2, batch_size=500)
+    return db
+
+
+def assert_same(sql_report, columnar_report):
+    assert len(sql_report) == len(columnar_report)
+    for expected, actual in zip(sql_report, columnar_report):
+        assert actual.model_dump() == pytest.approx(expected.model_dump())
+
+
+def test_year_performance_parity(generated_db, report_backend):
+    for year in (2019, 2020, 2021):
+        call = lambda: crud.get_year_performance(generated_db, year)
+        assert_same(report_backend("sql", call), report_backend("columnar", call))
+
+
+def test_plans_performance_series_parity(generated_db, report_backend):
+    start = date(2020, 11, 20)
+    target_dates = [start + timedelta(days=day * 3) for day in range(30)]
+    call = lambda: crud.get_plans_performance_series(generated_db, target_dates)
+
+    sql_series = report_backend("sql", call)
+    columnar_series = report_backend("columnar", call)
+    for expected, actual in zip(sql_series, columnar_series):
+        assert actual.target_date == expected.target_date
+        assert_same(expected.plans, actual.plans)
+
+
+def assert_same_cohorts(sql_cohorts, columnar_cohorts):
+    assert len(sql_cohorts) == len(columnar_cohorts)
+    for expected, actual in zip(sql_cohorts, columnar_cohorts):
+        assert actual.model_dump(exclude={"periods"}) == pytest.approx(
+            expected.model_dump(exclude={"periods"})
+        )
+        assert_same(expected.periods, actual.periods)
+
+
+def test_cohorts_parity(generated_db, report_backend):
+    call = lambda: crud.get_cohorts(generated_db)
+    sql_cohorts = report_backend("sql", call)
+
+    assert len(sql_cohorts) > 1
+    assert_same_cohorts(sql_cohorts, report_backend("columnar", call))
+
+    # Закриття кредиту оновлює лише ознаку закриття в масивах
+    credit = generated_db.query(models.Credit).filter(
+        models.Credit.actual_return_date.is_(None), models.Credit.user_id.is_not(None)
+    ).first()
+    credit.actual_return_date = date(2021, 12, 31)
+    generated_db.commit()
+    assert_same_cohorts(report_backend("sql", call), report_backend("columnar", call))
+
+
+def test_columnar_rereads_closures_written_elsewhere(
+    generated_db, report_backend, monkeypatch
+):
+    call = lambda: crud.get_cohorts(generated_db)
+    assert_same_cohorts(report_backend("sql", call), report_backend("columnar", call))
+
+    # Зовнішня система закриває кредити прямо в базі, без ORM цього процесу
+    generated_db.execute(
+        update(models.Credit)
+        .where(models.Credit.actual_return_date.is_(None))
+        .values(actual_return_date=date(2021, 12, 31))
+    )
+    generated_db.commit()
+    monkeypatch.setattr(config, "COLUMNAR_REFRESH_SECONDS", 0)
+    assert_same_cohorts(report_backend("sql", call), report_backend("columnar", call))
+
+
+def test_columnar_reports_without_sql(seeded_db, report_backend):
+    registry.get_registry(seeded_db)
+    columnar.get_snapshot(seeded_db)
+    statements = []
+    event.listen(
+        seeded_db.get_bind(),
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+
+    report_backend("columnar", lambda: crud.get_year_performance(seeded_db, 2021))
+    report_backend(
+        "columnar", lambda: crud.get_plans_performance(seeded_db, date(2021, 2, 20))
+    )
+
+    assert statements == []
+
+
+def test_columnar_refreshes_new_and_changed_rows(seeded_db, report_backend):
+    february = lambda: report_backend(
+        "columnar", lambda: crud.get_year_performance(seeded_db, 2021)
+    )[1]
+    assert february().actual_collect_sum == 500
+
+    seeded_db.add(
+        models.Payment(
+            id=5, credit_id=3, type_id=1, sum=50, payment_date=date(2021, 2, 25)
+        )
+    )
+    seeded_db.commit()
+    assert february().actual_collect_sum == 550
+
+    # Зміна вже завантаженого рядка - повне перезавантаження
+    seeded_db.get(models.Payment, 2).sum = 100
+    seeded_db.commit()
+    assert february().actual_collect_sum == 450
+
+    seeded_db.delete(seeded_db.get(models.Payment, 5))
+    seeded_db.commit()
+    assert february().actual_collect_sum == 400
+
+
+def test_series_merge_matches_full_build():
+    generator = np.random.default_rng(7)
+    days = np.datetime64("2020-06-01") + generator.integers(0, 600, 500)
+    values = generator.random(500) * 100
+    # Друга частина має і старіші, і новіші дати за першу
+    days[400:420] = np.datetime64("2019-12-15")
+
+    expected = columnar.Series(days, values)
+    merged = columnar.Series(days[:400], values[:400]).merged(days[400:], values[400:])
+
+    assert np.array_equal(merged.days, expected.days)
+    assert merged.cumulative == pytest.approx(expected.cumulative)
+    assert merged.first_month == expected.first_month
+    assert np.array_equal(merged.month_counts, expected.month_counts)
+    assert merged.month_sums == pytest.approx(expected.month_sums)
+
+
+def test_columnar_loads_rows_committed_below_max_id(
+    seeded_db, report_backend, monkeypatch
+):
+    february = lambda: report_backend(
+        "columnar", lambda: crud.get_year_performance(seeded_db, 2021)
+    )[1]
+    seeded_db.add(
+        models.Payment(
+            id=10, credit_id=3, type_id=1, sum=50, payment_date=date(2021, 2, 25)
+        )
+    )
+    seeded_db.commit()
+    assert february().actual_collect_sum == 550
+
+    # Рядок паралельної транзакції з меншим id, закомічений пізніше
+    # (Core, тож версія даних цього процесу не змінюється)
+    seeded_db.execute(
+        insert(models.Payment).values(
+            id=7, credit_id=3, type_id=1, sum=25, payment_date=date(2021, 2, 26)
+        )
+    )
+    seeded_db.commit()
+    monkeypatch.setattr(config, "COLUMNAR_REFRESH_SECONDS", 0)
+    assert february().actual_collect_sum == 575
+
+
+def test_background_refresher_swaps_in_snapshot(tmp_path, report_backend):
+    db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'columnar.db'}")
+    models.Base.metadata.create_all(bind=db_engine)
+    with Session(db_engine) as db:
+        db.add(models.User(id=1, login="first", registration_date=date(2021, 1, 5)))
+        db.add(
+            models.Credit(
+                id=1,
+                user_id=1,
+                issuance_date=date(2021, 1, 10),
+                return_date=date(2021, 2, 10),
+                body=1000,
+                percent=200,
+            )
+        )
+        db.commit()
+
+    store = columnar.start_refresher(db_engine)
+    try:
+        deadline = time.monotonic() + 10
+        while store.snapshot is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        with Session(db_engine) as db:
+            db.add(
+                models.Credit(
+                    id=2,
+                    user_id=1,
+                    issuance_date=date(2021, 1, 20),
+                    return_date=date(2021, 2, 20),
+                    body=500,
+                    percent=50,
+                )
+            )
+            db.commit()
+            # Запис цього процесу дозавантажується в запиті, без фонового потоку
+            january = report_backend(
+                "columnar", lambda: crud.get_year_performance(db, 2021)
+            )[0]
+            assert january.actual_issue_sum == 1500
+            assert columnar.get_snapshot(db) is store.snapshot
+    finally:
+        store.stop_refresher()
+        db_engine.dispose()
@@ -0,0 +1,255 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from src import crud, models, registry
+from src.schemas import schemas_logic
+
+
+def count_queries(db):
+    """
+    Підключає лічильник SQL-запитів до engine сесії.
+
+    Реєстр довідника завантажується заздалегідь: у роботі він читається
+    один раз на процес, а не на кожен запит.
+    """
+    registry.get_registry(db)
+    counter = {"count": 0}
+
+    def before_cursor_execute(*args):
+        counter["count"] += 1
+
+    event.listen(db.get_bind(), "before_cursor_execute", before_cursor_execute)
+    return counter
+
+
+def test_year_performance_groups_by_month(seeded_db):
+    counter = count_queries(seeded_db)
+    report = crud.get_year_performance(seeded_db, 2021)
+
+    assert counter["count"] <= 3
+    assert [item.period for item in report] == [f"{m:02d}.2021" for m in range(1, 13)]
+
+    january, february, march = report[0], report[1], report[2]
+    assert january.credits_count == 1
+    assert january.actual_issue_sum == 1000
+    assert january.plan_issue_sum == 2000
+    assert january.issue_performance_percent == 50
+    assert january.payments_count == 1
+    assert january.plan_collect_sum == 1000
+    assert february.credits_count == 2
+    assert february.actual_issue_sum == 2500
+    assert february.actual_collect_sum == 500
+    assert march.actual_collect_sum == 100
+    assert march.plan_issue_sum == 0
+    assert sum(item.issue_share_percent for item in report) == 100
+
+
+def test_year_performance_empty_year(seeded_db):
+    report = crud.get_year_performance(seeded_db, 2019)
+
+    assert len(report) == 12
+    assert all(item.credits_count == 0 for item in report)
+    assert all(item.collect_share_percent == 0 for item in report)
+
+
+def test_plans_performance_for_target_date(seeded_db):
+    counter = count_queries(seeded_db)
+    report = crud.get_plans_performance(seeded_db, date(2021, 2, 20))
+
+    assert counter["count"] <= 3
+    by_category = {item.category_name: item for item in report}
+    assert set(by_category) == {"видача", "збір"}
+    assert by_category["видача"].actual_sum == 2500
+    assert by_category["видача"].performance_percent == 50
+
+
+def test_plans_performance_series_matches_single_dates(seeded_db):
+    target_dates = [date(2021, 1, 15), date(2021, 2, 15), date(2021, 2, 28)]
+    counter = count_queries(seeded_db)
+    series = crud.get_plans_performance_series(seeded_db, target_dates)
+
+    assert counter["count"] <= 3
+    assert [item.target_date for item in series] == target_dates
+    for item in series:
+        assert item.plans == crud.get_plans_performance(seeded_db, item.target_date)
+
+
+def test_user_credits_aggregates_payments_in_one_query(seeded_db):
+    counter = count_queries(seeded_db)
+    credits = crud.get_user_credits(seeded_db, 1)
+
+    assert counter["count"] == 1
+    closed, opened = credits
+    assert closed.is_closed and closed.total_payments_sum == 1200
+    assert not opened.is_closed
+    assert opened.body_payments_sum == 300
+    assert opened.percent_payments_sum == 100
+
+
+def test_user_credits_without_payments(seeded_db):
+    (credit,) = crud.get_user_credits(seeded_db, 2)
+
+    assert credit.body_payments_sum == 0
+    assert credit.percent_payments_sum == 0
+    assert crud.get_user_credits(seeded_db, 404) == []
+
+
+def test_overdue_portfolio_buckets_and_top_users(seeded_db):
+    report = crud.get_overdue_portfolio(seeded_db, date(2021, 5, 1), top_n=1)
+
+    # Кредит 2: 47 днів, несплачено 1700 + 300; кредит 3: 11 днів, 500 + 50
+    assert [bucket.bucket for bucket in report.buckets] == [
+        "1-30",
+        "31-60",
+        "61-90",
+        "90+",
+    ]
+    assert [bucket.credits_count for bucket in report.buckets] == [1, 1, 0, 0]
+    assert report.buckets[1].outstanding_body == 1700
+    assert report.buckets[1].outstanding_percent == 300
+    assert (report.credits_count, report.outstanding_total) == (2, 2550)
+
+    (user,) = report.top_users
+    assert (user.user_id, user.login, user.max_overdue_days) == (1, "first", 47)
+    assert user.outstanding_total == 2000
+
+    later = crud.get_overdue_portfolio(seeded_db, date(2021, 6, 14))
+    assert [bucket.credits_count for bucket in later.buckets] == [0, 1, 0, 1]
+    assert crud.get_overdue_portfolio(seeded_db, date(2021, 3, 15)).credits_count == 0
+
+
+def test_overdue_portfolio_ignores_overpayments(seeded_db):
+    # Тіло кредиту 2 переплачене на 800: борг користувача 1 - лише відсотки 300
+    seeded_db.add(
+        models.Payment(credit_id=2, type_id=1, sum=2500, payment_date=date(2021, 4, 1))
+    )
+    seeded_db.commit()
+    report = crud.get_overdue_portfolio(seeded_db, date(2021, 5, 1), top_n=2)
+
+    assert report.buckets[1].outstanding_body == 0
+    assert (report.outstanding_body, report.outstanding_total) == (500, 850)
+    assert [(user.user_id, user.outstanding_total) for user in report.top_users] == [
+        (2, 550),
+        (1, 300),
+    ]
+
+
+def test_cohorts_group_by_months_since_registration(seeded_db):
+    january, february = crud.get_cohorts(seeded_db)
+
+    assert (january.cohort, january.users_count, january.credits_count) == (
+        "01.2021",
+        1,
+        2,
+    )
+    assert (january.issued_body, january.collected_sum) == (3000, 1600)
+    assert january.closure_rate_percent == 50
+    assert [
+        (
+            period.months_since_registration,
+            period.credits_count,
+            period.payments_count,
+            period.collected_sum,
+            period.closure_rate_percent,
+        )
+        for period in january.periods
+    ] == [(0, 1, 1, 1000, 100), (1, 1, 2, 500, 0), (2, 0, 1, 100, 0)]
+
+    assert (february.cohort, february.issued_body, february.collected_sum) == (
+        "02.2021",
+        500,
+        0,
+    )
+
+
+def test_users_credits_batch_groups_by_user(seeded_db, monkeypatch):
+    monkeypatch.setattr(crud, "USER_CREDITS_BATCH_CHUNK_SIZE", 2)
+    counter = count_queries(seeded_db)
+    batch = crud.get_users_credits(seeded_db, [2, 404, 1, 2])
+
+    assert counter["count"] == 2
+    assert [item.user_id for item in batch] == [2, 404, 1]
+    assert batch[0].credits == crud.get_user_credits(seeded_db, 2)
+    assert batch[1].credits == []
+    assert batch[2].credits == crud.get_user_credits(seeded_db, 1)
+
+
+def test_user_credits_pages_follow_cursor(seeded_db):
+    first = crud.get_user_credits_page(seeded_db, 1, limit=1)
+    assert [item.issuance_date for item in first.items] == [date(2021, 1, 10)]
+    assert first.next_cursor is not None
+
+    counter = count_queries(seeded_db)
+    second = crud.get_user_credits_page(seeded_db, 1, limit=1, cursor=first.next_cursor)
+    assert counter["count"] == 1
+    assert [item.issuance_date for item in second.items] == [date(2021, 2, 15)]
+    assert second.items[0].body_payments_sum == 300
+    assert second.next_cursor is None
+
+    full = crud.get_user_credits_page(seeded_db, 1, limit=2)
+    assert len(full.items) == 2 and full.next_cursor is None
+
+
+def test_user_credits_page_status_filter_and_bad_cursor(seeded_db):
+    opened = crud.get_user_credits_page(
+        seeded_db, 1, status=schemas_logic.CreditStatus.open
+    )
+    closed = crud.get_user_credits_page(
+        seeded_db, 1, status=schemas_logic.CreditStatus.closed
+    )
+    assert [item.is_closed for item in opened.items] == [False]
+    assert [item.is_closed for item in closed.items] == [True]
+
+    with pytest.raises(ValueError):
+        crud.get_user_credits_page(seeded_db, 1, cursor="not-a-cursor")
+
+
+def test_iter_user_credits_reads_in_batches(seeded_db):
+    counter = count_queries(seeded_db)
+    credits = list(crud.iter_user_credits(seeded_db, 1, batch_size=1))
+
+    assert counter["count"] == 2
+    assert credits == crud.get_user_credits(seeded_db, 1)
+
+
+def plan_item(period, category_name, plan_sum):
+    return schemas_logic.PlanInsertItem(
+        period=period, category_name=category_name, sum=plan_sum
+    )
+
+
+def test_insert_plans_skips_existing_and_unknown(seeded_db):
+    items = [
+        plan_item(date(2021, 1, 1), "видача", 1),
+        plan_item(date(2021, 3, 1), "видача", 3000),
+        plan_item(date(2021, 3, 1), "видача", 3100),
+        plan_item(date(2021, 3, 1), "невідома", 10),
+    ]
+    counter = count_queries(seeded_db)
+    result = crud.insert_plans(seeded_db, items)
+
+    assert counter["count"] <= 4
+    assert result.inserted_count == 1
+    assert len(result.skipped) == 3
+    plans = {
+        (plan.period, plan.category_id): plan.sum
+        for plan in seeded_db.query(models.Plan)
+    }
+    assert plans[(date(2021, 1, 1), 3)] == 2000
+    assert plans[(date(2021, 3, 1), 3)] == 3000
+
+
+def test_insert_plans_updates_existing(seeded_db):
+    result = crud.insert_plans(
+        seeded_db,
+        [plan_item(date(2021, 1, 1), "видача", 2500)],
+        update_existing=True,
+    )
+
+    assert result.inserted_count == 0
+    assert result.updated_count == 1
+    assert result.skipped == []
+    plan = seeded_db.query(models.Plan).filter_by(period=date(2021, 1, 1), category_id=3).one()
+    assert plan.sum == 2500
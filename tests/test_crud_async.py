@@ -0,0 +1,77 @@
+import asyncio
+import sqlite3
+import threading
+from datetime import date
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src import crud, crud_async, models
+
+
+def run_async(db_path, coroutine_factory):
+    """Виконує корутину з AsyncSession до SQLite файлу через aiosqlite."""
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        try:
+            async with async_sessionmaker(engine)() as session:
+                return await coroutine_factory(session)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def copy_to_file(db, db_path):
+    """Копіює заповнену базу з пам'яті у файл, доступний aiosqlite."""
+    source = db.get_bind().raw_connection()
+    target = sqlite3.connect(db_path)
+    source.driver_connection.backup(target)
+    target.close()
+    source.close()
+
+
+def test_async_crud_matches_sync(seeded_db, tmp_path):
+    db_path = tmp_path / "async.db"
+    copy_to_file(seeded_db, db_path)
+
+    async def reports(session: AsyncSession):
+        return (
+            await crud_async.get_year_performance(session, 2021),
+            await crud_async.get_plans_performance(session, date(2021, 2, 20)),
+            await crud_async.get_user_credits(session, 1),
+        )
+
+    year, plans, credits = run_async(db_path, reports)
+
+    assert year == crud.get_year_performance(seeded_db, 2021)
+    assert plans == crud.get_plans_performance(seeded_db, date(2021, 2, 20))
+    assert credits == crud.get_user_credits(seeded_db, 1)
+
+
+def test_async_run_accepts_sync_session(seeded_db):
+    credits = asyncio.run(crud_async.get_user_credits(seeded_db, 2))
+
+    assert len(credits) == 1
+    assert seeded_db.get(models.Credit, 3).body == credits[0].body
+
+
+def test_async_plans_import_parses_off_event_loop(seeded_db, tmp_path):
+    db_path = tmp_path / "async.db"
+    copy_to_file(seeded_db, db_path)
+    threads = set()
+
+    def rows():
+        for month in (5, 6, 7):
+            threads.add(threading.get_ident())
+            yield {"period": f"01.{month:02d}.2021", "category_id": "4", "sum": "700"}
+
+    async def import_plans(session: AsyncSession):
+        loop_thread = threading.get_ident()
+        result = await crud_async.import_plans(session, rows(), chunk_size=2)
+        return loop_thread, result
+
+    loop_thread, result = run_async(db_path, import_plans)
+
+    assert (result.inserted_count, len(result.chunks)) == (3, 2)
+    assert threads and loop_thread not in threads
@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src import config, database
+from src.main import app
+
+
+def test_engine_options_for_server_dialects(monkeypatch):
+    monkeypatch.setattr(config, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(config, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    stats = database.PoolStats()
+
+    options = database.engine_options("mysql+pymysql://u:p@host/db", stats)
+    assert options["echo"] is False
+    assert options["pool_size"] == 3
+    assert options["pool_recycle"] == 3600
+    assert options["connect_args"] == {
+        "init_command": "SET SESSION max_execution_time = 5000"
+    }
+
+    options = database.engine_options("postgresql+asyncpg://u:p@host/db", stats, True)
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+
+    options = database.engine_options("sqlite://", stats)
+    assert "poolclass" not in options
+
+
+def test_async_url_names_missing_driver(monkeypatch):
+    url = database.to_async_url("mysql+pymysql://u:p@host/db")
+    assert url.drivername == "mysql+asyncmy"
+
+    monkeypatch.setitem(database.ASYNC_DRIVERS, "postgresql", "missing_async_driver")
+    with pytest.raises(RuntimeError, match="missing_async_driver"):
+        database.to_async_url("postgresql://u:p@host/db")
+
+
+def test_file_sqlite_engine_applies_pragmas_and_counts_pool(tmp_path):
+    db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    try:
+        with db_engine.connect() as connection:
+            journal_mode = connection.execute(text("PRAGMA journal_mode")).scalar()
+
+        status = database.pool_status(db_engine)
+        assert journal_mode == "wal"
+        assert status["pool"] == "QueuePool"
+        assert status["checkouts"] == 1
+        assert status["connects"] == 1
+        assert status["waits"] == 1
+        assert status["checked_out"] == 0
+    finally:
+        db_engine.dispose()
+
+
+def test_db_pool_stats_endpoint():
+    response = TestClient(app).get("/db_pool_stats")
+
+    assert response.status_code == 200
+    assert response.json()[0]["engine"] == "sync"
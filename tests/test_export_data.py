@@ -0,0 +1,78 @@
+import io
+import json
+from datetime import date
+
+import pyarrow.parquet as pq
+from fastapi.testclient import TestClient
+
+from src import models
+from src.database import get_db
+from src.main import app
+from src.utils import export_data, load_data
+
+
+def export(db, table_name, export_format, **kwargs):
+    return b"".join(
+        export_data.export_chunks(db.connection(), table_name, export_format, **kwargs)
+    )
+
+
+def test_csv_export_matches_data_layout(seeded_db, tmp_path):
+    content = export(seeded_db, "credits", "csv")
+    (tmp_path / "credits.csv").write_bytes(content)
+
+    assert content.decode().splitlines()[:2] == [
+        "id\tuser_id\tissuance_date\treturn_date\tactual_return_date\tbody\tpercent",
+        "1\t1\t10.01.2021\t10.02.2021\t05.02.2021\t1000\t200",
+    ]
+    (rows,) = load_data.iter_batches(
+        tmp_path / "credits.csv", models.Credit.__table__, batch_size=10
+    )
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    assert rows[1]["actual_return_date"] is None
+
+
+def test_export_filters_dates_and_resumes_after_id(seeded_db):
+    progress = {}
+    batches = list(
+        export_data.iter_batches(
+            seeded_db.connection(),
+            "payments",
+            date_from=date(2021, 2, 1),
+            batch_size=1,
+            progress=progress,
+        )
+    )
+    assert [[row.id for row in batch] for batch in batches] == [[2], [3], [4]]
+    assert progress == {"rows": 3, "last_id": 4}
+
+    resumed = export(seeded_db, "payments", "ndjson", after_id=2)
+    lines = [json.loads(line) for line in resumed.decode().splitlines()]
+    assert [line["id"] for line in lines] == [3, 4]
+    assert lines[0]["payment_date"] == "2021-02-28"
+    assert not export(seeded_db, "payments", "csv", after_id=2).startswith(b"id\t")
+
+
+def test_parquet_export_row_group_per_batch(seeded_db):
+    content = export(seeded_db, "payments", "parquet", batch_size=2)
+    parquet = pq.ParquetFile(io.BytesIO(content))
+
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column("id").to_pylist() == [1, 2, 3, 4]
+    assert table.column("payment_date").to_pylist()[0] == date(2021, 1, 31)
+
+
+def test_export_endpoint_streams(seeded_db):
+    app.dependency_overrides[get_db] = lambda: seeded_db
+    try:
+        response = TestClient(app).get(
+            "/export/payments", params={"format": "ndjson", "date_to": "2021-01-31"}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="payments.ndjson"' in response.headers["content-disposition"]
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [1]
@@ -0,0 +1,53 @@
+from collections import defaultdict
+from itertools import islice
+
+from sqlalchemy import func
+
+from benchmarks import run as benchmarks
+from src import models, rollups
+from src.utils import generate_data
+
+
+def test_generator_is_deterministic():
+    first = list(islice(generate_data.DataGenerator(1000, seed=7).iter_credits(), 50))
+    second = list(islice(generate_data.DataGenerator(1000, seed=7).iter_credits(), 50))
+    other = list(islice(generate_data.DataGenerator(1000, seed=8).iter_credits(), 50))
+
+    assert first == second
+    assert first != other
+
+
+def test_generate_fills_database(db):
+    counts = generate_data.generate(db.get_bind(), 300, batch_size=100)
+
+    assert counts["Credits"] == db.query(models.Credit).count() == 300
+    assert counts["Payments"] == db.query(models.Payment).count() > 300 * 2
+    assert db.query(func.min(models.Plan.period)).scalar().year == 2020
+
+    # Закриті кредити сплачено повністю, платежі не раніше видачі
+    paid = defaultdict(float)
+    for credit_id, payments_sum in db.query(
+        models.Payment.credit_id, func.sum(models.Payment.sum)
+    ).group_by(models.Payment.credit_id):
+        paid[credit_id] = payments_sum
+    for credit in db.query(models.Credit).filter(
+        models.Credit.actual_return_date.isnot(None)
+    ):
+        assert abs(paid[credit.id] - credit.body - credit.percent) < 0.01
+    assert (
+        db.query(models.Payment)
+        .join(models.Payment.credit)
+        .filter(models.Payment.payment_date < models.Credit.issuance_date)
+        .count()
+        == 0
+    )
+    assert rollups.find_credit_totals_mismatches(db.connection()) == []
+
+
+def test_benchmark_compare_reports_regressions():
+    baseline = {"1000": {"get_user_credits": {"seconds": 0.01, "queries": 1, "peak_kib": 100}}}
+    same = {"1000": {"get_user_credits": {"seconds": 0.012, "queries": 1, "peak_kib": 110}}}
+    worse = {"1000": {"get_user_credits": {"seconds": 0.05, "queries": 3, "peak_kib": 900}}}
+
+    assert benchmarks.compare(same, baseline) == []
+    assert len(benchmarks.compare(worse, baseline)) == 3
@@ -0,0 +1,35 @@
+from datetime import date
+
+from src import models
+from src.utils import load_data
+
+
+def write_dataset(directory, name, lines):
+    (directory / name).write_text("\r\n".join(lines) + "\r\n", encoding="utf-8")
+
+
+def test_load_data_from_csv(db, tmp_path):
+    write_dataset(tmp_path, "dictionary.csv", ["id\tname", "1\tтіло", "3\tвидача"])
+    write_dataset(tmp_path, "users.csv", ["id\tlogin\tregistration_date", "1\tuser\t01.01.2020"])
+    write_dataset(
+        tmp_path,
+        "credits.csv",
+        [
+            "id\tuser_id\tissuance_date\treturn_date\tactual_return_date\tbody\tpercent",
+            "1\t1\t11.01.2020\t25.01.2020\t\t4500\t32535",
+        ],
+    )
+    write_dataset(tmp_path, "plans.csv", ["id\tperiod\tsum\tcategory_id", "1\t01.01.2020\t21000\t3"])
+    write_dataset(
+        tmp_path,
+        "payments.csv",
+        ["id\tcredit_id\tpayment_date\ttype_id\tsum", "1\t1\t14.01.2020\t1\t1837.50"],
+    )
+
+    loaded = load_data.load_data(db.get_bind(), data_dir=tmp_path, batch_size=1)
+
+    assert loaded == {"Dictionary": 2, "Users": 1, "Credits": 1, "Plans": 1, "Payments": 1}
+    credit = db.get(models.Credit, 1)
+    assert credit.issuance_date == date(2020, 1, 11)
+    assert credit.actual_return_date is None
+    assert db.get(models.Payment, 1).sum == 1837.5
@@ -0,0 +1,76 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src import config, metrics
+from src.database import get_db_session
+from src.main import app
+
+
+def test_request_metrics_and_server_timing(seeded_db):
+    app.dependency_overrides[get_db_session] = lambda: seeded_db
+    try:
+        client = TestClient(app)
+        response = client.get("/user_credits/1")
+        metrics_response = client.get("/metrics")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    server_timing = response.headers["server-timing"]
+    assert server_timing.startswith("db;dur=")
+    assert 'desc="1 queries"' in server_timing
+    assert "app;dur=" in server_timing
+
+    text = metrics_response.text
+    assert metrics_response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_request_db_queries_bucket{method="GET",route="/user_credits/{user_id}",le="1"}'
+        in text
+    )
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/user_credits/{user_id}",'
+        'status="200"}' in text
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Тест", ("route",), (0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, "/a")
+
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{route="/a"} 4' in lines
+
+
+def test_slow_query_log(seeded_db, monkeypatch, caplog):
+    monkeypatch.setattr(config, "SLOW_QUERY_MS", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="src.metrics"):
+        seeded_db.execute(
+            text('SELECT id FROM "Credits" WHERE user_id = :user_id'), {"user_id": 2}
+        ).all()
+
+    assert "Slow query" in caplog.text
+    assert 'FROM "Credits" WHERE user_id = ? | parameters: (2,)' in caplog.text
+
+
+def test_failed_query_leaves_no_timing_state(seeded_db):
+    stats = metrics.RequestStats()
+    token = metrics._request_stats.set(stats)
+    try:
+        with pytest.raises(OperationalError):
+            seeded_db.execute(text("SELECT missing FROM nowhere"))
+        seeded_db.rollback()
+        seeded_db.execute(text('SELECT count(*) FROM "Credits"')).scalar()
+    finally:
+        metrics._request_stats.reset(token)
+
+    # Запит з помилкою не рахується і не лишає часу початку на з'єднанні
+    assert stats.queries == 1
+    assert not seeded_db.connection().info
@@ -0,0 +1,82 @@
+import io
+from datetime import date, datetime
+
+import pytest
+from openpyxl import Workbook
+
+from src import models
+from src.utils import plans_import
+
+
+def import_csv(db, text, **kwargs):
+    rows = plans_import.iter_plan_rows(io.BytesIO(text.encode("utf-8")), "plans.csv")
+    return plans_import.import_plans(db, rows, **kwargs)
+
+
+def test_import_csv_in_data_layout(seeded_db):
+    text = (
+        "id\tperiod\tsum\tcategory_id\n"
+        "1\t01.03.2021\t21000\t3\n"
+        "2\t01.03.2021\t5000\t4\n"
+        "3\t01.04.2021\tabc\t3\n"
+        "4\t01.04.2021\t100\t99\n"
+        "5\t01.01.2021\t100\t3\n"
+    )
+    result = import_csv(seeded_db, text, chunk_size=2)
+
+    assert result.total_rows == 5
+    assert result.inserted_count == 2
+    assert result.skipped_count == 1
+    assert result.errors_count == 2
+    assert [chunk.rows for chunk in result.chunks] == [2, 2, 1]
+    assert sorted(error.split(":")[0] for error in result.chunks[1].errors) == [
+        "row 4",
+        "row 5",
+    ]
+    assert seeded_db.query(models.Plan).filter_by(period=date(2021, 3, 1)).count() == 2
+
+
+def test_import_csv_with_category_names(seeded_db):
+    text = "period\tcategory_name\tsum\n01.05.2021\tзбір\t700\n"
+    result = import_csv(seeded_db, text)
+
+    assert result.inserted_count == 1
+    assert len(result.chunks) == 1
+
+
+def test_import_keeps_saved_chunks_on_read_error(seeded_db):
+    content = (
+        "period\tcategory_name\tsum\n01.05.2021\tзбір\t700\n".encode("utf-8")
+        + b"01.06.2021\t\xff\t700\n"
+    )
+    rows = plans_import.iter_plan_rows(io.BytesIO(content), "plans.csv")
+    result = plans_import.import_plans(seeded_db, rows, chunk_size=1)
+
+    assert result.error == "CSV file must be UTF-8 encoded"
+    assert (result.inserted_count, len(result.chunks)) == (1, 1)
+    assert seeded_db.query(models.Plan).filter_by(period=date(2021, 5, 1)).count() == 1
+
+
+def test_import_xlsx(seeded_db):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["period", "category_name", "sum"])
+    sheet.append([datetime(2021, 6, 1), "видача", 1000])
+    sheet.append([datetime(2021, 6, 1), "збір", 500])
+    content = io.BytesIO()
+    workbook.save(content)
+    content.seek(0)
+
+    rows = plans_import.iter_plan_rows(content, "plans.xlsx")
+    result = plans_import.import_plans(seeded_db, rows)
+
+    assert result.inserted_count == 2
+    assert result.errors_count == 0
+
+
+def test_import_rejects_missing_columns(seeded_db):
+    with pytest.raises(plans_import.PlanFileError):
+        import_csv(seeded_db, "period\tsum\n01.05.2021\t700\n")
+
+    with pytest.raises(plans_import.PlanFileError):
+        plans_import.iter_plan_rows(io.BytesIO(b""), "plans.txt")
@@ -0,0 +1,62 @@
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src import config, crud, profiling
+from src.database import get_db_session
+from src.routes import router
+
+
+def profiled_client(db):
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(profiling.ProfilingMiddleware)
+    app.dependency_overrides[get_db_session] = lambda: db
+    return TestClient(app)
+
+
+def test_profile_requested_by_query_parameter(seeded_db, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path))
+    client = profiled_client(seeded_db)
+
+    response = client.get("/user_credits/1?profile=1")
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    assert "user_credits_1" in profile_id
+
+    # Профіль містить і функцію з потоку пулу
+    stats = pstats.Stats(str(profiling.profile_path(profile_id)))
+    functions = {name for _, _, name in stats.stats}
+    assert crud.get_user_credits.__name__ in functions
+
+    plain = client.get("/user_credits/1", headers={"X-Profile": "0"})
+    assert "x-profile-id" not in plain.headers
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_disabled_profiling_leaves_functions_untouched(monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_ENABLED", False)
+    assert profiling.in_worker(crud.get_user_credits) is crud.get_user_credits
+
+
+def test_worker_function_profiled_while_request_profile_active(monkeypatch):
+    # Профайлер запиту вже працює, коли функція запускається в потоці пулу
+    monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+    profile = profiling.RequestProfile("worker")
+    token = profiling._active_profile.set(profile)
+    profile.profiler.enable()
+    try:
+        worker_fn = profiling.in_worker(crud.encode_credit_cursor)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            cursor = pool.submit(worker_fn, date(2021, 1, 10), 1).result()
+    finally:
+        profile.profiler.disable()
+        profiling._active_profile.reset(token)
+
+    assert cursor == crud.encode_credit_cursor(date(2021, 1, 10), 1)
+    functions = {name for _, _, name in profile.stats().stats}
+    assert crud.encode_credit_cursor.__name__ in functions
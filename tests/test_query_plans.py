@@ -0,0 +1,113 @@
+import re
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from src import crud, registry
+from src.schemas import schemas_logic
+
+
+# Регресійні тести планів виконання: жоден запит CRUD-функцій не повинен
+# повністю сканувати великі таблиці (Credits, Payments, Plans та агрегати) -
+# ні самі таблиці ("SCAN Credits"), ні їхні індекси цілком
+# ("SCAN Credits USING [COVERING] INDEX ...").
+
+LARGE_TABLES = ("Credits", "Payments", "Plans", "MonthlyAggregates", "DailyLedger")
+FULL_SCAN = re.compile(r"^SCAN (\w+)")
+# Повні сканування, дозволені явно: {назва виклику з CRUD_CALLS: таблиці}
+ALLOWED_SCANS = {
+    # Відкриті кредити когорт - обхід часткового індексу ix_credits_open_return_date
+    "get_cohorts": ("Credits",),
+}
+
+
+def capture_plans(db, call):
+    """Виконує call() і повертає EXPLAIN QUERY PLAN для кожного SELECT."""
+    registry.get_registry(db)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+    connection = db.connection()
+    return [
+        (
+            statement,
+            [
+                row[-1]
+                for row in connection.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + statement, parameters
+                )
+            ],
+        )
+        for statement, parameters in statements
+    ]
+
+
+def assert_no_full_scans(captured, allowed=()):
+    assert captured, "no queries captured"
+    for statement, plan in captured:
+        for detail in plan:
+            match = FULL_SCAN.match(detail)
+            table = match and match.group(1)
+            assert not (table in LARGE_TABLES and table not in allowed), (
+                f"full scan of {match.group(1)}:\n{statement}\n{plan}"
+            )
+
+
+CRUD_CALLS = {
+    "get_user_credits": lambda db: crud.get_user_credits(db, 1),
+    "get_user_credits_page": lambda db: crud.get_user_credits_page(
+        db, 1, limit=1, cursor=crud.encode_credit_cursor(date(2021, 1, 10), 1)
+    ),
+    "get_users_credits": lambda db: crud.get_users_credits(db, [1, 2]),
+    "get_year_performance": lambda db: crud.get_year_performance(db, 2021),
+    "get_cohorts": lambda db: crud.get_cohorts(db),
+    "get_plans_performance": lambda db: crud.get_plans_performance(db, date(2021, 2, 20)),
+    "get_plans_performance_series": lambda db: crud.get_plans_performance_series(
+        db, [date(2021, 1, 31), date(2021, 2, 28)]
+    ),
+    "get_overdue_portfolio": lambda db: crud.get_overdue_portfolio(
+        db, date(2021, 5, 1)
+    ),
+    "insert_plans": lambda db: crud.insert_plans(
+        db,
+        [
+            schemas_logic.PlanInsertItem(
+                period=date(2021, 1, 1), category_name="видача", sum=1
+            )
+        ],
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(CRUD_CALLS))
+def test_crud_queries_use_indexes(seeded_db, name):
+    assert_no_full_scans(
+        capture_plans(seeded_db, lambda: CRUD_CALLS[name](seeded_db)),
+        ALLOWED_SCANS.get(name, ()),
+    )
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        'SELECT sum(percent) FROM "Credits" WHERE percent > 0',
+        'SELECT user_id, count(*) FROM "Credits" GROUP BY user_id',
+    ],
+)
+def test_full_scan_is_detected(seeded_db, statement):
+    connection = seeded_db.connection()
+    captured = capture_plans(seeded_db, lambda: connection.exec_driver_sql(statement))
+    with pytest.raises(AssertionError):
+        assert_no_full_scans(captured)
+    assert_no_full_scans(captured, allowed=("Credits",))
@@ -0,0 +1,39 @@
+from datetime import date
+
+from src import crud, models, registry
+from src.schemas import schemas_logic
+
+
+def test_registry_lookups(seeded_db):
+    dictionary = registry.get_registry(seeded_db)
+
+    assert dictionary.id_of("Видача") == 3
+    assert dictionary.name_of(1) == "тіло"
+    assert dictionary.ids_containing("ЗБІР") == [4]
+    assert dictionary.id_of("невідома") is None
+    assert registry.get_registry(seeded_db) is dictionary
+
+
+def test_registry_reloads_after_dictionary_commit(seeded_db):
+    before = registry.get_registry(seeded_db)
+    seeded_db.add(models.Dictionary(id=5, name="штраф"))
+    seeded_db.commit()
+
+    after = registry.get_registry(seeded_db)
+    assert after is not before
+    assert after.id_of("штраф") == 5
+
+
+def test_insert_plans_resolves_categories_from_registry(seeded_db):
+    result = crud.insert_plans(
+        seeded_db,
+        [
+            schemas_logic.PlanInsertItem(
+                period=date(2021, 3, 1), category_name="Видача", sum=100
+            )
+        ],
+    )
+
+    assert result.inserted_count == 1
+    plan = seeded_db.query(models.Plan).filter_by(period=date(2021, 3, 1)).one()
+    assert plan.category_id == 3
@@ -0,0 +1,258 @@
+import threading
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src import crud, database, models, rollups
+
+
+def aggregates(db):
+    table = models.MonthlyAggregate
+    return {
+        (row.month, row.source, row.type_id): (row.count, round(row.sum, 6))
+        for row in db.execute(
+            select(table.month, table.source, table.type_id, table.count, table.sum)
+        )
+        if row.count or row.sum
+    }
+
+
+def rebuilt(db):
+    rollups.rebuild(db.connection())
+    return aggregates(db)
+
+
+def test_orm_writes_keep_aggregates_current(seeded_db):
+    incremental = aggregates(seeded_db)
+    assert incremental[(date(2021, 2, 1), rollups.SOURCE_PAYMENT, 1)] == (1, 300)
+    assert incremental == rebuilt(seeded_db)
+
+    seeded_db.add(
+        models.Payment(credit_id=1, type_id=2, sum=50, payment_date=date(2021, 2, 9))
+    )
+    payment = seeded_db.get(models.Payment, 1)
+    payment.payment_date = date(2021, 3, 2)
+    payment.sum = 900
+    credit = seeded_db.get(models.Credit, 3)
+    credit.body = credit.body + 1
+    seeded_db.delete(seeded_db.get(models.Payment, 4))
+    seeded_db.commit()
+
+    incremental = aggregates(seeded_db)
+    assert incremental == rebuilt(seeded_db)
+
+
+def test_record_payments_for_core_inserts(seeded_db):
+    rows = [
+        {"credit_id": 1, "type_id": 1, "sum": 10.0, "payment_date": date(2021, 5, 3)},
+        {"credit_id": 2, "type_id": None, "sum": 5.0, "payment_date": date(2021, 5, 4)},
+    ]
+    connection = seeded_db.connection()
+    connection.execute(models.Payment.__table__.insert(), rows)
+    rollups.record_payments(connection, rows)
+
+    incremental = aggregates(seeded_db)
+    assert incremental[(date(2021, 5, 1), rollups.SOURCE_PAYMENT, rollups.NO_TYPE)] == (1, 5)
+    assert incremental == rebuilt(seeded_db)
+
+
+def cohort_aggregates(db):
+    table = models.CohortAggregate
+    return {
+        (row.cohort, row.month, row.source): (row.count, round(row.sum, 6))
+        for row in db.execute(
+            select(table.cohort, table.month, table.source, table.count, table.sum)
+        )
+        if row.count or row.sum
+    }
+
+
+def test_writes_keep_cohort_aggregates_current(seeded_db):
+    january, february = date(2021, 1, 1), date(2021, 2, 1)
+    incremental = cohort_aggregates(seeded_db)
+    assert incremental[(january, february, rollups.SOURCE_PAYMENT)] == (2, 500)
+    assert incremental[(february, february, rollups.SOURCE_USER)] == (1, 0)
+
+    seeded_db.add(models.User(id=3, login="third", registration_date=date(2021, 3, 1)))
+    seeded_db.add(
+        models.Credit(
+            user_id=3,
+            issuance_date=date(2021, 3, 5),
+            return_date=date(2021, 4, 5),
+            body=700,
+            percent=70,
+        )
+    )
+    seeded_db.get(models.Payment, 3).sum = 350
+    # Разом з користувачем видаляються його кредит і платежі по ньому
+    seeded_db.delete(seeded_db.get(models.User, 2))
+    seeded_db.commit()
+
+    rows = [
+        {"credit_id": 2, "type_id": 1, "sum": 20.0, "payment_date": date(2021, 4, 7)}
+    ]
+    connection = seeded_db.connection()
+    connection.execute(models.Payment.__table__.insert(), rows)
+    rollups.record_payments(connection, rows)
+
+    incremental = cohort_aggregates(seeded_db)
+    assert (february, february, rollups.SOURCE_USER) not in incremental
+    assert incremental[(january, date(2021, 4, 1), rollups.SOURCE_PAYMENT)] == (1, 20)
+    rollups.rebuild(seeded_db.connection())
+    assert incremental == cohort_aggregates(seeded_db)
+
+
+def test_reports_read_aggregates(seeded_db):
+    # Сирі рядки видалено в обхід ORM: звіти їх не читають
+    connection = seeded_db.connection()
+    connection.execute(models.Payment.__table__.delete())
+    connection.execute(models.Credit.__table__.delete())
+    seeded_db.commit()
+
+    year = crud.get_year_performance(seeded_db, 2021)
+    assert [row.credits_count for row in year[:3]] == [1, 2, 0]
+    assert [row.payments_count for row in year[:3]] == [1, 2, 1]
+
+    month_end = crud.get_plans_performance(seeded_db, date(2021, 2, 28))
+    by_category = {item.category_name: item for item in month_end}
+    assert by_category["видача"].actual_sum == 2500
+
+    mid_month = crud.get_plans_performance(seeded_db, date(2021, 2, 19))
+    by_category = {item.category_name: item for item in mid_month}
+    assert by_category["видача"].actual_sum == 2000
+
+
+def test_daily_ledger_cumulative_sums(seeded_db):
+    # Платіж "заднім числом" зсуває накопичені суми всіх наступних днів
+    seeded_db.add(
+        models.Payment(credit_id=1, type_id=1, sum=7, payment_date=date(2021, 1, 20))
+    )
+    seeded_db.commit()
+
+    table = models.DailyLedger
+    ledger = seeded_db.execute(
+        select(table.day, table.sum, table.cumulative_sum)
+        .where(table.source == rollups.SOURCE_PAYMENT, table.type_id == 1)
+        .order_by(table.day)
+    ).all()
+    assert [tuple(row) for row in ledger] == [
+        (date(2021, 1, 20), 7, 7),
+        (date(2021, 1, 31), 1000, 1007),
+        (date(2021, 2, 28), 300, 1307),
+    ]
+
+    columns = select(table.day, table.source, table.type_id, table.cumulative_sum)
+    incremental = sorted(seeded_db.execute(columns).all())
+    rollups.rebuild(seeded_db.connection())
+    assert incremental == sorted(seeded_db.execute(columns).all())
+
+
+def test_concurrent_writers_keep_ledger_consistent(tmp_path):
+    db_engine = database.create_db_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    models.Base.metadata.create_all(bind=db_engine)
+    with Session(db_engine) as db:
+        db.add_all(
+            [
+                models.Dictionary(id=1, name="тіло"),
+                models.User(id=1, login="first", registration_date=date(2021, 1, 5)),
+                models.Credit(
+                    id=1,
+                    user_id=1,
+                    issuance_date=date(2021, 1, 10),
+                    return_date=date(2021, 2, 10),
+                    body=1000,
+                    percent=200,
+                ),
+            ]
+        )
+        db.commit()
+
+    # Обидва записи створюють той самий новий день, один з них - ще й заднім числом
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def write(days):
+        rows = [
+            {"credit_id": 1, "type_id": 1, "sum": 10.0, "payment_date": day}
+            for day in days
+        ]
+        with Session(db_engine) as db:
+            barrier.wait()
+            try:
+                connection = db.connection()
+                connection.execute(models.Payment.__table__.insert(), rows)
+                rollups.record_payments(connection, rows)
+                db.commit()
+            except Exception as exc:
+                errors.append(exc)
+
+    threads = [
+        threading.Thread(target=write, args=(days,))
+        for days in ([date(2021, 6, 1)], [date(2021, 5, 15), date(2021, 6, 1)])
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with Session(db_engine) as db:
+        table = models.DailyLedger
+        columns = select(table.day, table.count, table.cumulative_sum).where(
+            table.source == rollups.SOURCE_PAYMENT
+        )
+        incremental = sorted(db.execute(columns).all())
+        assert incremental == [(date(2021, 5, 15), 1, 10), (date(2021, 6, 1), 2, 30)]
+        rollups.rebuild(db.connection())
+        assert incremental == sorted(db.execute(columns).all())
+        assert db.get(models.LedgerSeries, (rollups.SOURCE_PAYMENT, 1)) is not None
+    db_engine.dispose()
+
+
+def credit_totals(db, credit_id):
+    credit = db.get(models.Credit, credit_id)
+    return (
+        credit.paid_body,
+        credit.paid_percent,
+        credit.paid_total,
+        credit.last_payment_date,
+    )
+
+
+def test_payment_writes_maintain_credit_totals(seeded_db):
+    assert credit_totals(seeded_db, 1) == (1000, 200, 1200, date(2021, 2, 5))
+
+    seeded_db.add(
+        models.Payment(credit_id=1, type_id=2, sum=50, payment_date=date(2021, 2, 9))
+    )
+    seeded_db.flush()
+    # Завантажений кредит перечитує суми після flush
+    assert credit_totals(seeded_db, 1) == (1000, 250, 1250, date(2021, 2, 9))
+
+    # Перенесення платежу на інший кредит і видалення останнього платежу
+    seeded_db.get(models.Payment, 1).credit_id = 3
+    seeded_db.delete(seeded_db.get(models.Payment, 4))
+    seeded_db.commit()
+
+    assert credit_totals(seeded_db, 1) == (0, 250, 250, date(2021, 2, 9))
+    assert credit_totals(seeded_db, 2) == (300, 0, 300, date(2021, 2, 28))
+    assert credit_totals(seeded_db, 3) == (1000, 0, 1000, date(2021, 1, 31))
+    assert rollups.find_credit_totals_mismatches(seeded_db.connection()) == []
+
+
+def test_reconcile_repairs_credit_totals(seeded_db):
+    connection = seeded_db.connection()
+    credits = models.Credit.__table__
+    connection.execute(
+        credits.update()
+        .where(credits.c.id == 2)
+        .values(paid_total=0, last_payment_date=None)
+    )
+
+    mismatches = rollups.find_credit_totals_mismatches(connection)
+    assert [row["id"] for row in mismatches] == [2]
+    assert mismatches[0]["actual_paid_total"] == 400
+
+    assert rollups.repair_credit_totals(connection) == 1
+    assert rollups.find_credit_totals_mismatches(connection) == []
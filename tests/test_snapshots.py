@@ -0,0 +1,128 @@
+import shutil
+from datetime import date, timedelta
+
+import pytest
+
+from sqlalchemy import event
+
+from src import config, crud, models, snapshots
+from src.schemas import schemas_logic
+from src.utils import generate_data
+
+
+@pytest.fixture
+def snapshot_dir(db, tmp_path, monkeypatch):
+    generate_data.generate(db.get_bind(), 1000, seed=3, years=2, batch_size=500)
+    monkeypatch.setattr(config, "REPORT_CACHE_ENABLED", False)
+    monkeypatch.setattr(config, "SNAPSHOT_DIR", str(tmp_path))
+    with db.get_bind().connect() as connection:
+        snapshots.write_snapshot(connection, tmp_path, today=date(2021, 7, 1))
+    return tmp_path
+
+
+def report(monkeypatch, backend, call):
+    monkeypatch.setattr(config, "REPORT_BACKEND", backend)
+    return call()
+
+
+def assert_same(expected, actual):
+    assert len(expected) == len(actual)
+    for expected_item, actual_item in zip(expected, actual):
+        assert actual_item.model_dump() == pytest.approx(expected_item.model_dump())
+
+
+def test_snapshot_manifest_and_partitions(db, snapshot_dir):
+    manifest = snapshots.read_manifest(snapshot_dir)
+
+    assert manifest["data_through"] == "2021-07-01"
+    payments = manifest["tables"]["payments"]
+    assert len(payments["months"]) == 24
+    assert sum(payments["months"].values()) == payments["rows"]
+    assert (
+        snapshot_dir / manifest["snapshot_id"] / "credits" / "month=2020-03"
+    ).is_dir()
+
+    # Лише два останні знімки
+    with db.get_bind().connect() as connection:
+        for _ in range(2):
+            snapshots.write_snapshot(connection, snapshot_dir, today=date(2021, 7, 1))
+    assert manifest["snapshot_id"] not in {p.name for p in snapshot_dir.iterdir()}
+
+
+def test_closed_year_reports_match_sql(db, snapshot_dir, monkeypatch):
+    year = lambda: crud.get_year_performance(db, 2020)
+    assert_same(report(monkeypatch, "sql", year), report(monkeypatch, "parquet", year))
+
+    target_dates = [date(2020, 12, 1) + timedelta(days=day * 5) for day in range(7)]
+    series = lambda: crud.get_plans_performance_series(db, target_dates)
+    expected = report(monkeypatch, "sql", series)
+    actual = report(monkeypatch, "parquet", series)
+    for expected_item, actual_item in zip(expected, actual):
+        assert_same(expected_item.plans, actual_item.plans)
+
+
+def test_closed_year_reads_only_its_partitions(db, snapshot_dir, monkeypatch):
+    expected = report(monkeypatch, "sql", lambda: crud.get_year_performance(db, 2020))
+
+    current = snapshot_dir / snapshots.read_manifest(snapshot_dir)["snapshot_id"]
+    for partition in current.glob("*/month=2021-*"):
+        shutil.rmtree(partition)
+    actual = report(monkeypatch, "parquet", lambda: crud.get_year_performance(db, 2020))
+
+    assert_same(expected, actual)
+
+
+def test_open_year_falls_back_to_sql(db, snapshot_dir):
+    assert snapshots.get_snapshot(db, [2021]) is None
+    assert snapshots.get_snapshot(db, [2020]) is not None
+    missing = snapshot_dir / "missing"
+    assert snapshots.get_snapshot(db, [2020], directory=missing) is None
+
+
+def test_changed_closed_year_falls_back_to_sql(db, snapshot_dir, monkeypatch):
+    year = lambda: crud.get_year_performance(db, 2020)
+
+    assert snapshots.get_snapshot(db, [2020]) is not None
+
+    # Плани перезаписуються після знімка - звіт бачить нові суми
+    plan = db.query(models.Plan).filter(models.Plan.period == date(2020, 3, 1)).first()
+    item = schemas_logic.PlanInsertItem(
+        period=plan.period, category_name=plan.category.name, sum=123
+    )
+    crud.insert_plans(db, [item], update_existing=True)
+    assert snapshots.get_snapshot(db, [2020]) is None
+    assert_same(report(monkeypatch, "sql", year), report(monkeypatch, "parquet", year))
+
+    # Платіж заднім числом у закритий рік - знімок цього року застарів
+    credit = db.query(models.Credit).first()
+    db.add(
+        models.Payment(
+            credit_id=credit.id, type_id=1, sum=77, payment_date=date(2020, 5, 5)
+        )
+    )
+    db.commit()
+    assert snapshots.get_snapshot(db, [2020]) is None
+    assert snapshots.get_snapshot(db, [2019]) is not None
+    assert_same(report(monkeypatch, "sql", year), report(monkeypatch, "parquet", year))
+
+
+def test_checked_snapshot_is_served_without_queries(db, snapshot_dir, monkeypatch):
+    def statements(call):
+        executed = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            executed.append(statement)
+
+        event.listen(db.get_bind(), "before_cursor_execute", before_cursor_execute)
+        try:
+            report(monkeypatch, "parquet", call)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", before_cursor_execute)
+        return executed
+
+    year = lambda: crud.get_year_performance(db, 2020)
+    first = statements(year)
+    # Перша звірка знімка з базою - агрегати і плани
+    assert any("MonthlyAggregates" in statement for statement in first)
+    assert any("Plans" in statement for statement in first)
+    assert statements(year) == []